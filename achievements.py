@@ -0,0 +1,95 @@
+"""Event-driven achievement engine over the declarative rules in rules.py.
+
+Each achievement names a metric, a comparator and a threshold. The engine
+indexes rules by metric, so a completion only checks the completion and
+streak rules, a level-up only the level rules and a rank change only the
+rank rules. Thresholds are compared with >= by default, so bulk EXP grants
+that jump past a threshold still award it.
+"""
+import operator
+
+from rules import ACHIEVEMENTS, LEVEL, RANK_TIER, STREAK, TOTAL_COMPLETIONS, get_rank_index
+
+COMPARATORS = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "==": operator.eq,
+}
+
+
+class AchievementEngine:
+    """Award achievements whose metric changed and whose condition holds"""
+
+    def __init__(self, achievements=ACHIEVEMENTS):
+        self._by_metric = {}
+        self._rules = {}
+        for achievement_id, spec in achievements.items():
+            compare = COMPARATORS[spec.get("op", ">=")]
+            self._by_metric.setdefault(spec["metric"], []).append((achievement_id, compare, spec["threshold"]))
+            self._rules[achievement_id] = (spec["metric"], compare, spec["threshold"])
+
+    def evaluate(self, user, metrics):
+        """Check the rules of each metric in {metric: value}; return awarded ids"""
+        earned = user["achievements"]
+        awarded = []
+        for metric, value in metrics.items():
+            for achievement_id, compare, threshold in self._by_metric.get(metric, ()):
+                if achievement_id not in earned and compare(value, threshold):
+                    earned.append(achievement_id)
+                    awarded.append(achievement_id)
+        return awarded
+
+    def holds(self, achievement_id, metrics):
+        """Whether an achievement's condition holds for {metric: value}"""
+        metric, compare, threshold = self._rules[achievement_id]
+        return compare(metrics[metric], threshold)
+
+    def revoke(self, user, achievement_ids, metrics):
+        """Take back those of achievement_ids whose condition no longer holds; return them"""
+        earned = user["achievements"]
+        revoked = [a for a in achievement_ids if a in earned and a in self._rules and not self.holds(a, metrics)]
+        for achievement_id in revoked:
+            earned.remove(achievement_id)
+        return revoked
+
+    def on_completion(self, user, total_completions, streak):
+        """Rules driven by a task completion"""
+        return self.evaluate(user, {TOTAL_COMPLETIONS: total_completions, STREAK: streak})
+
+    def on_level_up(self, user):
+        """Rules driven by a level-up"""
+        return self.evaluate(user, {LEVEL: user["level"]})
+
+    def on_rank_change(self, user):
+        """Rules driven by a rank change"""
+        return self.evaluate(user, {RANK_TIER: get_rank_index(user["rank_points"])})
+
+    def on_task_completed(self, user, total_completions, streak, leveled_up, rank_changed):
+        """Dispatch one completion to every handler whose inputs changed"""
+        awarded = self.on_completion(user, total_completions, streak)
+        if leveled_up:
+            awarded += self.on_level_up(user)
+        if rank_changed:
+            awarded += self.on_rank_change(user)
+        return awarded
+
+    def backfill(self, user, total_completions, longest_streak):
+        """Award everything an existing or imported profile has already earned"""
+        return self.evaluate(user, standing_metrics(user, total_completions, longest_streak))
+
+    def expected(self, metrics):
+        """Ids of every achievement whose condition holds for {metric: value}"""
+        return [a for a in self._rules if self.holds(a, metrics)]
+
+
+def standing_metrics(user, total_completions, longest_streak):
+    """Every rule input for a profile, judging streak rules by the longest streak"""
+    return {
+        TOTAL_COMPLETIONS: total_completions,
+        STREAK: longest_streak,
+        LEVEL: user["level"],
+        RANK_TIER: get_rank_index(user["rank_points"]),
+    }
+
+
+ENGINE = AchievementEngine()
@@ -0,0 +1,71 @@
+"""Per-day completion counts for the activity calendar.
+
+Counts live in one int32 array indexed by day ordinal minus an origin, so
+any range of days (30 days or several years) is a slice instead of a loop
+over date strings. The engine updates the array on every completion and
+undo; it grows in both directions when earlier or later days show up.
+"""
+from datetime import date
+
+import numpy as np
+
+INITIAL_DAYS = 512
+
+
+class DailyCounts:
+    """Completions per day, indexed by ordinal"""
+
+    def __init__(self, origin=None, capacity=INITIAL_DAYS):
+        self.origin = origin
+        self._counts = np.zeros(capacity, dtype=np.int32)
+
+    @classmethod
+    def from_history(cls, completion_history):
+        """Build the counts from a {"YYYY-MM-DD": [task_id, ...]} history"""
+        days = {date.fromisoformat(day).toordinal(): len(ids) for day, ids in completion_history.items() if ids}
+        if not days:
+            return cls()
+        first, last = min(days), max(days)
+        counts = cls(first, max(last - first + 1, INITIAL_DAYS))
+        counts._counts[np.fromiter(days, dtype=np.int64, count=len(days)) - first] = list(days.values())
+        return counts
+
+    def add(self, ordinal, delta=1):
+        """Change a day's count by delta"""
+        self._cover(ordinal)
+        self._counts[ordinal - self.origin] += delta
+
+    def get(self, ordinal):
+        """Completions on one day"""
+        if self.origin is None or not 0 <= ordinal - self.origin < len(self._counts):
+            return 0
+        return int(self._counts[ordinal - self.origin])
+
+    def range(self, first, last):
+        """Counts for ordinals first..last inclusive (zero outside the recorded days)"""
+        result = np.zeros(last - first + 1, dtype=np.int32)
+        if self.origin is None:
+            return result
+        start = max(first, self.origin)
+        stop = min(last, self.origin + len(self._counts) - 1)
+        if start <= stop:
+            result[start - first:stop - first + 1] = self._counts[start - self.origin:stop - self.origin + 1]
+        return result
+
+    def _cover(self, ordinal):
+        if self.origin is None:
+            self.origin = ordinal
+            return
+        offset = ordinal - self.origin
+        size = len(self._counts)
+        if offset < 0:
+            # Back-filled day: prepend at least as many days as are already held
+            pad = max(-offset, size)
+            grown = np.zeros(size + pad, dtype=np.int32)
+            grown[pad:] = self._counts
+            self._counts = grown
+            self.origin -= pad
+        elif offset >= size:
+            grown = np.zeros(max(2 * size, offset + 1), dtype=np.int32)
+            grown[:size] = self._counts
+            self._counts = grown
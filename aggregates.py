@@ -0,0 +1,75 @@
+"""Completion counters kept up to date on every completion and undo.
+
+The Statistics, Achievements and Settings pages read these instead of
+rescanning ``completion_history`` on each rerun.
+"""
+
+
+class Aggregates:
+    """Totals, per-task, per-category and active-day completion counts"""
+
+    def __init__(self):
+        self.total_completions = 0
+        self.task_counts = {}
+        self.category_counts = {}
+        self.day_counts = {}
+        self.active_days = 0
+
+    @classmethod
+    def from_history(cls, completion_history, daily_tasks):
+        """Build the counters with one pass over the history"""
+        aggregates = cls()
+        categories = {task["id"]: task.get("category", "other") for task in daily_tasks}
+        task_counts = aggregates.task_counts
+        for day, task_ids in completion_history.items():
+            if not task_ids:
+                continue
+            aggregates.day_counts[day] = len(task_ids)
+            for task_id in task_ids:
+                task_counts[task_id] = task_counts.get(task_id, 0) + 1
+        category_counts = aggregates.category_counts
+        for task_id, count in task_counts.items():
+            if task_id in categories:
+                category = categories[task_id]
+                category_counts[category] = category_counts.get(category, 0) + count
+        aggregates.total_completions = sum(aggregates.day_counts.values())
+        aggregates.active_days = len(aggregates.day_counts)
+        return aggregates
+
+    def record_completion(self, day, task):
+        """Count one completion of task on day"""
+        self.total_completions += 1
+        self._bump(self.task_counts, task["id"], 1)
+        self._bump(self.category_counts, task.get("category", "other"), 1)
+        if self._bump(self.day_counts, day, 1) == 1:
+            self.active_days += 1
+
+    def record_undo(self, day, task, task_id=None):
+        """Remove one completion of task on day
+
+        A deleted quest is passed as task None with its task_id; its
+        category was already dropped by remove_task.
+        """
+        self.total_completions -= 1
+        if task is not None:
+            self._bump(self.task_counts, task["id"], -1)
+            self._bump(self.category_counts, task.get("category", "other"), -1)
+        else:
+            self._bump(self.task_counts, task_id, -1)
+        if self._bump(self.day_counts, day, -1) == 0:
+            self.active_days -= 1
+
+    def remove_task(self, task):
+        """Drop a deleted task's completions from its category"""
+        count = self.task_counts.get(task["id"], 0)
+        if count:
+            self._bump(self.category_counts, task.get("category", "other"), -count)
+
+    @staticmethod
+    def _bump(counts, key, delta):
+        value = counts.get(key, 0) + delta
+        if value:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+        return value
@@ -0,0 +1,276 @@
+"""Local HTTP/JSON API for quest completion and profile queries.
+
+A small asyncio server (standard library only) in front of the same
+GameEngine objects the Streamlit app uses, so completions follow exactly
+the rules of the ✓ button. Connections are kept alive and every request is
+handled on the event loop: an engine operation takes a fraction of a
+millisecond, and with a WriteBehindStore it never waits on the disk.
+
+    python api.py --port 8765                         # standalone, on data/tracker.db
+    SOLO_API_PORT=8765 streamlit run daily_tracker.py # inside the app, sharing its profiles
+
+    GET  /users/<user>             level, EXP, rank, streaks (404 for an unknown user)
+    POST /users/<user>/complete    {"task_id": 7, "day": "2024-05-01"}  (day defaults to today)
+    POST /users/<user>/undo        {"task_id": 7, "day": "2024-05-01"}
+    POST /complete                 {"completions": [{"user": "...", "task_id": 7, "day": "..."}, ...]}
+    GET  /metrics                  profiling totals (profiling.py) in the Prometheus text format
+
+Completing for an unknown user gives it a fresh profile, as with ?user= in
+the app; reading or undoing for one is 404. A user id must be a non-blank
+string (400 otherwise). A quest can be completed once a day, as with the ✓
+button; a repeat is refused with 409 Conflict. An unexpected failure is
+answered with 500 and a JSON error, and the connection stays usable.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import traceback
+from datetime import date
+from http import HTTPStatus
+from urllib.parse import unquote
+
+from engine import get_today_key
+
+MAX_BODY = 1 << 20
+
+
+class ApiError(Exception):
+    """A request that cannot be served; carries the HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _day(value):
+    """Validated "YYYY-MM-DD" day (default today)"""
+    if value is None:
+        return get_today_key()
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"invalid day {value!r}") from None
+
+
+def _user_id(value):
+    # Blank names are refused, as by the app's user switcher
+    if not isinstance(value, str) or not value.strip():
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"invalid user {value!r}")
+    return value
+
+
+def _task_id(value):
+    if type(value) is not int:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"invalid task_id {value!r}")
+    return value
+
+
+def _allow(method, allowed, path):
+    if method != allowed:
+        raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+
+
+class Api:
+    """Request handlers over a ProfileCache of GameEngines and the store they were loaded from"""
+
+    def __init__(self, profiles, store):
+        self.profiles = profiles
+        self.store = store
+
+    def handle(self, method, path, body):
+        """(status, payload) for one request; body is the parsed JSON or None
+
+        A str payload is sent as plain text, anything else as JSON.
+        """
+        parts = [unquote(part) for part in path.split("?", 1)[0].strip("/").split("/")]
+        if len(parts) in (2, 3) and parts[0] == "users":
+            user_id, action = _user_id(parts[1]), parts[2] if len(parts) == 3 else None
+            if action is None:
+                _allow(method, "GET", path)
+                return HTTPStatus.OK, self._existing(user_id).status()
+            if action in ("complete", "undo"):
+                _allow(method, "POST", path)
+                request = body if isinstance(body, dict) else {}
+                task_id, day = _task_id(request.get("task_id")), _day(request.get("day"))
+                if action == "complete":
+                    return self.complete(user_id, task_id, day)
+                return self.undo(user_id, task_id, day)
+        elif parts == ["complete"]:
+            _allow(method, "POST", path)
+            completions = body.get("completions") if isinstance(body, dict) else None
+            if not isinstance(completions, list):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "expected {\"completions\": [...]}")
+            return HTTPStatus.OK, {"results": self.complete_many(completions)}
+        elif parts == ["metrics"]:
+            _allow(method, "GET", path)
+            from profiling import TOTALS
+            return HTTPStatus.OK, TOTALS.to_prometheus()
+        raise ApiError(HTTPStatus.NOT_FOUND, f"no route for {path}")
+
+    def complete(self, user_id, task_id, day):
+        engine, awarded = self._complete(user_id, task_id, day)
+        return HTTPStatus.OK, {"completed": True, "day": day, "awarded": awarded, "profile": engine.status()}
+
+    def undo(self, user_id, task_id, day):
+        engine = self._existing(user_id)
+        undone = engine.undo_task(task_id, day)
+        return HTTPStatus.OK, {"undone": undone, "day": day, "profile": engine.status()}
+
+    def complete_many(self, completions):
+        """Complete (user, task_id, day) items in order; one result per item"""
+        results = []
+        for item in completions:
+            try:
+                if not isinstance(item, dict):
+                    raise ApiError(HTTPStatus.BAD_REQUEST, "expected {\"user\": ..., \"task_id\": ...}")
+                user_id, task_id, day = _user_id(item.get("user")), _task_id(item.get("task_id")), _day(item.get("day"))
+                _engine, awarded = self._complete(user_id, task_id, day)
+                results.append({"completed": True, "awarded": awarded})
+            except ApiError as exc:
+                results.append({"completed": False, "error": str(exc)})
+        return results
+
+    def _existing(self, user_id):
+        """Engine of a user that has a profile; 404 otherwise"""
+        if user_id not in self.profiles and not self.store.has_profile(user_id):
+            raise ApiError(HTTPStatus.NOT_FOUND, f"no profile for {user_id}")
+        return self.profiles.get(user_id)
+
+    def _complete(self, user_id, task_id, day):
+        """(engine, awarded ids) after completing; unknown quests and repeats are refused"""
+        engine = self.profiles.get(user_id)
+        # The app's script threads may click the same quest meanwhile
+        with engine.lock:
+            if task_id not in engine.catalog:
+                raise ApiError(HTTPStatus.NOT_FOUND, f"no quest {task_id} for {user_id}")
+            if task_id in engine.completed_on(day):
+                raise ApiError(HTTPStatus.CONFLICT, f"quest {task_id} already completed on {day}")
+            return engine, engine.complete_task(task_id, day)
+
+    # HTTP/1.1 over asyncio streams
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    if version == "HTTP/1.1" else headers.get("connection", "").lower() == "keep-alive"
+                )
+                length = headers.get("content-length", "0")
+                if not length.isdigit() or int(length) > MAX_BODY:
+                    status = HTTPStatus.REQUEST_ENTITY_TOO_LARGE if length.isdigit() else HTTPStatus.BAD_REQUEST
+                    await self._respond(writer, status, {"error": "bad Content-Length"}, False)
+                    break
+                length = int(length)
+                raw = await reader.readexactly(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else None
+                    status, payload = self.handle(method, path, body)
+                except json.JSONDecodeError:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": "body is not valid JSON"}
+                except ApiError as exc:
+                    status, payload = exc.status, {"error": str(exc)}
+                except Exception:
+                    traceback.print_exc()
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutting down; end the connection quietly
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+            content_type = "application/json"
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8765, ready=None):
+        """Serve until cancelled; ready(sockets) is called once listening"""
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        if ready is not None:
+            ready(server.sockets)
+        async with server:
+            await server.serve_forever()
+
+    def start_in_thread(self, host="127.0.0.1", port=8765):
+        """Serve from a daemon thread (as inside the Streamlit app); returns the thread"""
+        thread = threading.Thread(
+            target=lambda: asyncio.run(self.serve(host, port)), name="solo-api", daemon=True
+        )
+        thread.start()
+        return thread
+
+
+def main():
+    import signal
+
+    from engine import GameEngine
+    from leaderboard import Leaderboards
+    from profiles import ProfileCache
+    from storage import DEFAULT_DB_PATH, ProfileStore
+    from writer import WriteBehindStore
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="profile database")
+    args = parser.parse_args()
+
+    store = WriteBehindStore(ProfileStore(args.db))
+    leaderboards = Leaderboards.load(store)
+    api = Api(ProfileCache(lambda user_id: GameEngine.open(store, user_id, leaderboard=leaderboards)), store)
+
+    def ready(sockets):
+        host, port = sockets[0].getsockname()[:2]
+        print(f"Serving on http://{host}:{port}", flush=True)
+
+    async def run():
+        # SIGINT/SIGTERM cancel the server, so the queued writes below are still drained
+        serving = asyncio.ensure_future(api.serve(args.host, args.port, ready))
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, serving.cancel)
+        try:
+            await serving
+        except asyncio.CancelledError:
+            pass
+
+    try:
+        asyncio.run(run())
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
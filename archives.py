@@ -0,0 +1,146 @@
+"""Finished seasons frozen into compact, memory-mapped archives.
+
+"Start New Season" no longer throws the old history away. The season's
+completions are packed into one binary file, written once and never
+modified. The file holds a per-day count column (uint8/uint16, one entry
+per day from the first to the last active day) followed by the task-id
+column in day order (uint16/uint32). Per-day run lengths replace a day per
+completion, so a completion costs two or three bytes. Final level, rank,
+achievements and quest list go in a small metadata dict stored by the
+ProfileStore, so listing seasons never opens the files. Reads map the
+file with ``np.memmap``; only the pages a query touches are loaded.
+"""
+import os
+from datetime import date
+
+import numpy as np
+
+ALIGNMENT = 8
+
+
+def _smallest_uint(largest):
+    """Narrowest unsigned dtype name that holds largest"""
+    for dtype in ("uint8", "uint16", "uint32"):
+        if largest <= np.iinfo(dtype).max:
+            return dtype
+    return "uint64"
+
+
+def _ids_offset(meta):
+    """Byte offset of the task-id column (the day column is padded to ALIGNMENT)"""
+    size = meta["span"] * np.dtype(meta["counts_dtype"]).itemsize
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class SeasonArchive:
+    """One finished season: metadata plus day-count and task-id columns"""
+
+    def __init__(self, meta, day_counts, task_ids):
+        self.meta = meta
+        self.day_counts_column = day_counts
+        self.task_ids = task_ids
+
+    @classmethod
+    def from_profile(cls, user_data, ended, longest_streak=0):
+        """Pack the current season of a user_data dict"""
+        days = sorted(
+            (date.fromisoformat(day).toordinal(), ids)
+            for day, ids in user_data["completion_history"].items() if ids
+        )
+        first_day = days[0][0] if days else None
+        span = days[-1][0] - first_day + 1 if days else 0
+        completions = sum(len(ids) for _, ids in days)
+        counts_dtype = _smallest_uint(max((len(ids) for _, ids in days), default=0))
+        ids_dtype = _smallest_uint(max((max(ids) for _, ids in days), default=0))
+
+        day_counts = np.zeros(span, dtype=counts_dtype)
+        task_ids = np.empty(completions, dtype=ids_dtype)
+        end = 0
+        for ordinal, ids in days:
+            day_counts[ordinal - first_day] = len(ids)
+            start, end = end, end + len(ids)
+            task_ids[start:end] = ids
+
+        meta = {
+            "season": user_data["current_season"],
+            "ended": ended,
+            "level": user_data["level"],
+            "experience": user_data["experience"],
+            "rank": user_data["rank"],
+            "rank_points": user_data["rank_points"],
+            "achievements": list(user_data["achievements"]),
+            "daily_tasks": [dict(task) for task in user_data["daily_tasks"]],
+            "first_day": first_day,
+            "span": span,
+            "completions": completions,
+            "active_days": len(days),
+            "longest_streak": longest_streak,
+            "counts_dtype": counts_dtype,
+            "ids_dtype": ids_dtype,
+        }
+        return cls(meta, day_counts, task_ids)
+
+    @classmethod
+    def open(cls, path, meta):
+        """Map an archive file written by write()"""
+        if not meta["completions"]:
+            return cls(meta, np.zeros(0, meta["counts_dtype"]), np.zeros(0, meta["ids_dtype"]))
+        day_counts = np.memmap(path, dtype=meta["counts_dtype"], mode="r", shape=(meta["span"],))
+        task_ids = np.memmap(
+            path, dtype=meta["ids_dtype"], mode="r", offset=_ids_offset(meta), shape=(meta["completions"],)
+        )
+        return cls(meta, day_counts, task_ids)
+
+    def write(self, path):
+        """Write the columns to path (atomically, via a temporary file)"""
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.day_counts_column.tobytes())
+            f.write(b"\0" * (_ids_offset(self.meta) - self.day_counts_column.nbytes))
+            f.write(self.task_ids.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @property
+    def season(self):
+        return self.meta["season"]
+
+    @property
+    def first_day(self):
+        """Ordinal of the first active day, or None for an empty season"""
+        return self.meta["first_day"]
+
+    @property
+    def last_day(self):
+        """Ordinal of the last active day, or None for an empty season"""
+        first_day = self.meta["first_day"]
+        return None if first_day is None else first_day + self.meta["span"] - 1
+
+    def day_counts(self, first, last):
+        """Completions per day for ordinals first..last inclusive"""
+        result = np.zeros(last - first + 1, dtype=np.int32)
+        if self.first_day is None:
+            return result
+        start, stop = max(first, self.first_day), min(last, self.last_day)
+        if start <= stop:
+            result[start - first:stop - first + 1] = self.day_counts_column[
+                start - self.first_day:stop - self.first_day + 1
+            ]
+        return result
+
+    def task_counts(self):
+        """Completions per task id (array indexed by id)"""
+        return np.bincount(self.task_ids) if len(self.task_ids) else np.zeros(0, dtype=np.int64)
+
+
+def task_totals(archives):
+    """Completions per task name across seasons, most completed first"""
+    totals = {}
+    for archive in archives:
+        names = {task["id"]: task["name"] for task in archive.meta["daily_tasks"]}
+        counts = archive.task_counts()
+        for task_id in np.flatnonzero(counts):
+            name = names.get(int(task_id), f"Deleted quest #{task_id}")
+            totals[name] = totals.get(name, 0) + int(counts[task_id])
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
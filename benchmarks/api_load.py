@@ -0,0 +1,97 @@
+"""Load benchmark for the HTTP API (api.py).
+
+Starts the API in a child process on a temporary database, then drives it
+from keep-alive connections: each connection alternates complete and undo
+of a quest for its own user (a repeated complete would get 409), with a
+profile read every fourth request. It reports requests per second and
+latency percentiles. The server runs on a single core (one event loop).
+
+    python benchmarks/api_load.py
+    python benchmarks/api_load.py --connections 32 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def request(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload
+    )
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port, user, requests, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    completed = False
+    for i in range(requests):
+        if i % 4 == 3:
+            method, path, body = "GET", f"/users/{user}", None
+        else:
+            method, path, body = "POST", f"/users/{user}/{'undo' if completed else 'complete'}", {"task_id": 1}
+            completed = not completed
+        started = time.perf_counter()
+        status = await request(reader, writer, method, path, body)
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            raise RuntimeError(f"{method} {path} returned {status}")
+    writer.close()
+
+
+async def run(port, connections, requests):
+    # Warm up: create every profile (a complete and its undo) before timing
+    await asyncio.gather(*(client(port, f"load{c}", 2, []) for c in range(connections)))
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, f"load{c}", requests, latencies) for c in range(connections)))
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per connection")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "api.py"), "--port", "0", "--db", os.path.join(tmp, "api.db")],
+            cwd=ROOT, stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            port = int(server.stdout.readline().rsplit(":", 1)[1])
+            elapsed, latencies = asyncio.run(run(port, args.connections, args.requests))
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    total = len(latencies)
+    print(
+        f"{total} requests over {args.connections} connections in {elapsed:.2f} s: {total / elapsed:,.0f} req/s  "
+        f"latency p50 {statistics.median(latencies) * 1000:.2f} ms  "
+        f"p99 {latencies[int(total * 0.99) - 1] * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
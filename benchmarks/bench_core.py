@@ -0,0 +1,192 @@
+"""Benchmarks for the core game functions at 1, 100 and 10k days of history.
+
+    pip install pytest-benchmark
+    pytest benchmarks                           # run and autosave to .benchmarks/
+    pytest benchmarks --benchmark-compare       # compare with the last saved run
+    pytest-benchmark compare --group-by=func    # compare saved runs across commits
+
+The game functions run through GameEngine, the same object the Streamlit
+apps call, on an in-memory ProfileStore, so the numbers cover the work a
+click does minus the Streamlit rendering.
+The legacy_* benchmarks are the original full-history scans, kept as a
+baseline for the incremental versions.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from activity import DailyCounts
+from archives import SeasonArchive, task_totals
+from engine import GameEngine
+from leaderboard import Leaderboard
+from profiling import TOTALS, start_rerun
+from rollups import MONTH, Rollups
+from rules import RANK_SYSTEM, apply_experience, get_current_rank
+from storage import ProfileStore
+from writer import WriteBehindStore
+
+USER_ID = "bench"
+LEADERBOARD_USERS = 50_000
+
+
+@pytest.fixture
+def engine(profile):
+    store = ProfileStore(":memory:")
+    store.create_profile(USER_ID, profile)
+    engine = GameEngine(profile, USER_ID, store)
+    # Build the indexes once, as the first rerun of a session would
+    engine.catalog
+    engine.aggregates
+    engine.streak_tracker
+    yield engine
+    store.close()
+
+
+def legacy_total_completed(history):
+    return sum(len(tasks) for tasks in history.values())
+
+
+def legacy_completion_streak(history, today):
+    streak = 0
+    for i in range(100):
+        day = (today - timedelta(days=i)).strftime("%Y-%m-%d")
+        if day in history and history[day]:
+            streak += 1
+        else:
+            break
+    return streak
+
+
+@pytest.mark.parametrize("profiling", [False, True], ids=["plain", "profiled"])
+def bench_mark_task_complete(benchmark, engine, profiling):
+    """Complete and undo, optionally while a profiled rerun collects the timings"""
+    def complete_and_undo():
+        engine.complete_task(1)
+        engine.undo_task(1)
+
+    rerun = start_rerun() if profiling else None
+    try:
+        benchmark(complete_and_undo)
+    finally:
+        if rerun is not None:
+            rerun.finish()
+            TOTALS.reset()
+
+
+@pytest.mark.parametrize("write_behind", [False, True], ids=["sync", "write_behind"])
+def bench_click_on_disk(benchmark, profile, tmp_path, write_behind):
+    """Complete and undo on a database file: committed per click, or queued for the writer thread"""
+    store = ProfileStore(str(tmp_path / "bench.db"))
+    if write_behind:
+        store = WriteBehindStore(store)
+    store.create_profile(USER_ID, profile)
+    engine = GameEngine(profile, USER_ID, store)
+
+    def complete_and_undo():
+        engine.complete_task(1)
+        engine.undo_task(1)
+
+    benchmark(complete_and_undo)
+    store.close()
+
+
+def bench_add_experience(benchmark, profile):
+    user = dict(profile, completion_history={})
+    benchmark(lambda: apply_experience(dict(user), 250_000, "2000-01-01 00:00"))
+
+
+def bench_check_achievements(benchmark, engine):
+    benchmark(engine.check_achievements, True, True)
+
+
+def bench_get_completion_streak(benchmark, engine):
+    benchmark(engine.streak)
+
+
+def bench_get_current_rank(benchmark, profile):
+    benchmark(get_current_rank, profile["rank_points"])
+
+
+def bench_build_indexes(benchmark, profile):
+    """Cold start of a session: catalog, aggregates and streak tracker"""
+    def build():
+        engine = GameEngine(profile)
+        engine.catalog
+        engine.aggregates
+        engine.streak_tracker
+
+    benchmark(build)
+
+
+@pytest.mark.parametrize("days", [30, 1826], ids=["30d_range", "5y_range"])
+def bench_activity_calendar(benchmark, profile, days):
+    """Per-day counts for the activity calendar, from the maintained array"""
+    counts = DailyCounts.from_history(profile["completion_history"])
+    today = date.today().toordinal()
+    benchmark(counts.range, today - days + 1, today)
+
+
+def bench_rebuild_rollups(benchmark, profile):
+    """Offline rebuild of the weekly, monthly and seasonal rollups"""
+    benchmark(Rollups.from_history, profile["completion_history"], profile["daily_tasks"])
+
+
+def bench_monthly_trend(benchmark, engine):
+    """Monthly trend series as the Statistics page reads it"""
+    benchmark(engine.rollups.series, MONTH)
+
+
+def bench_season_history(benchmark, profile, tmp_path):
+    """Per-quest totals across four memory-mapped season archives"""
+    archives = []
+    for season in range(1, 5):
+        archive = SeasonArchive.from_profile(profile, "2000-01-01 00:00:00")
+        path = str(tmp_path / f"{season}.season")
+        archive.write(path)
+        archives.append(SeasonArchive.open(path, archive.meta))
+    benchmark(task_totals, archives)
+
+
+@pytest.fixture(scope="module")
+def leaderboard():
+    board = Leaderboard()
+    for i in range(LEADERBOARD_USERS):
+        board.update(f"user{i}", (i * 7919) % 6000)
+    return board
+
+
+def bench_leaderboard_update(benchmark, leaderboard):
+    """Move one of 50k users to a new rank point total and back"""
+    def update():
+        leaderboard.update("user123", 5999)
+        leaderboard.update("user123", 0)
+
+    benchmark(update)
+
+
+def bench_leaderboard_standing(benchmark, leaderboard):
+    """Position, percentile and top 10 among 50k users"""
+    def standing():
+        leaderboard.position("user123")
+        leaderboard.percentile("user123")
+        leaderboard.top(10)
+
+    benchmark(standing)
+
+
+def bench_legacy_total_completed(benchmark, profile):
+    benchmark(legacy_total_completed, profile["completion_history"])
+
+
+def bench_legacy_completion_streak(benchmark, profile):
+    benchmark(legacy_completion_streak, profile["completion_history"], date.today())
+
+
+def bench_legacy_rank_scan(benchmark, profile):
+    def scan(rank_points):
+        for i in range(len(RANK_SYSTEM) - 1, -1, -1):
+            if rank_points >= RANK_SYSTEM[i]["min_points"]:
+                return RANK_SYSTEM[i]
+        return RANK_SYSTEM[0]
+
+    benchmark(scan, profile["rank_points"])
@@ -0,0 +1,161 @@
+"""Script runs and server time per click for the quest actions.
+
+Each action (complete, undo, add, delete, reset, start season) is performed
+on a fresh AppTest session after one warm-up run of its page. The report
+lists how many times the script body ran for the click and the server time
+those runs took, median over --repeat sessions. Script runs are
+counted by wrapping ScriptRunner._run_script, which also handles the
+reruns st.rerun() triggers.
+
+    python benchmarks/clicks.py
+    python benchmarks/clicks.py --json clicks.json
+
+To compare with another revision, check it out in a worktree and point
+--root at it:
+
+    git worktree add /tmp/before <rev>
+    python benchmarks/clicks.py --root /tmp/before
+
+Profiles are written to a temporary database (SOLO_DB_PATH), never to
+data/tracker.db.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def find(widgets, label):
+    """First widget with the given label, or None"""
+    return next((w for w in widgets if w.label == label), None)
+
+
+def complete(at):
+    return find(at.button, "✓")
+
+
+def undo(at):
+    return find(at.button, "❌")
+
+
+def add_quest(at):
+    name = find(at.text_input, "Quest Name")
+    if name is None:
+        return None
+    name.input("Benchmark Quest")
+    return find(at.button, "Add Quest")
+
+
+def delete_quest(at):
+    return next((b for b in at.button if b.label.startswith("Delete '")), None)
+
+
+def reset_progress(at):
+    confirm = find(at.checkbox, "I understand this will reset all progress")
+    if confirm is not None:
+        # Apply the tick so the button is enabled when it is looked up
+        confirm.check().run()
+    return find(at.button, "Reset Progress")
+
+
+def start_season(at):
+    return find(at.button, "Start New Season")
+
+
+# (app, page, action, prepare) where prepare(at) sets inputs and returns the button to click
+ACTIONS = [
+    ("daily_tracker.py", "Daily Quests", "complete", complete),
+    ("daily_tracker.py", "Daily Quests", "undo", undo),
+    ("daily_tracker.py", "Daily Quests", "add quest", add_quest),
+    ("daily_tracker.py", "Settings", "delete quest", delete_quest),
+    ("daily_tracker.py", "Settings", "reset progress", reset_progress),
+    ("daily_tracker.py", "Settings", "start season", start_season),
+    ("solo.py", "Daily Quests", "complete", complete),
+    ("solo.py", "Daily Quests", "add quest", add_quest),
+    ("solo.py", "Settings", "reset progress", reset_progress),
+    ("solo.py", "Settings", "start season", start_season),
+]
+
+
+class RunCounter:
+    """Counts script runs and their total time by wrapping ScriptRunner._run_script"""
+
+    def __init__(self):
+        from streamlit.runtime.scriptrunner.script_runner import ScriptRunner
+        self.count = 0
+        self.seconds = 0.0
+        original = ScriptRunner._run_script
+
+        def counted(runner, rerun_data):
+            self.count += 1
+            started = time.perf_counter()
+            try:
+                return original(runner, rerun_data)
+            finally:
+                self.seconds += time.perf_counter() - started
+
+        ScriptRunner._run_script = counted
+
+
+def measure(root, app, page, prepare, counter):
+    """Script runs and seconds for one click, or None if the page has no such button"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(root, app), default_timeout=60)
+    at.session_state["page"] = page
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"{app} {page}: {[str(e.value) for e in at.exception]}")
+    button = prepare(at)
+    if button is None or button.disabled:
+        return None
+    counter.count = 0
+    counter.seconds = 0.0
+    button.click().run()
+    if at.exception:
+        raise RuntimeError(f"{app} {page}: {[str(e.value) for e in at.exception]}")
+    return {"runs": counter.count, "seconds": counter.seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=ROOT, help="checkout whose apps are measured (default: this one)")
+    parser.add_argument("--repeat", type=int, default=5, help="sessions per action (median is reported)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH")
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    counter = RunCounter()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SOLO_DB_PATH"] = os.path.join(tmp, "bench.db")
+        os.chdir(root)
+        sys.path.insert(0, root)
+        for app, page, action, prepare in ACTIONS:
+            runs = [measure(root, app, page, prepare, counter) for _ in range(args.repeat)]
+            runs = [r for r in runs if r is not None]
+            if not runs:
+                print(f"{app:<18} {action:<15} skipped (no such button)")
+                continue
+            row = {
+                "app": app,
+                "action": action,
+                "script_runs": statistics.median(r["runs"] for r in runs),
+                "server_s": statistics.median(r["seconds"] for r in runs),
+            }
+            results.append(row)
+            print(f"{app:<18} {action:<15} script runs {row['script_runs']:3.0f}  "
+                  f"server {row['server_s'] * 1000:7.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Shared fixtures for the benchmark suite (see bench_core.py)."""
+import copy
+import functools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate_profile  # noqa: E402
+
+SCALES = (1, 100, 10_000)
+QUESTS = 20
+
+
+@functools.lru_cache(maxsize=None)
+def _profile(days):
+    return generate_profile(days, QUESTS, seed=days)
+
+
+@pytest.fixture(params=SCALES, ids=lambda days: f"{days}d")
+def profile(request):
+    """A fresh copy of the synthetic profile for each scale"""
+    return copy.deepcopy(_profile(request.param))
+
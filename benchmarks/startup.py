@@ -0,0 +1,149 @@
+"""Cold-start benchmark for the Streamlit entry points and the solo CLI.
+
+Every measurement runs in a fresh interpreter so nothing is already
+imported. For each app and page it reports the process wall time, the time
+to import Streamlit, the time of the page's first script run (under
+streamlit.testing's AppTest) and whether pandas / Plotly were loaded. For
+each CLI command it reports the process wall time next to that of a bare
+interpreter.
+
+    python benchmarks/startup.py                    # every app and page
+    python benchmarks/startup.py --app daily_tracker.py --repeat 5
+    python benchmarks/startup.py --cli
+    python benchmarks/startup.py --json startup.json
+
+Profiles are written to a temporary database (SOLO_DB_PATH), never to
+data/tracker.db.
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGES = {
+    "daily_tracker.py": [
+        "Dashboard", "Daily Quests", "Statistics", "Season History", "Leaderboard", "Achievements", "Settings",
+    ],
+    "solo.py": ["Dashboard", "Daily Quests", "Statistics", "Settings"],
+}
+
+HEAVY_MODULES = ("pandas", "plotly")
+
+# {day} becomes a new day on every run, since a quest is only completed once a day
+CLI_COMMANDS = (["status"], ["stats"], ["complete", "1", "--day", "{day}"], ["export"])
+
+
+def run_child(app, page):
+    """Render one page in this (fresh) process and print timings as JSON"""
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    imported = time.perf_counter()
+
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=60)
+    at.session_state["page"] = page
+    at.run()
+    rendered = time.perf_counter()
+
+    print(json.dumps({
+        "import_s": imported - started,
+        "first_render_s": rendered - imported,
+        "errors": [str(e.value) for e in at.exception],
+        "loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def measure(app, page, db_path):
+    """Spawn a child process for one page and collect its timings"""
+    env = dict(os.environ, SOLO_DB_PATH=db_path)
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", app, page],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_s"] = time.perf_counter() - started
+    return result
+
+
+def time_process(argv, env):
+    """Wall time of one child process"""
+    started = time.perf_counter()
+    subprocess.run(argv, cwd=ROOT, env=env, capture_output=True, check=True)
+    return time.perf_counter() - started
+
+
+def measure_cli(db_path, repeat):
+    """Median process time of each CLI command and of a bare interpreter"""
+    env = dict(os.environ, SOLO_DB_PATH=db_path)
+    bare = statistics.median(time_process([sys.executable, "-c", "pass"], env) for _ in range(repeat))
+    days = (date(2000, 1, 1) + timedelta(days=n) for n in itertools.count())
+
+    def run(argv):
+        day = next(days).isoformat()
+        return time_process([arg.replace("{day}", day) for arg in argv], env)
+
+    # Only complete starts a profile; the other commands need one to exist
+    run([sys.executable, os.path.join(ROOT, "cli.py"), "complete", "1", "--day", "{day}"])
+    results = []
+    for command in CLI_COMMANDS:
+        argv = [sys.executable, os.path.join(ROOT, "cli.py")] + command
+        row = {"app": "cli.py", "page": " ".join(command[:2]), "interpreter_s": bare}
+        row["process_s"] = statistics.median(run(argv) for _ in range(repeat))
+        results.append(row)
+        print(
+            f"{'cli.py':<18} {row['page']:<13} process {row['process_s'] * 1000:7.0f} ms  "
+            f"bare interpreter {bare * 1000:6.0f} ms"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=sorted(PAGES), action="append", help="entry point(s) to measure")
+    parser.add_argument("--cli", action="store_true", help="only measure the CLI commands")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per page (median is reported)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH")
+    parser.add_argument("--child", nargs=2, metavar=("APP", "PAGE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        # Create the profile up front so every measured run loads an existing one
+        measure("daily_tracker.py", "Settings", db_path)
+        if args.cli or not args.app:
+            results += measure_cli(db_path, args.repeat)
+        for app in [] if args.cli else args.app or sorted(PAGES):
+            for page in PAGES[app]:
+                runs = [measure(app, page, db_path) for _ in range(args.repeat)]
+                row = {"app": app, "page": page, "loaded": runs[-1]["loaded"], "errors": runs[-1]["errors"]}
+                for field in ("process_s", "import_s", "first_render_s"):
+                    row[field] = statistics.median(r[field] for r in runs)
+                results.append(row)
+                print(
+                    f"{app:<18} {page:<13} process {row['process_s'] * 1000:7.0f} ms  "
+                    f"streamlit import {row['import_s'] * 1000:6.0f} ms  "
+                    f"first render {row['first_render_s'] * 1000:6.0f} ms  "
+                    f"loaded: {', '.join(row['loaded']) or '-'}"
+                    + (f"  ERRORS: {row['errors']}" if row["errors"] else "")
+                )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Seeded synthetic profiles for benchmarks.
+
+``generate_profile(days, quests)`` builds a user_data dict whose history
+covers ``days`` days ending today with ``quests`` quests. Each quest has a
+completion rate that depends on its difficulty, weekends are a little
+lazier, and about one day in twenty is skipped entirely, so streaks break
+now and then. Level, rank and achievements are derived from the history
+with the same rules the tracker applies.
+"""
+import random
+from datetime import date, timedelta
+
+from achievements import ENGINE
+from rules import apply_completions, get_task_exp
+from streaks import StreakTracker
+
+DIFFICULTY_WEIGHTS = {"common": 0.6, "rare": 0.25, "epic": 0.12, "legendary": 0.03}
+COMPLETION_RATES = {"common": 0.75, "rare": 0.5, "epic": 0.3, "legendary": 0.12}
+CATEGORIES = ("fitness", "learning", "wellness", "productivity", "mindfulness", "creativity", "social")
+
+WEEKEND_FACTOR = 0.7
+SKIP_DAY_RATE = 0.05
+
+
+def generate_tasks(quests, rng):
+    """Quest dicts with ids 1..quests"""
+    difficulties = list(DIFFICULTY_WEIGHTS)
+    weights = list(DIFFICULTY_WEIGHTS.values())
+    return [
+        {
+            "id": task_id,
+            "name": f"Quest {task_id}",
+            "difficulty": rng.choices(difficulties, weights)[0],
+            "exp": rng.randrange(5, 105, 5),
+            "category": rng.choice(CATEGORIES),
+        }
+        for task_id in range(1, quests + 1)
+    ]
+
+
+def generate_history(tasks, days, rng, end=None):
+    """{"YYYY-MM-DD": [task_id, ...]} for the days ending on end (default today)"""
+    end = end or date.today()
+    rates = [(task["id"], COMPLETION_RATES[task["difficulty"]]) for task in tasks]
+    history = {}
+    for offset in range(days - 1, -1, -1):
+        day = end - timedelta(days=offset)
+        if rng.random() < SKIP_DAY_RATE:
+            continue
+        factor = WEEKEND_FACTOR if day.weekday() >= 5 else 1.0
+        completed = [task_id for task_id, rate in rates if rng.random() < rate * factor]
+        if completed:
+            history[day.isoformat()] = completed
+    return history
+
+
+def generate_profile(days, quests=20, seed=0, end=None):
+    """A complete user_data dict with derived level, rank and achievements"""
+    rng = random.Random(seed)
+    tasks = generate_tasks(quests, rng)
+    history = generate_history(tasks, days, rng, end)
+    user = {
+        "current_season": 1,
+        "level": 1,
+        "experience": 0,
+        "exp_needed": 100,
+        "rank": "BRONZE",
+        "rank_points": 0,
+        "daily_tasks": tasks,
+        "completion_history": history,
+        "achievements": [],
+        "last_level_up": None,
+    }
+    exp_by_id = {task["id"]: get_task_exp(task) for task in tasks}
+    completions = sum(len(ids) for ids in history.values())
+    exp_earned = sum(exp_by_id[task_id] for ids in history.values() for task_id in ids)
+    apply_completions(user, exp_earned, completions, "2000-01-01 00:00")
+    ENGINE.backfill(user, completions, StreakTracker.from_history(history).longest)
+    return user
@@ -0,0 +1,72 @@
+"""Indexed view of a profile's quests and of each day's completions."""
+
+
+class TaskCatalog:
+    """Task lookups by id, category and difficulty plus per-day completion sets"""
+
+    def __init__(self, daily_tasks, completion_history):
+        self._history = completion_history
+        self.by_id = {}
+        self.by_category = {}
+        self.by_difficulty = {}
+        self.max_id = 0
+        self._completed = {}
+        for task in daily_tasks:
+            self.add_task(task)
+
+    def __contains__(self, task_id):
+        return task_id in self.by_id
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get(self, task_id):
+        """Task dict for an id, or None"""
+        return self.by_id.get(task_id)
+
+    def tasks(self, category=None, difficulty=None):
+        """Tasks in display order, optionally filtered"""
+        if category is not None:
+            tasks = self.by_category.get(category, {}).values()
+            if difficulty is not None:
+                tasks = [t for t in tasks if t["difficulty"] == difficulty]
+            return list(tasks)
+        if difficulty is not None:
+            return list(self.by_difficulty.get(difficulty, {}).values())
+        return list(self.by_id.values())
+
+    def next_id(self):
+        """Id for a newly added quest"""
+        return self.max_id + 1
+
+    def add_task(self, task):
+        """Index a quest"""
+        task_id = task["id"]
+        self.by_id[task_id] = task
+        self.by_category.setdefault(task.get("category"), {})[task_id] = task
+        self.by_difficulty.setdefault(task["difficulty"], {})[task_id] = task
+        self.max_id = max(self.max_id, task_id)
+
+    def remove_task(self, task_id):
+        """Drop a quest from every index"""
+        task = self.by_id.pop(task_id, None)
+        if task is not None:
+            self.by_category[task.get("category")].pop(task_id, None)
+            self.by_difficulty[task["difficulty"]].pop(task_id, None)
+        return task
+
+    def completed_on(self, day):
+        """Set of task ids completed on day"""
+        completed = self._completed.get(day)
+        if completed is None:
+            completed = self._completed[day] = set(self._history.get(day, ()))
+        return completed
+
+    def mark_completed(self, day, task_id):
+        """Record a completion in the day's set"""
+        self.completed_on(day).add(task_id)
+
+    def mark_undone(self, day, task_id):
+        """Remove a completion from the day's set, once the day's history no longer holds the id"""
+        if task_id not in self._history.get(day, ()):
+            self.completed_on(day).discard(task_id)
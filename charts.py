@@ -0,0 +1,173 @@
+"""Plotly figures for the Dashboard and Statistics pages, cached by data version.
+
+The tracker bumps a per-profile version on every completion, undo, task
+edit, reset and season change. Figures are cached under (name, version,
+extra key), so flipping between pages reuses them until the data changes.
+pandas and Plotly are imported by the builders on first use, so pages that
+draw no chart never load them.
+"""
+from collections import OrderedDict
+
+from profiling import timed
+from rules import RANK_SYSTEM
+
+FIGURE_CACHE_SIZE = 32
+
+
+class FigureCache:
+    """Small LRU of built figures"""
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build, *args):
+        """Cached value for key, calling build(*args) on a miss"""
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+        self.misses += 1
+        with timed(f"figure_build:{key[0] if isinstance(key, tuple) else key}"):
+            value = entries[key] = build(*args)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Drop every cached figure"""
+        self._entries.clear()
+
+
+def level_progress_figure(experience, exp_needed):
+    """Bar chart of current versus needed EXP"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[
+        go.Bar(
+            x=["Current", "Needed"],
+            y=[experience, exp_needed],
+            marker_color=['#667eea', '#764ba2']
+        )
+    ])
+    fig.update_layout(height=300, showlegend=False)
+    return fig
+
+
+def rank_progression_figure(rank_tier):
+    """Bar chart of rank thresholds, highlighting tiers up to rank_tier"""
+    import pandas as pd
+    import plotly.express as px
+
+    df_ranks = pd.DataFrame([
+        {"Rank": rank["rank"], "Points": rank["min_points"], "Current": i <= rank_tier}
+        for i, rank in enumerate(RANK_SYSTEM)
+    ])
+    fig = px.bar(
+        df_ranks,
+        x="Rank",
+        y="Points",
+        color="Current",
+        color_discrete_map={True: '#FF6347', False: '#95a5a6'}
+    )
+    fig.update_layout(height=300, showlegend=False)
+    return fig
+
+
+def calendar_figure(day_counts, first_ordinal):
+    """Calendar heatmap (weeks x weekdays) of per-day counts starting at first_ordinal"""
+    from datetime import date
+
+    import numpy as np
+    import plotly.graph_objects as go
+
+    # Pad to whole Monday-first weeks; padding days stay blank (NaN)
+    lead = date.fromordinal(first_ordinal).weekday()
+    weeks = -(-(lead + len(day_counts)) // 7)
+    cells = np.full(weeks * 7, np.nan)
+    cells[lead:lead + len(day_counts)] = day_counts
+    days = np.datetime64(date.fromordinal(first_ordinal - lead)) + np.arange(weeks * 7)
+    labels = days.astype(str).reshape(weeks, 7)
+
+    fig = go.Figure(data=go.Heatmap(
+        z=cells.reshape(weeks, 7).T,
+        x=labels[:, 0],
+        y=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+        customdata=labels.T,
+        hovertemplate="%{customdata}: %{z} quests<extra></extra>",
+        colorscale="Greens",
+        xgap=2,
+        ygap=2,
+    ))
+    fig.update_layout(height=260, yaxis_autorange="reversed")
+    return fig
+
+
+def trend_figure(series, categories):
+    """Stacked per-category completions with an EXP line, one bar per rollup period"""
+    import plotly.graph_objects as go
+
+    periods = [key for key, _ in series]
+    fig = go.Figure()
+    for category in categories:
+        fig.add_trace(go.Bar(
+            x=periods, y=[row["categories"].get(category, 0) for _, row in series], name=str(category)
+        ))
+    fig.add_trace(go.Scatter(
+        x=periods, y=[row["exp"] for _, row in series], name="EXP", yaxis="y2", mode="lines+markers"
+    ))
+    fig.update_layout(
+        height=400,
+        barmode="stack",
+        xaxis_type="category",
+        yaxis_title="Completions",
+        yaxis2=dict(title="EXP", overlaying="y", side="right", showgrid=False),
+    )
+    return fig
+
+
+def task_stats_figure(daily_tasks, task_counts, difficulty_colors):
+    """Bar chart of completions per quest, most completed first"""
+    import pandas as pd
+    import plotly.express as px
+
+    df_stats = pd.DataFrame({
+        "Quest": [task["name"] for task in daily_tasks],
+        "Completed": [task_counts.get(task["id"], 0) for task in daily_tasks],
+        "Difficulty": [task["difficulty"] for task in daily_tasks],
+    }).sort_values("Completed", ascending=False)
+    fig = px.bar(
+        df_stats,
+        x="Quest",
+        y="Completed",
+        color="Difficulty",
+        color_discrete_map=difficulty_colors
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def category_figure(category_counts):
+    """Pie chart of completions per category"""
+    import pandas as pd
+    import plotly.express as px
+
+    df_cat = pd.DataFrame({"Category": list(category_counts), "Count": list(category_counts.values())})
+    return px.pie(df_cat, values="Count", names="Category", title="Completion Distribution")
+
+
+def quest_totals_figure(totals):
+    """Bar chart of completions per quest name"""
+    import pandas as pd
+    import plotly.express as px
+
+    df_totals = pd.DataFrame({"Quest": list(totals), "Completed": list(totals.values())})
+    fig = px.bar(df_totals, x="Quest", y="Completed")
+    fig.update_layout(height=400)
+    return fig
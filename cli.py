@@ -0,0 +1,267 @@
+"""``solo`` command line: complete, undo, status, stats and export on stored profiles.
+
+Runs the same GameEngine as the Streamlit apps, so a completion from a cron
+job or a shell hook earns exactly what the ✓ button would. It never imports
+Streamlit, pandas, Plotly or NumPy, so a command starts in well under
+100 ms.
+
+    python cli.py complete 7                       # quest id, or a unique part of its name
+    python cli.py complete water --day 2024-05-01
+    python cli.py undo 7
+    python cli.py --user bob status --json
+    python cli.py stats
+    python cli.py export --format csv -o bob.csv
+    python cli.py batch < backfill.txt             # one command per line, e.g. "--user bob complete 3 --day ..."
+
+The database is SOLO_DB_PATH (default data/tracker.db) and the user
+SOLO_USER (default Adventurer); --db and --user override them. A running
+app keeps its loaded profiles in memory, so while it is up prefer the
+HTTP API (api.py), which changes the app's own copy.
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+from datetime import date
+
+from engine import GameEngine, get_today_key
+from leaderboard import Leaderboards
+from rules import ACHIEVEMENTS
+from storage import DEFAULT_DB_PATH, ProfileStore
+
+DEFAULT_USER_ID = os.environ.get("SOLO_USER", "Adventurer")
+
+
+class CommandError(Exception):
+    """A command that cannot be carried out (unknown quest, bad day, ...)"""
+
+
+def _day(value):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid day {value!r} (expected YYYY-MM-DD)") from None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="solo", description=__doc__.split("\n\n")[0], formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--db", help="profile database (default SOLO_DB_PATH or data/tracker.db)")
+    parser.add_argument("--user", help=f"profile to use (default {DEFAULT_USER_ID})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("complete", "complete a quest"), ("undo", "undo a completion")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("task", help="quest id, or a unique part of its name")
+        command.add_argument("--day", type=_day, help="YYYY-MM-DD (default today)")
+        command.add_argument("--json", action="store_true", help="print the result as JSON")
+
+    for name, help_text in (("status", "level, EXP, rank and streak"), ("stats", "completion statistics")):
+        commands.add_parser(name, help=help_text).add_argument("--json", action="store_true")
+
+    export = commands.add_parser("export", help="write quests and history as JSON Lines or CSV")
+    export.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    export.add_argument("-o", "--output", help="file to write (default stdout)")
+
+    batch = commands.add_parser(
+        "batch", help="run one command per stdin line; lines before a failed one stay applied"
+    )
+    batch.add_argument("--keep-going", action="store_true", help="report failed lines and continue")
+    return parser
+
+
+def find_task(engine, ref):
+    """Quest dict for an id or a case-insensitive unique part of its name"""
+    if ref.isdigit():
+        task = engine.catalog.get(int(ref))
+        if task is None:
+            raise CommandError(f"no quest with id {ref}")
+        return task
+    matches = [task for task in engine.catalog.tasks() if ref.casefold() in task["name"].casefold()]
+    if len(matches) != 1:
+        names = ", ".join(f"{task['id']}: {task['name']}" for task in matches)
+        raise CommandError(f"{ref!r} matches {len(matches)} quests" + (f" ({names})" if names else ""))
+    return matches[0]
+
+
+def stats(engine):
+    """Totals, active days and per-quest and per-category completion counts"""
+    aggregates = engine.aggregates
+    names = {task["id"]: task["name"] for task in engine.user_data["daily_tasks"]}
+    return {
+        "total_completions": aggregates.total_completions,
+        "active_days": aggregates.active_days,
+        "streak": engine.streak(),
+        "longest_streak": engine.longest_streak,
+        "quests": {
+            names.get(task_id, f"Deleted quest #{task_id}"): count
+            for task_id, count in sorted(aggregates.task_counts.items(), key=lambda item: -item[1])
+        },
+        "categories": dict(sorted(aggregates.category_counts.items(), key=lambda item: -item[1])),
+    }
+
+
+def format_status(info):
+    badges = " ".join(ACHIEVEMENTS[a]["emoji"] for a in info["achievements"] if a in ACHIEVEMENTS)
+    return (
+        f"{info['user']}: level {info['level']} ({info['experience']}/{info['exp_needed']} EXP), "
+        f"{info['rank']} {info['rank_points']} pts, streak {info['streak']} (best {info['longest_streak']}), "
+        f"season {info['season']}" + (f"  {badges}" if badges else "")
+    )
+
+
+def format_stats(info):
+    lines = [
+        f"{info['total_completions']} completions on {info['active_days']} days, "
+        f"streak {info['streak']} (best {info['longest_streak']})",
+    ]
+    lines += [f"  {count:>6}  {name}" for name, count in info["quests"].items()]
+    if info["categories"]:
+        lines.append("by category: " + ", ".join(f"{c or 'none'} {n}" for c, n in info["categories"].items()))
+    return "\n".join(lines)
+
+
+class Session:
+    """The store and the engines opened by one invocation"""
+
+    def __init__(self, db=None, write_behind=False):
+        # One command at a time: a single pooled connection opens fastest
+        self.store = ProfileStore(db or DEFAULT_DB_PATH, pool_size=1)
+        if write_behind:
+            from writer import WriteBehindStore
+            self.store = WriteBehindStore(self.store)
+        self._engines = {}
+
+    def engine(self, user_id, create=False):
+        """Engine of user_id; only with create is a missing profile started"""
+        engine = self._engines.get(user_id)
+        if engine is None:
+            if not create and not self.store.has_profile(user_id):
+                raise CommandError(f"no profile for user {user_id!r}")
+            # An unloaded Leaderboards still keeps the stored longest streak up to date
+            engine = self._engines[user_id] = GameEngine.open(
+                self.store, user_id, leaderboard=Leaderboards(self.store)
+            )
+        return engine
+
+    def close(self):
+        self.store.close()
+
+
+def run(session, args, out, brief=False):
+    """Carry out one parsed command, writing its output to out
+
+    brief leaves the profile status off complete and undo output (batch mode).
+    """
+    user_id = args.user or DEFAULT_USER_ID
+    if args.command == "batch":
+        return run_batch(session, args, out)
+    if args.command == "export":
+        from transfer import export_profile
+
+        if not session.store.has_profile(user_id):
+            raise CommandError(f"no profile for user {user_id!r}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8", newline="") as fp:
+                count = export_profile(session.store, user_id, fp, args.format)
+            print(f"wrote {count} records to {args.output}", file=sys.stderr)
+        else:
+            export_profile(session.store, user_id, out, args.format)
+        return
+
+    engine = session.engine(user_id, create=args.command == "complete")
+    if args.command in ("complete", "undo"):
+        task = find_task(engine, args.task)
+        day = args.day or get_today_key()
+        if args.command == "complete":
+            # Once a day, as the ✓ button only shows for quests not yet done
+            if task["id"] in engine.completed_on(day):
+                raise CommandError(f"{task['name']} is already completed on {day}")
+            awarded = engine.complete_task(task["id"], day)
+            result = {"completed": task["name"], "day": day, "awarded": awarded}
+            text = f"✓ {task['name']} ({day})" + "".join(
+                f"\n🏆 {ACHIEVEMENTS[a]['emoji']} {ACHIEVEMENTS[a]['name']}" for a in awarded
+            )
+        else:
+            if not engine.undo_task(task["id"], day):
+                raise CommandError(f"{task['name']} was not completed on {day}")
+            result = {"undone": task["name"], "day": day}
+            text = f"↩ {task['name']} ({day})"
+        result["status"] = engine.status()
+        if not args.json and not brief:
+            text += "\n" + format_status(result["status"])
+        print(json.dumps(result, ensure_ascii=False) if args.json else text, file=out)
+    elif args.command == "status":
+        info = engine.status()
+        print(json.dumps(info, ensure_ascii=False) if args.json else format_status(info), file=out)
+    elif args.command == "stats":
+        info = stats(engine)
+        print(json.dumps(info, ensure_ascii=False) if args.json else format_stats(info), file=out)
+
+
+def _line_ranges(numbers):
+    """Compact "1-3, 5" form of ascending line numbers"""
+    ranges = []
+    for number in numbers:
+        if ranges and ranges[-1][1] == number - 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ", ".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+def run_batch(session, args, out):
+    """Run the commands on stdin, one per line (blank lines and # comments skipped)
+
+    Each line is applied on its own: a failed line does not undo the lines
+    before it. The applied lines are reported whenever one fails.
+    """
+    parser = build_parser()
+    applied = []
+    failed = 0
+    for number, line in enumerate(sys.stdin, 1):
+        words = shlex.split(line, comments=True)
+        if not words:
+            continue
+        try:
+            try:
+                line_args = parser.parse_args(words)
+            except SystemExit:
+                raise CommandError("invalid command") from None
+            if line_args.command == "batch" or line_args.db:
+                raise CommandError("batch and --db cannot be used inside a batch")
+            line_args.user = line_args.user or args.user
+            run(session, line_args, out, brief=True)
+        except CommandError as exc:
+            failed += 1
+            message = f"line {number}: {exc}"
+            if not args.keep_going:
+                raise CommandError(f"{message}; applied lines: {_line_ranges(applied) or 'none'}") from None
+            print(message, file=sys.stderr)
+        else:
+            applied.append(number)
+    if failed:
+        raise CommandError(f"{failed} line(s) failed; applied lines: {_line_ranges(applied) or 'none'}")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    session = Session(args.db, write_behind=args.command == "batch")
+    try:
+        run(session, args, sys.stdout)
+    except (CommandError, KeyError) as exc:
+        print(f"solo: {exc.args[0] if exc.args else exc}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output piped into e.g. head; point stdout at devnull so the exit flush is quiet
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        session.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
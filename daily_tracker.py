@@ -1,11 +1,29 @@
+import atexit
+import functools
+import io
+import os
 import streamlit as st
-import pandas as pd
-import json
-from datetime import datetime, timedelta
-import plotly.graph_objects as go
-import plotly.express as px
-from collections import defaultdict
-import math
+from datetime import date, datetime
+from charts import (
+    FigureCache, calendar_figure, category_figure, level_progress_figure, rank_progression_figure, task_stats_figure,
+    quest_totals_figure, trend_figure,
+)
+from engine import GameEngine, get_default_user_data, get_today_key
+from leaderboard import LEVEL, RANK_POINTS, STREAK, Leaderboards
+from profiles import ProfileCache
+from profiling import NULL_RERUN, TOTALS, profiled, start_rerun
+from rollups import MONTH, SEASON, WEEK
+from storage import ProfileStore
+from writer import WriteBehindStore
+from rules import ACHIEVEMENTS, DIFFICULTY_EXP, RANK_SYSTEM, get_current_rank, get_rank_index
+
+# Profiling (?profile=1, SOLO_PROFILE=1 or Settings → Advanced) times each part of the
+# rerun and shows the result in a sidebar panel
+if "profiling" not in st.session_state:
+    st.session_state.profiling = bool(os.environ.get("SOLO_PROFILE")) or (
+        st.experimental_get_query_params().get("profile", ["0"])[0] == "1"
+    )
+rerun = start_rerun() if st.session_state.profiling else NULL_RERUN
 
 # Set page config
 st.set_page_config(
@@ -78,43 +96,49 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if "user_data" not in st.session_state:
-    st.session_state.user_data = {
-        "current_season": 1,
-        "level": 1,
-        "experience": 0,
-        "exp_needed": 100,
-        "rank": "BRONZE",
-        "rank_points": 0,
-        "daily_tasks": [
-            {"id": 1, "name": "🏃 Morning Run", "difficulty": "common", "exp": 15, "category": "fitness"},
-            {"id": 2, "name": "📚 Read 30 Minutes", "difficulty": "common", "exp": 20, "category": "learning"},
-            {"id": 3, "name": "🧘 Meditation", "difficulty": "common", "exp": 18, "category": "wellness"},
-            {"id": 4, "name": "💻 Code/Work on Project", "difficulty": "rare", "exp": 50, "category": "productivity"},
-            {"id": 5, "name": "🎓 Learn New Skill", "difficulty": "epic", "exp": 75, "category": "learning"},
-            {"id": 6, "name": "🥗 Eat Healthy Meal", "difficulty": "common", "exp": 12, "category": "wellness"},
-            {"id": 7, "name": "💧 Drink 8 Glasses Water", "difficulty": "common", "exp": 10, "category": "wellness"},
-            {"id": 8, "name": "✍️ Journal/Reflect", "difficulty": "rare", "exp": 35, "category": "mindfulness"},
-            {"id": 9, "name": "🎨 Creative Work", "difficulty": "epic", "exp": 70, "category": "creativity"},
-            {"id": 10, "name": "🤝 Help Someone", "difficulty": "rare", "exp": 40, "category": "social"},
-        ],
-        "completion_history": {},
-        "achievements": [],
-        "last_level_up": None
-    }
+DEFAULT_USER_ID = "Adventurer"
+
+@st.cache_resource
+def get_store():
+    """Open the profile store shared by all sessions; clicks are written behind, drained at exit"""
+    store = WriteBehindStore(ProfileStore())
+    atexit.register(store.close)
+    return store
+
+@st.cache_resource
+def get_leaderboards():
+    """Leaderboards over every stored profile, shared by all sessions"""
+    return Leaderboards.load(get_store())
+
+@st.cache_resource
+def get_profile_cache():
+    """Loaded profiles shared by all sessions, least recently used evicted first"""
+    store = get_store()
+    leaderboards = get_leaderboards()
+    return ProfileCache(lambda user_id: GameEngine.open(store, user_id, leaderboard=leaderboards))
+
+@st.cache_resource
+def get_api_server(port):
+    """HTTP API (api.py) serving the same loaded profiles as the UI"""
+    from api import Api
+    return Api(get_profile_cache(), get_store()).start_in_thread(os.environ.get("SOLO_API_HOST", "127.0.0.1"), port)
 
-# Rank system (similar to PUBG)
-RANK_SYSTEM = [
-    {"rank": "BRONZE", "min_points": 0, "color": "#CD7F32"},
-    {"rank": "SILVER", "min_points": 100, "color": "#C0C0C0"},
-    {"rank": "GOLD", "min_points": 250, "color": "#FFD700"},
-    {"rank": "PLATINUM", "min_points": 500, "color": "#E5E4E2"},
-    {"rank": "DIAMOND", "min_points": 1000, "color": "#B9F2FF"},
-    {"rank": "MASTER", "min_points": 2000, "color": "#8B0000"},
-    {"rank": "GRANDMASTER", "min_points": 3500, "color": "#FFD700"},
-    {"rank": "LEGEND", "min_points": 5000, "color": "#FF6347"},
-]
+store = get_store()
+if os.environ.get("SOLO_API_PORT"):
+    get_api_server(int(os.environ["SOLO_API_PORT"]))
+
+# Each session picks a user: ?user=<name> in the URL, or the Settings username
+if "user_id" not in st.session_state:
+    st.session_state.user_id = st.experimental_get_query_params().get("user", [DEFAULT_USER_ID])[0]
+USER_ID = st.session_state.user_id
+
+def get_engine():
+    """This session's profile; pinning it in the session keeps the cache from loading a second copy"""
+    st.session_state.engine = get_profile_cache().get(st.session_state.user_id)
+    return st.session_state.engine
+
+engine = get_engine()
+rerun.lap("setup")
 
 DIFFICULTY_COLORS = {
     "common": "#95a5a6",
@@ -123,13 +147,6 @@ DIFFICULTY_COLORS = {
     "legendary": "#f39c12"
 }
 
-DIFFICULTY_EXP = {
-    "common": 1,
-    "rare": 1.5,
-    "epic": 2.5,
-    "legendary": 5
-}
-
 # Season info
 SEASONS = {
     1: {"name": "The Awakening", "start_date": "Jan 1", "end_date": "Mar 31"},
@@ -138,6 +155,20 @@ SEASONS = {
     4: {"name": "Eternal Destiny", "start_date": "Oct 1", "end_date": "Dec 31"},
 }
 
+LEADERBOARD_METRICS = {
+    "Rank Points": RANK_POINTS,
+    "Level": LEVEL,
+    "Longest Streak": STREAK,
+}
+
+# Activity calendar ranges, in days
+ACTIVITY_RANGES = {
+    "Last 30 days": 30,
+    "Last year": 365,
+    "Last 2 years": 730,
+    "Last 5 years": 1826,
+}
+
 CATEGORIES = {
     "fitness": "🏋️",
     "learning": "📚",
@@ -148,119 +179,87 @@ CATEGORIES = {
     "social": "👥"
 }
 
-# Achievements system
-ACHIEVEMENTS = {
-    "first_task": {"name": "First Step", "description": "Complete your first task", "emoji": "👣"},
-    "ten_tasks": {"name": "Growing Stronger", "description": "Complete 10 tasks", "emoji": "💪"},
-    "hundred_tasks": {"name": "Unstoppable", "description": "Complete 100 tasks", "emoji": "⚡"},
-    "week_streak": {"name": "On Fire", "description": "Achieve 7-day streak", "emoji": "🔥"},
-    "level_ten": {"name": "Rising Star", "description": "Reach Level 10", "emoji": "⭐"},
-    "rank_gold": {"name": "Golden Champion", "description": "Reach Gold rank", "emoji": "👑"},
-}
+def get_figure_cache():
+    """Figure cache of the current profile, created on first use"""
+    if "figures" not in engine.cache:
+        engine.cache["figures"] = FigureCache()
+    return engine.cache["figures"]
 
-def get_current_rank(rank_points):
-    """Get current rank based on rank points"""
-    for i in range(len(RANK_SYSTEM) - 1, -1, -1):
-        if rank_points >= RANK_SYSTEM[i]["min_points"]:
-            return RANK_SYSTEM[i]
-    return RANK_SYSTEM[0]
-
-def get_exp_needed_for_level(level):
-    """Calculate EXP needed to reach next level (scales with level)"""
-    return 100 + (level - 1) * 50
-
-def check_achievements():
-    """Check and award achievements"""
-    user = st.session_state.user_data
-    total_completed = sum(len(tasks) for tasks in user["completion_history"].values())
-    
-    if total_completed == 1 and "first_task" not in user["achievements"]:
-        user["achievements"].append("first_task")
-        return "first_task"
-    elif total_completed == 10 and "ten_tasks" not in user["achievements"]:
-        user["achievements"].append("ten_tasks")
-        return "ten_tasks"
-    elif total_completed == 100 and "hundred_tasks" not in user["achievements"]:
-        user["achievements"].append("hundred_tasks")
-        return "hundred_tasks"
-    elif get_completion_streak() == 7 and "week_streak" not in user["achievements"]:
-        user["achievements"].append("week_streak")
-        return "week_streak"
-    elif user["level"] == 10 and "level_ten" not in user["achievements"]:
-        user["achievements"].append("level_ten")
-        return "level_ten"
-    elif user["rank"] == "GOLD" and "rank_gold" not in user["achievements"]:
-        user["achievements"].append("rank_gold")
-        return "rank_gold"
-    
-    return None
-
-def add_experience(exp_amount):
-    """Add experience and handle level up"""
-    user = st.session_state.user_data
-    user["experience"] += exp_amount
-    leveled_up = False
-    
-    while user["experience"] >= user["exp_needed"]:
-        user["experience"] -= user["exp_needed"]
-        user["level"] += 1
-        user["rank_points"] += 10  # Bonus rank points per level up
-        user["exp_needed"] = get_exp_needed_for_level(user["level"])
-        user["last_level_up"] = datetime.now().strftime("%Y-%m-%d %H:%M")
-        leveled_up = True
-    
-    # Update rank
-    new_rank = get_current_rank(user["rank_points"])
-    user["rank"] = new_rank["rank"]
-    
-    return leveled_up
-
-def get_today_key():
-    """Get today's date as key"""
-    return datetime.now().strftime("%Y-%m-%d")
-
-def mark_task_complete(task_id):
-    """Mark a task as complete for today"""
-    today = get_today_key()
-    
-    if today not in st.session_state.user_data["completion_history"]:
-        st.session_state.user_data["completion_history"][today] = []
-    
-    # Find task and add experience
-    for task in st.session_state.user_data["daily_tasks"]:
-        if task["id"] == task_id:
-            exp_earned = task["exp"] * DIFFICULTY_EXP.get(task["difficulty"], 1)
-            leveled_up = add_experience(int(exp_earned))
-            st.session_state.user_data["completion_history"][today].append(task_id)
-            st.session_state.user_data["rank_points"] += 5
-            achievement = check_achievements()
-            break
-
-def get_today_completed():
-    """Get completed tasks for today"""
-    today = get_today_key()
-    return st.session_state.user_data["completion_history"].get(today, [])
-
-def get_completion_streak():
-    """Calculate current completion streak"""
-    today = datetime.now()
-    streak = 0
-    
-    for i in range(100):
-        check_date = (today - timedelta(days=i)).strftime("%Y-%m-%d")
-        if check_date in st.session_state.user_data["completion_history"]:
-            if len(st.session_state.user_data["completion_history"][check_date]) > 0:
-                streak += 1
-            else:
-                break
-        else:
-            break
-    
-    return streak
+def cached_figure(name, build, *args):
+    """Figure for the current data version, built on first use"""
+    return get_figure_cache().get((name, engine.version), build, *args)
+
+@profiled("plotly_chart")
+def plotly_chart(fig):
+    """Draw a figure at full width"""
+    st.plotly_chart(fig, use_container_width=True)
+
+# Widget callbacks run before the rerun their click triggers, so each action
+# costs a single script run instead of mutate-then-st.rerun()'s two. They look
+# the profile up at click time: the previous run's engine may have been evicted
+def callback(function):
+    """Widget callback whose time counts toward the rerun it triggers when profiling"""
+    @functools.wraps(function)
+    def wrapper(*args):
+        if st.session_state.get("profiling"):
+            start_rerun(from_callback=True)
+        function(*args)
+    return wrapper
+
+@callback
+def on_complete(task_id):
+    get_engine().complete_task(task_id)
+    st.toast("Quest completed! 🎉")
+
+@callback
+def on_undo(task_id):
+    get_engine().undo_task(task_id)
+
+@callback
+def on_add_task():
+    name = st.session_state.new_task_name
+    if not name:
+        st.toast("Please enter a quest name!", icon="⚠️")
+        return
+    get_engine().add_task(
+        name, st.session_state.new_difficulty, st.session_state.new_exp, st.session_state.new_category
+    )
+    st.session_state.new_task_name = ""
+    st.toast("Quest added! ⚔️")
+
+@callback
+def on_delete_task(task_id):
+    get_engine().delete_task(task_id)
+    st.toast("Quest deleted!")
+
+@callback
+def on_reset():
+    get_engine().reset(get_default_user_data())
+    st.session_state.confirm_reset = False
+    st.toast("Progress reset!")
+
+@callback
+def on_start_season():
+    season = st.session_state.new_season
+    get_engine().start_season(season)
+    st.toast(f"Started Season {season}: {SEASONS[season]['name']}!")
+
+def on_switch_user():
+    username = st.session_state.username.strip()
+    if username:
+        st.session_state.user_id = username
+        st.experimental_set_query_params(user=username)
+
+def on_toggle_profiling():
+    st.session_state.profiling = st.session_state.profiling_toggle
 
 # Sidebar Navigation
 st.sidebar.title("⚔️ Daily Tracker")
-page = st.sidebar.radio("Navigation", ["Dashboard", "Daily Quests", "Statistics", "Achievements", "Settings"])
+page = st.sidebar.radio(
+    "Navigation",
+    ["Dashboard", "Daily Quests", "Statistics", "Season History", "Leaderboard", "Achievements", "Settings"],
+    key="page",
+)
 
 # Main Header
 col1, col2, col3 = st.columns([2, 2, 1])
@@ -268,55 +267,56 @@ col1, col2, col3 = st.columns([2, 2, 1])
 with col1:
     st.markdown(f"""
     <div class='level-container'>
-        <h2>⚔️ LEVEL {st.session_state.user_data['level']}</h2>
-        <p>Experience: {st.session_state.user_data['experience']}/{st.session_state.user_data['exp_needed']}</p>
+        <h2>⚔️ LEVEL {engine.user_data['level']}</h2>
+        <p>Experience: {engine.user_data['experience']}/{engine.user_data['exp_needed']}</p>
     </div>
     """, unsafe_allow_html=True)
     
     # EXP Progress Bar
-    progress = st.session_state.user_data['experience'] / st.session_state.user_data['exp_needed']
+    progress = engine.user_data['experience'] / engine.user_data['exp_needed']
     st.progress(min(progress, 1.0))
 
 with col2:
-    rank_info = get_current_rank(st.session_state.user_data['rank_points'])
+    rank_info = get_current_rank(engine.user_data['rank_points'])
     st.markdown(f"""
     <div class='rank-container'>
         <h2>{rank_info['rank']}</h2>
-        <p>Rank Points: {st.session_state.user_data['rank_points']}</p>
+        <p>Rank Points: {engine.user_data['rank_points']}</p>
     </div>
     """, unsafe_allow_html=True)
 
 with col3:
-    season = SEASONS[st.session_state.user_data['current_season']]
+    season = SEASONS[engine.user_data['current_season']]
     st.markdown(f"""
     <div class='season-container'>
-        <h4>Season {st.session_state.user_data['current_season']}</h4>
+        <h4>Season {engine.user_data['current_season']}</h4>
         <p style='margin: 5px 0;'>{season['name']}</p>
         <small>{season['start_date']} - {season['end_date']}</small>
     </div>
     """, unsafe_allow_html=True)
 
 st.divider()
+rerun.lap("header")
 
 # PAGE: Dashboard
 if page == "Dashboard":
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("📊 Total Tasks", len(st.session_state.user_data["daily_tasks"]))
+        st.metric("📊 Total Tasks", len(engine.user_data["daily_tasks"]))
     
     with col2:
-        today_completed = len(get_today_completed())
-        st.metric("✅ Today Completed", f"{today_completed}/{len(st.session_state.user_data['daily_tasks'])}")
+        today_completed = len(engine.completed_on())
+        st.metric("✅ Today Completed", f"{today_completed}/{len(engine.user_data['daily_tasks'])}")
     
     with col3:
-        streak = get_completion_streak()
+        streak = engine.streak()
         st.metric("🔥 Streak", f"{streak} days")
     
     with col4:
-        next_rank_idx = next((i for i, r in enumerate(RANK_SYSTEM) if r["rank"] == st.session_state.user_data['rank']), 0)
+        next_rank_idx = next((i for i, r in enumerate(RANK_SYSTEM) if r["rank"] == engine.user_data['rank']), 0)
         if next_rank_idx < len(RANK_SYSTEM) - 1:
-            pts_to_next = RANK_SYSTEM[next_rank_idx + 1]["min_points"] - st.session_state.user_data['rank_points']
+            pts_to_next = RANK_SYSTEM[next_rank_idx + 1]["min_points"] - engine.user_data['rank_points']
             st.metric("🎯 Next Rank", f"{pts_to_next} pts")
         else:
             st.metric("🎯 Next Rank", "MAX")
@@ -325,28 +325,26 @@ if page == "Dashboard":
     
     # Today's Tasks Preview with Categories
     st.subheader("📋 Today's Quests")
-    today_tasks = get_today_completed()
+    today_tasks = engine.completed_on()
     
     # Filter tasks by category
     col1, col2 = st.columns([4, 1])
     with col1:
         selected_category = st.selectbox("Filter by Category", ["All"] + list(CATEGORIES.keys()), key="dashboard_filter")
     
-    for task in st.session_state.user_data["daily_tasks"]:
-        if selected_category != "All" and task.get("category") != selected_category:
-            continue
-        
-        is_completed = task["id"] in today_tasks
-        color = "task-completed" if is_completed else "task-pending"
-        status = "✅" if is_completed else "⭕"
-        exp_amount = task["exp"] * DIFFICULTY_EXP.get(task["difficulty"], 1)
-        category_icon = CATEGORIES.get(task.get("category"), "📌")
-        
-        st.markdown(f"""
-        <div class='{color}'>
-            <b>{status} {task['name']}</b> {category_icon} - {int(exp_amount)} EXP [{task['difficulty'].upper()}]
-        </div>
-        """, unsafe_allow_html=True)
+    with rerun.section("Dashboard: quest list"):
+        for task in engine.catalog.tasks(category=None if selected_category == "All" else selected_category):
+            is_completed = task["id"] in today_tasks
+            color = "task-completed" if is_completed else "task-pending"
+            status = "✅" if is_completed else "⭕"
+            exp_amount = task["exp"] * DIFFICULTY_EXP.get(task["difficulty"], 1)
+            category_icon = CATEGORIES.get(task.get("category"), "📌")
+            
+            st.markdown(f"""
+            <div class='{color}'>
+                <b>{status} {task['name']}</b> {category_icon} - {int(exp_amount)} EXP [{task['difficulty'].upper()}]
+            </div>
+            """, unsafe_allow_html=True)
     
     # Charts
     st.divider()
@@ -354,43 +352,25 @@ if page == "Dashboard":
     
     with col1:
         st.subheader("📈 Level Progress")
-        fig = go.Figure(data=[
-            go.Bar(
-                x=["Current", "Needed"],
-                y=[st.session_state.user_data['experience'], st.session_state.user_data['exp_needed']],
-                marker_color=['#667eea', '#764ba2']
-            )
-        ])
-        fig.update_layout(height=300, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        fig = cached_figure(
+            "level_progress", level_progress_figure,
+            engine.user_data['experience'], engine.user_data['exp_needed']
+        )
+        plotly_chart(fig)
     
     with col2:
         st.subheader("🏆 Rank Progression")
-        rank_data = []
-        for rank in RANK_SYSTEM:
-            rank_data.append({
-                "Rank": rank["rank"],
-                "Points": rank["min_points"],
-                "Current": st.session_state.user_data['rank_points'] >= rank["min_points"]
-            })
-        
-        df_ranks = pd.DataFrame(rank_data)
-        fig = px.bar(
-            df_ranks,
-            x="Rank",
-            y="Points",
-            color="Current",
-            color_discrete_map={True: '#FF6347', False: '#95a5a6'}
-        )
-        fig.update_layout(height=300, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        # Only the highlighted tier changes, so this is keyed on it rather than the data version
+        rank_tier = get_rank_index(engine.user_data['rank_points'])
+        fig = get_figure_cache().get(("ranks", rank_tier), rank_progression_figure, rank_tier)
+        plotly_chart(fig)
 
 # PAGE: Daily Quests
 elif page == "Daily Quests":
     st.subheader("⚔️ Daily Quests")
     st.write(f"**Current Date:** {datetime.now().strftime('%A, %B %d, %Y')}")
     
-    today_completed = get_today_completed()
+    today_completed = engine.completed_on()
     col1, col2, col3 = st.columns([2, 1, 1])
     
     with col1:
@@ -398,7 +378,7 @@ elif page == "Daily Quests":
         selected_category = st.selectbox("Filter by Category", ["All"] + list(CATEGORIES.keys()), key="quests_filter")
     
     with col2:
-        completion_rate = (len(today_completed) / len(st.session_state.user_data["daily_tasks"])) * 100
+        completion_rate = (len(today_completed) / len(engine.user_data["daily_tasks"])) * 100
         st.metric("Completion", f"{completion_rate:.0f}%")
     
     with col3:
@@ -411,19 +391,16 @@ elif page == "Daily Quests":
             st.info(f"**Tasks Completed:** {len(today_completed)}")
         with col2:
             total_exp_today = sum(task["exp"] * DIFFICULTY_EXP.get(task["difficulty"], 1) 
-                                 for task in st.session_state.user_data["daily_tasks"] 
-                                 if task["id"] in today_completed)
+                                 for task in map(engine.catalog.get, today_completed) 
+                                 if task is not None)
             st.info(f"**EXP Earned:** {int(total_exp_today)}")
         with col3:
-            st.info(f"**Streak:** {get_completion_streak()} 🔥")
+            st.info(f"**Streak:** {engine.streak()} 🔥")
     
     st.divider()
     
     # Display tasks with completion buttons
-    for task in st.session_state.user_data["daily_tasks"]:
-        if selected_category != "All" and task.get("category") != selected_category:
-            continue
-        
+    for task in engine.catalog.tasks(category=None if selected_category == "All" else selected_category):
         is_completed = task["id"] in today_completed
         exp_amount = task["exp"] * DIFFICULTY_EXP.get(task["difficulty"], 1)
         category_icon = CATEGORIES.get(task.get("category"), "📌")
@@ -443,20 +420,12 @@ elif page == "Daily Quests":
         
         with col3:
             if not is_completed:
-                if st.button("✓", key=f"task_{task['id']}", help="Complete this task"):
-                    mark_task_complete(task['id'])
-                    st.success("Quest completed! 🎉")
-                    st.rerun()
+                st.button("✓", key=f"task_{task['id']}", help="Complete this task", on_click=on_complete, args=(task['id'],))
             else:
                 st.write("✅")
         
         with col4:
-            if st.button("❌", key=f"undo_{task['id']}", help="Undo completion"):
-                today = get_today_key()
-                if today in st.session_state.user_data["completion_history"]:
-                    if task["id"] in st.session_state.user_data["completion_history"][today]:
-                        st.session_state.user_data["completion_history"][today].remove(task["id"])
-                        st.rerun()
+            st.button("❌", key=f"undo_{task['id']}", help="Undo completion", on_click=on_undo, args=(task["id"],))
     
     st.divider()
     
@@ -465,33 +434,20 @@ elif page == "Daily Quests":
         col1, col2 = st.columns(2)
         
         with col1:
-            new_task_name = st.text_input("Quest Name", placeholder="Enter quest name...")
+            st.text_input("Quest Name", placeholder="Enter quest name...", key="new_task_name")
         
         with col2:
-            new_category = st.selectbox("Category", list(CATEGORIES.keys()))
+            st.selectbox("Category", list(CATEGORIES.keys()), key="new_category")
         
         col3, col4 = st.columns(2)
         
         with col3:
-            new_difficulty = st.selectbox("Difficulty", ["common", "rare", "epic", "legendary"])
+            st.selectbox("Difficulty", ["common", "rare", "epic", "legendary"], key="new_difficulty")
         
         with col4:
-            new_exp = st.number_input("Base EXP", min_value=5, max_value=200, value=10, step=5)
-        
-        if st.button("Add Quest", type="primary"):
-            if new_task_name:
-                new_id = max([t["id"] for t in st.session_state.user_data["daily_tasks"]], default=0) + 1
-                st.session_state.user_data["daily_tasks"].append({
-                    "id": new_id,
-                    "name": new_task_name,
-                    "difficulty": new_difficulty,
-                    "exp": new_exp,
-                    "category": new_category
-                })
-                st.success("Quest added! ⚔️")
-                st.rerun()
-            else:
-                st.error("Please enter a quest name!")
+            st.number_input("Base EXP", min_value=5, max_value=200, value=10, step=5, key="new_exp")
+        
+        st.button("Add Quest", type="primary", on_click=on_add_task)
 
 # PAGE: Statistics
 elif page == "Statistics":
@@ -499,12 +455,14 @@ elif page == "Statistics":
     
     col1, col2, col3 = st.columns(3)
     
+    aggregates = engine.aggregates
+    
     with col1:
-        total_days = len(st.session_state.user_data["completion_history"])
+        total_days = aggregates.active_days
         st.metric("📅 Active Days", total_days)
     
     with col2:
-        total_tasks_completed = sum(len(tasks) for tasks in st.session_state.user_data["completion_history"].values())
+        total_tasks_completed = aggregates.total_completions
         st.metric("✅ Total Tasks Completed", total_tasks_completed)
     
     with col3:
@@ -514,85 +472,157 @@ elif page == "Statistics":
     st.divider()
     
     # Tabs for different stats
-    tab1, tab2, tab3 = st.tabs(["Activity", "Task Performance", "Category Breakdown"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+        ["Activity", "Task Performance", "Category Breakdown", "Weekly", "Monthly", "Seasons"]
+    )
     
     with tab1:
-        if st.session_state.user_data["completion_history"]:
-            st.subheader("📅 Last 30 Days Activity")
-            
-            today = datetime.now()
-            heatmap_data = []
+        if engine.user_data["completion_history"]:
+            st.subheader("📅 Activity Calendar")
             
-            for i in range(29, -1, -1):
-                date = (today - timedelta(days=i)).strftime("%Y-%m-%d")
-                completed = len(st.session_state.user_data["completion_history"].get(date, []))
-                heatmap_data.append({
-                    "Date": date,
-                    "Tasks": completed,
-                })
-            
-            df_heatmap = pd.DataFrame(heatmap_data)
-            
-            fig = px.bar(
-                df_heatmap,
-                x="Date",
-                y="Tasks",
-                color="Tasks",
-                color_continuous_scale="Viridis"
+            activity_range = st.selectbox("Range", list(ACTIVITY_RANGES), key="activity_range")
+            today = date.fromisoformat(get_today_key()).toordinal()
+            first_day = today - ACTIVITY_RANGES[activity_range] + 1
+            fig = get_figure_cache().get(
+                ("activity", engine.version, today, first_day),
+                lambda: calendar_figure(engine.daily_counts.range(first_day, today), first_day)
             )
-            fig.update_layout(height=300, xaxis_tickangle=-45)
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig)
         else:
             st.info("No activity data yet. Start completing tasks!")
     
     with tab2:
         st.subheader("🎯 Task Statistics")
         
-        task_completion = defaultdict(int)
-        for date, task_ids in st.session_state.user_data["completion_history"].items():
-            for task_id in task_ids:
-                task_completion[task_id] += 1
+        task_completion = aggregates.task_counts
         
         if task_completion:
-            stats_data = []
-            for task in st.session_state.user_data["daily_tasks"]:
-                completed = task_completion.get(task["id"], 0)
-                stats_data.append({
-                    "Quest": task["name"],
-                    "Completed": completed,
-                    "Difficulty": task["difficulty"]
-                })
-            
-            df_stats = pd.DataFrame(stats_data).sort_values("Completed", ascending=False)
-            
-            fig = px.bar(
-                df_stats,
-                x="Quest",
-                y="Completed",
-                color="Difficulty",
-                color_discrete_map=DIFFICULTY_COLORS
+            fig = cached_figure(
+                "task_stats", task_stats_figure,
+                engine.user_data["daily_tasks"], task_completion, DIFFICULTY_COLORS
             )
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig)
         else:
             st.info("No task completion data yet.")
     
     with tab3:
         st.subheader("📂 Completion by Category")
         
-        category_completion = defaultdict(int)
-        for date, task_ids in st.session_state.user_data["completion_history"].items():
-            for task_id in task_ids:
-                for task in st.session_state.user_data["daily_tasks"]:
-                    if task["id"] == task_id:
-                        category_completion[task.get("category", "other")] += 1
+        category_completion = aggregates.category_counts
         
         if category_completion:
-            cat_data = [{"Category": cat, "Count": count} for cat, count in category_completion.items()]
-            df_cat = pd.DataFrame(cat_data)
-            
-            fig = px.pie(df_cat, values="Count", names="Category", title="Completion Distribution")
-            st.plotly_chart(fig, use_container_width=True)
+            fig = cached_figure("categories", category_figure, category_completion)
+            plotly_chart(fig)
+    
+    # Trends come from the period rollups, never from the raw history
+    for tab, period, title in (
+        (tab4, WEEK, "📆 Weekly Trend"),
+        (tab5, MONTH, "🗓️ Monthly Trend"),
+        (tab6, SEASON, "🏆 Seasonal Trend"),
+    ):
+        with tab:
+            st.subheader(title)
+            rollups = engine.rollups
+            if rollups.tables[period]:
+                fig = get_figure_cache().get(
+                    (period, engine.version),
+                    lambda: trend_figure(rollups.series(period), rollups.categories())
+                )
+                plotly_chart(fig)
+            else:
+                st.info("No completions yet.")
+
+# PAGE: Season History
+elif page == "Season History":
+    st.subheader("📜 Season History")
+    
+    # Summaries come from the archive metadata; quest and calendar charts read the memory-mapped columns
+    season_archives = engine.archives
+    
+    if not season_archives:
+        st.info("No finished seasons yet. A season is archived here when you start a new one in Settings.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("🏁 Seasons Finished", len(season_archives))
+        
+        with col2:
+            st.metric("✅ Completions", sum(a.meta["completions"] for a in season_archives))
+        
+        with col3:
+            st.metric("⚔️ Best Level", max(a.meta["level"] for a in season_archives))
+        
+        st.dataframe([
+            {
+                "Season": f"{a.season}: {SEASONS.get(a.season, {}).get('name', '')}",
+                "Ended": a.meta["ended"],
+                "Level": a.meta["level"],
+                "Rank": get_current_rank(a.meta["rank_points"])["rank"],
+                "Rank Points": a.meta["rank_points"],
+                "Completions": a.meta["completions"],
+                "Active Days": a.meta["active_days"],
+                "Longest Streak": a.meta["longest_streak"],
+                "Achievements": len(a.meta["achievements"]),
+            }
+            for a in reversed(season_archives)
+        ], use_container_width=True, hide_index=True)
+        
+        st.divider()
+        
+        st.subheader("🎯 Quests Across All Seasons")
+        from archives import task_totals
+        fig = get_figure_cache().get(
+            ("season_quests", engine.version), lambda: quest_totals_figure(task_totals(season_archives))
+        )
+        plotly_chart(fig)
+        
+        st.subheader("📅 Season Calendar")
+        index = st.selectbox(
+            "Season", range(len(season_archives)), key="archive_index",
+            format_func=lambda i: f"Season {season_archives[i].season} (ended {season_archives[i].meta['ended'][:10]})",
+        )
+        archive = season_archives[index]
+        if archive.first_day is None:
+            st.info("No quests were completed that season.")
+        else:
+            fig = get_figure_cache().get(
+                ("season_calendar", engine.version, index),
+                lambda: calendar_figure(archive.day_counts(archive.first_day, archive.last_day), archive.first_day)
+            )
+            plotly_chart(fig)
+
+# PAGE: Leaderboard
+elif page == "Leaderboard":
+    st.subheader("🏅 Leaderboard")
+    
+    leaderboards = get_leaderboards()
+    metric_label = st.radio("Ranked by", list(LEADERBOARD_METRICS), horizontal=True, key="leaderboard_metric")
+    metric = LEADERBOARD_METRICS[metric_label]
+    position, percentile, players = leaderboards.standing(metric, USER_ID)
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("🏅 Your Position", f"#{position}" if position else "-")
+    
+    with col2:
+        st.metric("📊 Percentile", f"{percentile:.0f}%" if percentile is not None else "-")
+    
+    with col3:
+        st.metric("👥 Players", players)
+    
+    st.divider()
+    
+    st.dataframe([
+        {
+            "#": leaderboards.standing(metric, user_id)[0],
+            "Player": f"⭐ {user_id}" if user_id == USER_ID else user_id,
+            metric_label: score,
+            **({"Rank": get_current_rank(score)["rank"]} if metric == RANK_POINTS else {}),
+        }
+        for user_id, score in leaderboards.top(metric, 10)
+    ], use_container_width=True, hide_index=True)
 
 # PAGE: Achievements
 elif page == "Achievements":
@@ -601,15 +631,16 @@ elif page == "Achievements":
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        total_completed = sum(len(tasks) for tasks in st.session_state.user_data["completion_history"].values())
+        total_completed = engine.aggregates.total_completions
         st.metric("Total Completed", total_completed)
     
     with col2:
-        achievements_earned = len(st.session_state.user_data["achievements"])
+        achievements_earned = len(engine.user_data["achievements"])
         st.metric("Achievements", f"{achievements_earned}/{len(ACHIEVEMENTS)}")
     
     with col3:
-        st.metric("Current Streak", f"{get_completion_streak()} 🔥")
+        st.metric("Current Streak", f"{engine.streak()} 🔥")
+        st.caption(f"Longest streak: {engine.streak_tracker.longest} days")
     
     st.divider()
     
@@ -617,8 +648,8 @@ elif page == "Achievements":
     
     with col1:
         st.write("### 🎖️ Earned Achievements")
-        if st.session_state.user_data["achievements"]:
-            for ach_id in st.session_state.user_data["achievements"]:
+        if engine.user_data["achievements"]:
+            for ach_id in engine.user_data["achievements"]:
                 ach = ACHIEVEMENTS.get(ach_id)
                 if ach:
                     st.markdown(f"""
@@ -633,7 +664,7 @@ elif page == "Achievements":
     with col2:
         st.write("### 🎯 Next Achievements")
         for ach_id, ach in ACHIEVEMENTS.items():
-            if ach_id not in st.session_state.user_data["achievements"]:
+            if ach_id not in engine.user_data["achievements"]:
                 st.write(f"**{ach['emoji']} {ach['name']}**")
                 st.caption(ach["description"])
     
@@ -645,12 +676,12 @@ elif page == "Achievements":
     col1, col2 = st.columns(2)
     
     with col1:
-        total_tasks = sum(len(tasks) for tasks in st.session_state.user_data["completion_history"].values())
+        total_tasks = engine.aggregates.total_completions
         st.progress(min(total_tasks / 100, 1.0))
         st.caption(f"Tasks completed: {total_tasks}/100 for 'Unstoppable'")
     
     with col2:
-        streak = get_completion_streak()
+        streak = engine.streak()
         st.progress(min(streak / 7, 1.0))
         st.caption(f"Current streak: {streak}/7 for 'On Fire'")
 
@@ -665,35 +696,32 @@ elif page == "Settings":
         
         with col1:
             st.write("### User Profile")
-            username = st.text_input("Username", value="Adventurer")
+            # Switches this session to another user's profile
+            st.text_input("Username", value=USER_ID, key="username", on_change=on_switch_user)
             
-            if st.session_state.user_data.get("last_level_up"):
-                st.caption(f"Last level up: {st.session_state.user_data['last_level_up']}")
+            if engine.user_data.get("last_level_up"):
+                st.caption(f"Last level up: {engine.user_data['last_level_up']}")
         
         with col2:
             st.write("### Quick Stats")
-            total_exp = sum(len(tasks) for tasks in st.session_state.user_data["completion_history"].values()) * 10
+            total_exp = engine.aggregates.total_completions * 10
             st.metric("Total EXP Earned", int(total_exp))
-            st.metric("Days Active", len(st.session_state.user_data["completion_history"]))
+            st.metric("Days Active", engine.aggregates.active_days)
     
     with tab2:
         st.write("### Manage Your Quests")
         
         task_to_edit = st.selectbox("Select a quest to edit/delete", 
-                                     [t["name"] for t in st.session_state.user_data["daily_tasks"]])
+                                     [t["name"] for t in engine.user_data["daily_tasks"]])
         
-        selected_task = next((t for t in st.session_state.user_data["daily_tasks"] if t["name"] == task_to_edit), None)
+        selected_task = next((t for t in engine.user_data["daily_tasks"] if t["name"] == task_to_edit), None)
         
         if selected_task:
             col1, col2 = st.columns(2)
             
             with col1:
-                if st.button(f"Delete '{task_to_edit}'", type="secondary"):
-                    st.session_state.user_data["daily_tasks"] = [
-                        t for t in st.session_state.user_data["daily_tasks"] if t["id"] != selected_task["id"]
-                    ]
-                    st.success("Quest deleted!")
-                    st.rerun()
+                st.button(f"Delete '{task_to_edit}'", type="secondary",
+                          on_click=on_delete_task, args=(selected_task["id"],))
             
             with col2:
                 if st.button(f"View Details", key="view_details"):
@@ -705,47 +733,93 @@ elif page == "Settings":
         col1, col2 = st.columns(2)
         
         with col1:
-            if st.button("Reset Progress", type="secondary"):
-                if st.checkbox("I understand this will reset all progress"):
-                    st.session_state.user_data = {
-                        "current_season": 1,
-                        "level": 1,
-                        "experience": 0,
-                        "exp_needed": 100,
-                        "rank": "BRONZE",
-                        "rank_points": 0,
-                        "daily_tasks": [
-                            {"id": 1, "name": "🏃 Morning Run", "difficulty": "common", "exp": 15, "category": "fitness"},
-                            {"id": 2, "name": "📚 Read 30 Minutes", "difficulty": "common", "exp": 20, "category": "learning"},
-                            {"id": 3, "name": "🧘 Meditation", "difficulty": "common", "exp": 18, "category": "wellness"},
-                            {"id": 4, "name": "💻 Code/Work on Project", "difficulty": "rare", "exp": 50, "category": "productivity"},
-                            {"id": 5, "name": "🎓 Learn New Skill", "difficulty": "epic", "exp": 75, "category": "learning"},
-                            {"id": 6, "name": "🥗 Eat Healthy Meal", "difficulty": "common", "exp": 12, "category": "wellness"},
-                            {"id": 7, "name": "💧 Drink 8 Glasses Water", "difficulty": "common", "exp": 10, "category": "wellness"},
-                            {"id": 8, "name": "✍️ Journal/Reflect", "difficulty": "rare", "exp": 35, "category": "mindfulness"},
-                            {"id": 9, "name": "🎨 Creative Work", "difficulty": "epic", "exp": 70, "category": "creativity"},
-                            {"id": 10, "name": "🤝 Help Someone", "difficulty": "rare", "exp": 40, "category": "social"},
-                        ],
-                        "completion_history": {},
-                        "achievements": [],
-                        "last_level_up": None
-                    }
-                    st.success("Progress reset!")
-                    st.rerun()
+            confirmed = st.checkbox("I understand this will reset all progress", key="confirm_reset")
+            st.button("Reset Progress", type="secondary", disabled=not confirmed, on_click=on_reset)
         
         with col2:
             st.write("### Season Management")
-            new_season = st.selectbox("Change Season", list(SEASONS.keys()))
-            
-            if st.button("Start New Season", type="secondary"):
-                st.session_state.user_data["current_season"] = new_season
-                st.session_state.user_data["level"] = 1
-                st.session_state.user_data["experience"] = 0
-                st.session_state.user_data["rank_points"] = 0
-                st.session_state.user_data["completion_history"] = {}
-                st.session_state.user_data["achievements"] = []
-                st.success(f"Started Season {new_season}: {SEASONS[new_season]['name']}!")
-                st.rerun()
+            st.selectbox("Change Season", list(SEASONS.keys()), key="new_season")
+            st.button("Start New Season", type="secondary", on_click=on_start_season)
+            st.caption("The finished season is archived under Season History.")
+        
+        st.divider()
+        
+        st.write("### Import / Export")
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            export_format = st.radio("Format", ["jsonl", "csv"], horizontal=True, key="export_format")
+            if st.button("📤 Prepare Export"):
+                from transfer import export_profile
+                buffer = io.StringIO()
+                export_profile(store, USER_ID, buffer, export_format)
+                st.download_button(
+                    "Download", buffer.getvalue(), file_name=f"{USER_ID}.{export_format}", mime="text/plain"
+                )
+        
+        with col2:
+            uploaded = st.file_uploader("Import quests and history", type=["jsonl", "csv"])
+            if uploaded is not None and st.button("📥 Import"):
+                from transfer import import_profile
+                try:
+                    with engine.lock:
+                        summary = import_profile(
+                            store, USER_ID, io.TextIOWrapper(uploaded, encoding="utf-8"),
+                            "csv" if uploaded.name.endswith(".csv") else "jsonl",
+                        )
+                except (ValueError, KeyError) as exc:
+                    st.error(f"Import failed, nothing was changed: {exc}")
+                else:
+                    get_profile_cache().evict(USER_ID)
+                    st.success(
+                        f"Imported {summary['completions']} completions and {summary['tasks']} quests "
+                        f"(+{summary['exp']} EXP, now level {summary['level']} {summary['rank']})"
+                    )
+        
+        st.divider()
+        
+        st.write("### Event Log")
+        if st.button("🔁 Rebuild from Event Log"):
+            mismatched = engine.rebuild_from_log()
+            if mismatched is None:
+                st.warning("No events recorded yet.")
+            else:
+                if mismatched:
+                    st.warning(f"Restored from event log: {', '.join(mismatched)}")
+                else:
+                    st.success("Stored progress matches the event log.")
+        
+        if st.button("🧮 Check Consistency"):
+            mismatched = engine.check_consistency()
+            if mismatched:
+                st.warning("Stored progress differs from a recompute of history and EXP ledger:")
+                st.json({field: {"stored": got, "expected": want} for field, (got, want) in mismatched.items()})
+            else:
+                st.success("Level, EXP, rank points and achievements match the history and EXP ledger.")
+        
+        st.divider()
+        
+        st.write("### Storage")
+        metrics = store.metrics()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Queued Changes", metrics["queue_depth"])
+        col2.metric("Last Flush", f"{metrics['last_flush_ms']:.1f} ms")
+        col3.metric("Mean Flush", f"{metrics['mean_flush_ms']:.1f} ms")
+        st.caption(
+            f"{metrics['flushes']} flushes wrote {metrics['flushed_changes']} changes "
+            f"({metrics['coalesced']} coalesced); slowest {metrics['max_flush_ms']:.1f} ms, "
+            f"{metrics['errors']} failed"
+            + (f" (last: {metrics['last_error']})" if metrics["last_error"] else "")
+            + (f"; dropped writes of {', '.join(metrics['dropped_users'])}" if metrics["dropped_users"] else "")
+        )
+        
+        st.divider()
+        
+        st.write("### Profiling")
+        st.checkbox(
+            "Profile reruns", value=st.session_state.profiling, key="profiling_toggle", on_change=on_toggle_profiling
+        )
+        st.caption("Adds a sidebar panel timing each part of the page, with JSON and Prometheus exports.")
         
         st.divider()
         
@@ -774,5 +848,29 @@ elif page == "Settings":
         - 🏆 Season Rotation
         """)
 
+rerun.lap(f"page: {page}")
+
 st.sidebar.divider()
 st.sidebar.write("**Made by Mohd Zeeshan ⚔️ for Daily Champions**")
+
+if st.session_state.profiling:
+    rerun.lap("sidebar")
+    last = rerun.finish()
+    with st.sidebar.expander("🩺 Profiling", expanded=True):
+        st.caption(f"This rerun: {last.seconds * 1000:.1f} ms")
+        st.dataframe(
+            [{"Section": row["name"], "ms": round(row["seconds"] * 1000, 2)} for row in last.to_dict()["sections"]],
+            use_container_width=True, hide_index=True,
+        )
+        st.dataframe(
+            [
+                {"Function": row["name"], "Calls": row["calls"], "ms": round(row["seconds"] * 1000, 2)}
+                for row in last.to_dict()["functions"]
+            ],
+            use_container_width=True, hide_index=True,
+        )
+        st.caption(f"{TOTALS.reruns} profiled reruns in this process")
+        col1, col2 = st.columns(2)
+        col1.download_button("JSON", TOTALS.to_json(last), file_name="profile.json", mime="application/json")
+        col2.download_button("Prometheus", TOTALS.to_prometheus(), file_name="profile.prom", mime="text/plain")
+        st.button("Reset Totals", on_click=TOTALS.reset)
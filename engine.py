@@ -0,0 +1,460 @@
+"""Headless game engine shared by the Streamlit apps, benchmarks and batch jobs.
+
+``GameEngine`` wraps one user's ``user_data`` dict together with the indexes
+derived from it (task catalog, aggregates, period rollups, streak tracker,
+per-day counts) and implements every operation the UIs offer. When given a
+ProfileStore it writes each change through, with its event; without one it
+works purely in memory. With a Leaderboards it also publishes the user's
+rank points, level and longest streak after every change. Nothing here
+imports Streamlit, pandas or Plotly, and NumPy is only loaded if the per-day
+counts are used.
+"""
+import functools
+import threading
+from datetime import date, datetime
+
+from achievements import ENGINE as ACHIEVEMENTS, standing_metrics
+from aggregates import Aggregates
+from catalog import TaskCatalog
+from events import (
+    DERIVED_FIELDS, EXP_GRANTED, PROFILE_CREATED, SEASON_STARTED, TASK_ADDED, TASK_COMPLETED, TASK_DELETED,
+    TASK_UNDONE, EventLog, get_timestamp, new_event,
+)
+from ledger import GRANT, ExpLedger, LedgerEntry, fallback_entry, recompute_progress
+from profiling import profiled, timed
+from rollups import Rollups
+from rules import (
+    COMPLETION_RANK_POINTS, PROGRESSION, apply_experience, apply_rank_points, get_current_rank, get_task_exp,
+    revert_completion,
+)
+from streaks import StreakTracker
+
+DEFAULT_TASKS = [
+    {"id": 1, "name": "🏃 Morning Run", "difficulty": "common", "exp": 15, "category": "fitness"},
+    {"id": 2, "name": "📚 Read 30 Minutes", "difficulty": "common", "exp": 20, "category": "learning"},
+    {"id": 3, "name": "🧘 Meditation", "difficulty": "common", "exp": 18, "category": "wellness"},
+    {"id": 4, "name": "💻 Code/Work on Project", "difficulty": "rare", "exp": 50, "category": "productivity"},
+    {"id": 5, "name": "🎓 Learn New Skill", "difficulty": "epic", "exp": 75, "category": "learning"},
+    {"id": 6, "name": "🥗 Eat Healthy Meal", "difficulty": "common", "exp": 12, "category": "wellness"},
+    {"id": 7, "name": "💧 Drink 8 Glasses Water", "difficulty": "common", "exp": 10, "category": "wellness"},
+    {"id": 8, "name": "✍️ Journal/Reflect", "difficulty": "rare", "exp": 35, "category": "mindfulness"},
+    {"id": 9, "name": "🎨 Creative Work", "difficulty": "epic", "exp": 70, "category": "creativity"},
+    {"id": 10, "name": "🤝 Help Someone", "difficulty": "rare", "exp": 40, "category": "social"},
+]
+
+
+def get_default_user_data(tasks=DEFAULT_TASKS):
+    """Build a fresh profile with the given (default) quests"""
+    return {
+        "current_season": 1,
+        "level": 1,
+        "experience": 0,
+        "exp_needed": 100,
+        "rank": "BRONZE",
+        "rank_points": 0,
+        "daily_tasks": [dict(task) for task in tasks],
+        "completion_history": {},
+        "achievements": [],
+        "last_level_up": None
+    }
+
+
+def get_today_key():
+    """Get today's date as key"""
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def locked(method):
+    """Run an engine method under the engine's lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class GameEngine:
+    """One user's profile, its derived indexes and every game operation"""
+
+    def __init__(self, user_data, user_id=None, store=None, event_log=None, leaderboard=None):
+        self.user_id = user_id
+        self.user_data = user_data
+        self.store = store
+        self.leaderboard = leaderboard
+        self.event_log = event_log if event_log is not None or store is None else EventLog(store)
+        self.lock = threading.RLock()
+        # Bumped on every change; UIs key their caches (e.g. figures) on it
+        self.version = 0
+        # Caller-owned objects derived from the profile, dropped with the indexes
+        self.cache = {}
+        self._catalog = None
+        self._aggregates = None
+        self._rollups = None
+        self._streak_tracker = None
+        self._daily_counts = None
+        # Finished seasons; loaded from the store on first use
+        self._archives = None if store is not None else []
+        # Quests deleted this season, by id; loaded from the store on first use
+        self._retired_tasks = None if store is not None else {}
+        # What each completion changed, for undo; stored profiles keep it in the store
+        self.ledger = ExpLedger() if store is None else None
+
+    @classmethod
+    def open(cls, store, user_id, new_profile=get_default_user_data, leaderboard=None):
+        """Load a stored profile, creating it from new_profile() if missing"""
+        event_log = EventLog(store)
+        user_data = store.load_profile(user_id)
+        if user_data is None:
+            user_data = new_profile()
+            store.create_profile(user_id, user_data, event=new_event(PROFILE_CREATED, get_timestamp(), state=user_data))
+        else:
+            event_log.ensure_baseline(user_id, user_data)
+        engine = cls(user_data, user_id, store, event_log, leaderboard)
+        engine._update_standing()
+        return engine
+
+    # Derived indexes, built on first use
+
+    @property
+    def catalog(self):
+        """Task catalog"""
+        if self._catalog is None:
+            user = self.user_data
+            with timed("build_catalog"):
+                self._catalog = TaskCatalog(user["daily_tasks"], user["completion_history"])
+        return self._catalog
+
+    @property
+    def aggregates(self):
+        """Completion counters"""
+        if self._aggregates is None:
+            user = self.user_data
+            with timed("build_aggregates"):
+                self._aggregates = Aggregates.from_history(user["completion_history"], user["daily_tasks"])
+        return self._aggregates
+
+    @property
+    def rollups(self):
+        """Weekly, monthly and seasonal totals"""
+        if self._rollups is None:
+            user = self.user_data
+            with timed("build_rollups"):
+                self._rollups = Rollups.from_history(
+                    user["completion_history"], user["daily_tasks"], self.retired_tasks.values()
+                )
+        return self._rollups
+
+    @property
+    def retired_tasks(self):
+        """Deleted quests by id, whose completions keep their EXP and category in the rollups"""
+        if self._retired_tasks is None:
+            self._retired_tasks = {task["id"]: task for task in self.store.load_retired_tasks(self.user_id)}
+        return self._retired_tasks
+
+    @property
+    def streak_tracker(self):
+        """Streak index, rebuilt when out of date"""
+        if self._streak_tracker is None or self._streak_tracker.stale:
+            with timed("build_streak_tracker"):
+                self._streak_tracker = StreakTracker.from_history(self.user_data["completion_history"])
+        return self._streak_tracker
+
+    @property
+    def daily_counts(self):
+        """Per-day completion counts for the activity calendar"""
+        if self._daily_counts is None:
+            from activity import DailyCounts
+            with timed("build_daily_counts"):
+                self._daily_counts = DailyCounts.from_history(self.user_data["completion_history"])
+        return self._daily_counts
+
+    @property
+    def archives(self):
+        """Archived seasons, oldest first (memory-mapped when stored)"""
+        if self._archives is None:
+            from archives import SeasonArchive
+            self._archives = [
+                SeasonArchive.open(self.store.archive_path(archive_id), meta)
+                for archive_id, meta in self.store.list_archives(self.user_id)
+            ]
+        return self._archives
+
+    def clear_derived(self):
+        """Drop derived indexes and caches so they are rebuilt on next use"""
+        self._catalog = self._aggregates = self._rollups = None
+        self._streak_tracker = self._daily_counts = None
+        self.cache.clear()
+        self.version += 1
+
+    # Queries
+
+    def completed_on(self, day=None):
+        """Set of task ids completed on day (default today)"""
+        return self.catalog.completed_on(day or get_today_key())
+
+    @profiled("streak")
+    def streak(self, day=None):
+        """Completion streak ending on day (default today)"""
+        return self.streak_tracker.current(date.fromisoformat(day or get_today_key()).toordinal())
+
+    @property
+    def longest_streak(self):
+        return self.streak_tracker.longest
+
+    @property
+    def total_completions(self):
+        return self.aggregates.total_completions
+
+    def status(self):
+        """Level, EXP, rank, streaks and achievements, as the API and CLI report them"""
+        user = self.user_data
+        return {
+            "user": self.user_id,
+            "season": user["current_season"],
+            "level": user["level"],
+            "experience": user["experience"],
+            "exp_needed": user["exp_needed"],
+            "rank": user["rank"],
+            "rank_points": user["rank_points"],
+            "streak": self.streak(),
+            "longest_streak": self.longest_streak,
+            "total_completions": self.total_completions,
+            "achievements": list(user["achievements"]),
+        }
+
+    # Operations
+
+    @profiled("check_achievements")
+    def check_achievements(self, leveled_up=False, rank_changed=False):
+        """Check and award achievements after a completion
+
+        Streak rules are judged on the longest streak, so back-filled days
+        count and the result matches recompute_progress.
+        """
+        return ACHIEVEMENTS.on_task_completed(
+            self.user_data, self.total_completions, self.longest_streak, leveled_up, rank_changed
+        )
+
+    @locked
+    def add_experience(self, exp_amount, save=True, timestamp=None):
+        """Add experience and handle level up"""
+        user = self.user_data
+        timestamp = timestamp or get_timestamp()
+        old_rank = user["rank"]
+        old_level, old_points = user["level"], user["rank_points"]
+        leveled_up = apply_experience(user, exp_amount, timestamp[:16])
+
+        if save:
+            awarded = []
+            if leveled_up:
+                awarded += ACHIEVEMENTS.on_level_up(user)
+            if user["rank"] != old_rank:
+                awarded += ACHIEVEMENTS.on_rank_change(user)
+            entry = LedgerEntry(exp_amount, user["level"] - old_level, user["rank_points"] - old_points, tuple(awarded))
+            if self.ledger is not None:
+                self.ledger.record(*GRANT, entry)
+            self.version += 1
+            self._persist("save_progress", user, entry, event=new_event(EXP_GRANTED, timestamp, exp=exp_amount))
+            self._update_standing()
+
+        return leveled_up
+
+    @profiled("complete_task")
+    @locked
+    def complete_task(self, task_id, day=None):
+        """Mark a task complete on day (default today); awarded achievement ids, or None if no such task"""
+        task = self.catalog.get(task_id)
+        if task is None:
+            return None
+        # Indexes built lazily must see the history before this completion
+        aggregates, rollups, streak_tracker = self.aggregates, self.rollups, self.streak_tracker
+        user = self.user_data
+        day = day or get_today_key()
+        ordinal = date.fromisoformat(day).toordinal()
+        timestamp = get_timestamp()
+        exp_earned = get_task_exp(task)
+        old_rank = user["rank"]
+        old_level, old_points = user["level"], user["rank_points"]
+        leveled_up = self.add_experience(exp_earned, save=False, timestamp=timestamp)
+        day_completed = user["completion_history"].setdefault(day, [])
+        day_completed.append(task_id)
+        apply_rank_points(user, COMPLETION_RANK_POINTS)
+        self.catalog.mark_completed(day, task_id)
+        aggregates.record_completion(day, task)
+        rollups.record_completion(day, task)
+        streak_tracker.add_day(ordinal)
+        if self._daily_counts is not None:
+            self._daily_counts.add(ordinal)
+        awarded = self.check_achievements(leveled_up, user["rank"] != old_rank)
+        entry = LedgerEntry(exp_earned, user["level"] - old_level, user["rank_points"] - old_points, tuple(awarded))
+        if self.ledger is not None:
+            self.ledger.record(day, task_id, entry)
+        self.version += 1
+        self._persist(
+            "record_completion", day, day_completed, user, task_id, entry,
+            event=new_event(TASK_COMPLETED, timestamp, day=day, task_id=task_id, exp=exp_earned)
+        )
+        self._update_standing()
+        return awarded
+
+    @profiled("undo_task")
+    @locked
+    def undo_task(self, task_id, day=None):
+        """Remove a task from a day's completions (default today) and take back what completing it granted"""
+        user = self.user_data
+        day = day or get_today_key()
+        day_completed = user["completion_history"].get(day)
+        if day_completed is None or task_id not in day_completed:
+            return False
+        ordinal = date.fromisoformat(day).toordinal()
+        # Indexes built lazily must see the history before this undo
+        catalog, aggregates, rollups = self.catalog, self.aggregates, self.rollups
+        streak_tracker = self.streak_tracker
+        day_completed.remove(task_id)
+        catalog.mark_undone(day, task_id)
+        task = catalog.get(task_id)
+        aggregates.record_undo(day, task, task_id)
+        rollups.record_undo(day, task if task is not None else self.retired_tasks.get(task_id))
+        if not day_completed:
+            streak_tracker.remove_day(ordinal)
+        if self._daily_counts is not None:
+            self._daily_counts.add(ordinal, -1)
+
+        entry = self._pop_entry(day, task_id) or fallback_entry(task)
+        revert_completion(user, entry.exp)
+        revoked = ACHIEVEMENTS.revoke(
+            user, entry.achievements, standing_metrics(user, self.total_completions, self.longest_streak)
+        )
+        self.version += 1
+        self._persist(
+            "record_undo", day, day_completed, user, task_id,
+            event=new_event(TASK_UNDONE, get_timestamp(), day=day, task_id=task_id, exp=entry.exp, revoked=revoked)
+        )
+        self._update_standing()
+        return True
+
+    @locked
+    def add_task(self, name, difficulty, exp, category=None):
+        """Add a quest and return it"""
+        task = {
+            # A deleted quest's id stays taken while its completions are in the history
+            "id": max(self.catalog.next_id(), max(self.retired_tasks, default=0) + 1),
+            "name": name,
+            "difficulty": difficulty,
+            "exp": exp,
+            "category": category
+        }
+        self.user_data["daily_tasks"].append(task)
+        self.catalog.add_task(task)
+        self.version += 1
+        self._persist("add_task", task, event=new_event(TASK_ADDED, get_timestamp(), task=task))
+        return task
+
+    @locked
+    def delete_task(self, task_id):
+        """Remove a quest (its completions stay in the history); the removed task or None"""
+        task = self.catalog.remove_task(task_id)
+        if task is None:
+            return None
+        self.user_data["daily_tasks"] = [t for t in self.user_data["daily_tasks"] if t["id"] != task_id]
+        self.aggregates.remove_task(task)
+        self.retired_tasks[task_id] = task
+        self.version += 1
+        self._persist("retire_task", task, event=new_event(TASK_DELETED, get_timestamp(), task_id=task_id))
+        return task
+
+    @locked
+    def reset(self, user_data):
+        """Replace the whole profile (Reset Progress), dropping archived seasons"""
+        self.user_data = user_data
+        self.clear_derived()
+        if self.store is not None:
+            self.store.delete_archives(self.user_id)
+            self.store.create_profile(
+                self.user_id, user_data, event=new_event(PROFILE_CREATED, get_timestamp(), state=user_data)
+            )
+            self._archives = None
+        else:
+            self._archives = []
+            self.ledger = ExpLedger()
+        self._retired_tasks = None if self.store is not None else {}
+        self._update_standing()
+
+    @locked
+    def start_season(self, season):
+        """Archive the finished season, then start over: level, EXP, rank points, history and achievements"""
+        from archives import SeasonArchive
+
+        user = self.user_data
+        timestamp = get_timestamp()
+        archive = SeasonArchive.from_profile(user, timestamp, self.longest_streak)
+        user["current_season"] = season
+        user["level"] = 1
+        user["experience"] = 0
+        user["exp_needed"] = PROGRESSION.exp_needed(1)
+        user["rank_points"] = 0
+        user["rank"] = get_current_rank(0)["rank"]
+        user["completion_history"] = {}
+        user["achievements"] = []
+        self.clear_derived()
+        if self.store is None:
+            self.archives.append(archive)
+            self.ledger = ExpLedger()
+        else:
+            self._persist("start_season", user, archive, event=new_event(SEASON_STARTED, timestamp, season=season))
+            # Reopen from disk so the new season is memory-mapped like the others
+            self._archives = None
+        self._retired_tasks = None if self.store is not None else {}
+        self._update_standing()
+
+    @locked
+    def rebuild_from_log(self):
+        """Replay the event log; None if it is empty, else the derived fields it corrected"""
+        rebuilt = self.event_log.rebuild(self.user_id)
+        if rebuilt is None:
+            return None
+        mismatched = [f for f in DERIVED_FIELDS if rebuilt[f] != self.user_data[f]]
+        if mismatched:
+            self.user_data = rebuilt
+            self.clear_derived()
+            self.store.create_profile(self.user_id, rebuilt, keep_ledger=True)
+            self._update_standing()
+        return mismatched
+
+    def check_consistency(self):
+        """Compare the profile with a full recompute from history and ledger; {field: (stored, expected)}"""
+        user = self.user_data
+        if self.store is None:
+            entries = self.ledger.items()
+        else:
+            rows = self.store.load_ledger(self.user_id)
+            entries = ((day, task_id, LedgerEntry(*rest)) for day, task_id, *rest in rows)
+        expected = recompute_progress(
+            user["completion_history"], user["daily_tasks"], entries, self.longest_streak
+        )
+        mismatched = {}
+        for field in DERIVED_FIELDS:
+            stored = user[field]
+            if field == "achievements":
+                stored, expected[field] = sorted(stored), sorted(expected[field])
+            if stored != expected[field]:
+                mismatched[field] = (stored, expected[field])
+        return mismatched
+
+    def _pop_entry(self, day, task_id):
+        """Ledger entry of the newest completion of task_id on day, or None"""
+        if self.store is None:
+            return self.ledger.pop(day, task_id)
+        row = self.store.load_ledger_entry(self.user_id, day, task_id)
+        return None if row is None else LedgerEntry(*row)
+
+    def _update_standing(self):
+        if self.leaderboard is not None and self.user_id is not None:
+            user = self.user_data
+            self.leaderboard.update(self.user_id, user["rank_points"], user["level"], self.longest_streak)
+
+    def _persist(self, method, *args, event=None):
+        if self.store is None:
+            return
+        seq = getattr(self.store, method)(self.user_id, *args, event=event)
+        self.event_log.maybe_snapshot(self.user_id, seq, self.user_data)
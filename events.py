@@ -0,0 +1,193 @@
+"""Append-only event log with snapshot + replay of derived state.
+
+Every state change (completion, undo, EXP grant, task edit, season change,
+profile reset) is stored as an event. ``Replayer`` rebuilds ``user_data``
+from the newest snapshot plus the events recorded after it; the log is
+compacted every time a snapshot is taken so it stays bounded.
+"""
+import json
+from datetime import date, datetime
+
+from achievements import ENGINE
+from rules import (
+    COMPLETION_RANK_POINTS, PROGRESSION, apply_experience, apply_rank_points, get_current_rank, revert_completion,
+)
+from streaks import StreakTracker
+
+SNAPSHOT_INTERVAL = 500
+RETAINED_SNAPSHOTS = 2
+
+PROFILE_CREATED = "profile_created"
+TASK_COMPLETED = "task_completed"
+TASK_UNDONE = "task_undone"
+EXP_GRANTED = "exp_granted"
+TASK_ADDED = "task_added"
+TASK_DELETED = "task_deleted"
+SEASON_STARTED = "season_started"
+
+DERIVED_FIELDS = ("level", "experience", "exp_needed", "rank", "rank_points", "achievements")
+
+
+def get_timestamp():
+    """Current time in the format stored with events"""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def new_event(kind, timestamp, **payload):
+    """Build an event record for ProfileStore"""
+    return (timestamp, kind, json.dumps(payload, separators=(",", ":"), ensure_ascii=False))
+
+
+class Replayer:
+    """Apply events, in order, to a user_data dict"""
+
+    def __init__(self, state=None):
+        self.state = None
+        self.total_completed = 0
+        self.active_days = {}
+        self.streaks = StreakTracker()
+        self._ordinals = {}
+        self._handlers = {
+            PROFILE_CREATED: self._on_profile_created,
+            TASK_COMPLETED: self._on_task_completed,
+            TASK_UNDONE: self._on_task_undone,
+            EXP_GRANTED: self._on_exp_granted,
+            TASK_ADDED: self._on_task_added,
+            TASK_DELETED: self._on_task_deleted,
+            SEASON_STARTED: self._on_season_started,
+        }
+        if state is not None:
+            self._reset(state)
+
+    def run(self, rows):
+        """Apply (seq, ts, kind, payload) rows and return the final state"""
+        handlers = self._handlers
+        loads = json.loads
+        for _seq, ts, kind, payload in rows:
+            handlers[kind](ts, loads(payload))
+        return self.state
+
+    def longest_streak(self):
+        """Longest run of active days so far (streak achievements are judged on it)"""
+        if self.streaks.stale:
+            self.streaks = StreakTracker.from_days(self.active_days)
+        return self.streaks.longest
+
+    def _ordinal(self, day):
+        ordinal = self._ordinals.get(day)
+        if ordinal is None:
+            ordinal = self._ordinals[day] = date.fromisoformat(day).toordinal()
+        return ordinal
+
+    def _reset(self, state):
+        self.state = state
+        history = state["completion_history"]
+        self.total_completed = sum(len(ids) for ids in history.values())
+        self.active_days = {
+            date.fromisoformat(day).toordinal(): len(ids) for day, ids in history.items() if ids
+        }
+        self.streaks = StreakTracker.from_days(self.active_days)
+
+    def _on_profile_created(self, ts, payload):
+        self._reset(payload["state"])
+
+    def _on_task_completed(self, ts, payload):
+        state = self.state
+        day = payload["day"]
+        old_rank = state["rank"]
+        leveled_up = apply_experience(state, payload["exp"], ts[:16])
+        state["completion_history"].setdefault(day, []).append(payload["task_id"])
+        apply_rank_points(state, COMPLETION_RANK_POINTS)
+        self.total_completed += 1
+        ordinal = self._ordinal(day)
+        self.active_days[ordinal] = self.active_days.get(ordinal, 0) + 1
+        if self.active_days[ordinal] == 1:
+            self.streaks.add_day(ordinal)
+        ENGINE.on_task_completed(
+            state, self.total_completed, self.longest_streak(), leveled_up, state["rank"] != old_rank
+        )
+
+    def _on_task_undone(self, ts, payload):
+        day_ids = self.state["completion_history"].get(payload["day"])
+        if day_ids is None or payload["task_id"] not in day_ids:
+            return
+        day_ids.remove(payload["task_id"])
+        # Undo events recorded before the EXP ledger only removed the completion
+        if "exp" in payload:
+            state = self.state
+            revert_completion(state, payload["exp"])
+            for achievement_id in payload.get("revoked", ()):
+                if achievement_id in state["achievements"]:
+                    state["achievements"].remove(achievement_id)
+        self.total_completed -= 1
+        ordinal = self._ordinal(payload["day"])
+        if self.active_days.get(ordinal, 0) > 1:
+            self.active_days[ordinal] -= 1
+        elif self.active_days.pop(ordinal, None) is not None:
+            self.streaks.remove_day(ordinal)
+
+    def _on_exp_granted(self, ts, payload):
+        state = self.state
+        old_rank = state["rank"]
+        if apply_experience(state, payload["exp"], ts[:16]):
+            ENGINE.on_level_up(state)
+        if state["rank"] != old_rank:
+            ENGINE.on_rank_change(state)
+
+    def _on_task_added(self, ts, payload):
+        self.state["daily_tasks"].append(payload["task"])
+
+    def _on_task_deleted(self, ts, payload):
+        self.state["daily_tasks"] = [t for t in self.state["daily_tasks"] if t["id"] != payload["task_id"]]
+
+    def _on_season_started(self, ts, payload):
+        state = self.state
+        state["current_season"] = payload["season"]
+        state["level"] = 1
+        state["experience"] = 0
+        state["exp_needed"] = PROGRESSION.exp_needed(1)
+        state["rank_points"] = 0
+        state["rank"] = get_current_rank(0)["rank"]
+        state["completion_history"] = {}
+        state["achievements"] = []
+        self.total_completed = 0
+        self.active_days = {}
+        self.streaks = StreakTracker()
+
+
+def replay(rows, state=None):
+    """Rebuild user_data from event rows, optionally starting at a snapshot"""
+    return Replayer(state).run(rows)
+
+
+class EventLog:
+    """Snapshot, compaction and rebuild on top of a ProfileStore"""
+
+    def __init__(self, store, snapshot_interval=SNAPSHOT_INTERVAL, retain_snapshots=RETAINED_SNAPSHOTS):
+        self.store = store
+        self.snapshot_interval = snapshot_interval
+        self.retain_snapshots = retain_snapshots
+
+    def ensure_baseline(self, user_id, state):
+        """Snapshot profiles that predate the event log"""
+        if self.store.last_event_seq(user_id) == 0:
+            self.snapshot(user_id, 0, state)
+
+    def maybe_snapshot(self, user_id, seq, state):
+        """Snapshot and compact when seq reaches a snapshot boundary"""
+        if seq and seq % self.snapshot_interval == 0:
+            self.snapshot(user_id, seq, state)
+
+    def snapshot(self, user_id, seq, state):
+        """Store state as of event seq and drop events no longer needed"""
+        self.store.save_snapshot(user_id, seq, json.dumps(state, separators=(",", ":"), ensure_ascii=False))
+        self.store.compact_events(user_id, self.retain_snapshots)
+
+    def rebuild(self, user_id):
+        """Replay the log from the newest snapshot; None if nothing is recorded"""
+        snapshot = self.store.load_snapshot(user_id)
+        seq, state = (snapshot[0], json.loads(snapshot[1])) if snapshot else (0, None)
+        rows = self.store.load_events(user_id, seq)
+        if state is None and (not rows or rows[0][2] != PROFILE_CREATED):
+            return None
+        return replay(rows, state)
@@ -0,0 +1,133 @@
+"""Leaderboards over rank points, level and longest streak.
+
+Each ``Leaderboard`` keeps a list of (-score, user_id) in sorted order plus
+a score per user. Top-K is a slice. A user's position and percentile are
+one bisect (O(log n)). An update is a bisect and a list insert/delete,
+which is a memmove and takes microseconds at tens of thousands of
+profiles. ``Leaderboards`` holds one board per metric for every profile in
+a store. Rank points and level come from the profiles table. The longest
+streak is saved in the streaks table whenever it changes, so loading never
+rescans history except to backfill profiles that predate the table.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from streaks import StreakTracker
+
+RANK_POINTS = "rank_points"
+LEVEL = "level"
+STREAK = "streak"
+METRICS = (RANK_POINTS, LEVEL, STREAK)
+
+
+class Leaderboard:
+    """Users ordered by one score, highest first; ties broken by user id"""
+
+    def __init__(self):
+        self._keys = []
+        self._scores = {}
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, user_id):
+        return user_id in self._scores
+
+    def score(self, user_id):
+        """A user's score, or None if not on the board"""
+        return self._scores.get(user_id)
+
+    def update(self, user_id, score):
+        """Set a user's score; False if it was unchanged"""
+        old = self._scores.get(user_id)
+        if old == score:
+            return False
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+        self._scores[user_id] = score
+        insort(self._keys, (-score, user_id))
+        return True
+
+    def remove(self, user_id):
+        """Take a user off the board"""
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, user_id))]
+
+    def top(self, k):
+        """[(user_id, score)] of the k highest scores"""
+        return [(user_id, -key) for key, user_id in self._keys[:k]]
+
+    def position(self, user_id):
+        """1-based position; users with equal scores share the best one. None if not on the board"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score,)) + 1
+
+    def percentile(self, user_id):
+        """Share of users (in percent, the user included) scoring at most this user's score, or None"""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        higher = bisect_left(self._keys, (-score,))
+        return 100.0 * (len(self._keys) - higher) / len(self._keys)
+
+
+class Leaderboards:
+    """A Leaderboard per metric, shared by every session of a server process"""
+
+    def __init__(self, store=None):
+        self.store = store
+        self.boards = {metric: Leaderboard() for metric in METRICS}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, store):
+        """Fill the boards from every stored profile"""
+        leaderboards = cls(store)
+        streaks = store.load_streaks()
+        for user_id, rank_points, level in store.load_standings():
+            streak = streaks.get(user_id)
+            if streak is None:
+                # Profile predates the streaks table: compute once and keep it
+                streak = StreakTracker.from_history(dict(store.iter_history(user_id))).longest
+                store.save_streak(user_id, streak)
+            leaderboards._set(user_id, rank_points, level, streak)
+        return leaderboards
+
+    def __getitem__(self, metric):
+        return self.boards[metric]
+
+    def __len__(self):
+        return len(self.boards[RANK_POINTS])
+
+    def update(self, user_id, rank_points, level, streak):
+        """Record a user's current standing, saving the streak if it changed"""
+        with self._lock:
+            streak_changed = self._set(user_id, rank_points, level, streak)
+        if streak_changed and self.store is not None:
+            self.store.save_streak(user_id, streak)
+
+    def remove(self, user_id):
+        """Take a user off every board"""
+        with self._lock:
+            for board in self.boards.values():
+                board.remove(user_id)
+
+    def top(self, metric, k=10):
+        """[(user_id, score)] of the k best users on a metric"""
+        with self._lock:
+            return self.boards[metric].top(k)
+
+    def standing(self, metric, user_id):
+        """(position, percentile, players) of a user on a metric"""
+        with self._lock:
+            board = self.boards[metric]
+            return board.position(user_id), board.percentile(user_id), len(board)
+
+    def _set(self, user_id, rank_points, level, streak):
+        boards = self.boards
+        boards[RANK_POINTS].update(user_id, rank_points)
+        boards[LEVEL].update(user_id, level)
+        return boards[STREAK].update(user_id, streak)
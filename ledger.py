@@ -0,0 +1,101 @@
+"""EXP ledger: what each completion and EXP grant changed, so undo can reverse it.
+
+Every completion records a ``LedgerEntry`` with the EXP it granted, the
+levels it gained, the rank points it added (completion points plus level-up
+bonus) and the achievements it awarded. Undo takes the newest entry for
+that (day, task) and reverses it in O(1), without replaying history.
+Stored profiles keep their entries in the store's ledger table, written in
+the same transaction as the completion. In-memory engines use ``ExpLedger``.
+Grants made outside a completion are filed under ``GRANT``.
+
+``recompute_progress`` is the consistency check. It derives level, EXP,
+rank points and achievements from the completion history and the ledger
+alone, for comparison with the stored profile.
+"""
+from typing import NamedTuple
+
+from achievements import ENGINE as ACHIEVEMENTS, standing_metrics
+from rules import COMPLETION_RANK_POINTS, LEVEL_UP_RANK_POINTS, PROGRESSION, get_current_rank, get_task_exp
+
+# Ledger key of EXP granted outside a completion
+GRANT = (None, None)
+
+
+class LedgerEntry(NamedTuple):
+    """Deltas applied by one completion or grant"""
+    exp: int
+    levels: int
+    rank_points: int
+    achievements: tuple
+
+
+def fallback_entry(task):
+    """Entry for a completion recorded before the ledger (or imported): EXP from the quest, nothing awarded"""
+    return LedgerEntry(get_task_exp(task) if task is not None else 0, 0, COMPLETION_RANK_POINTS, ())
+
+
+class ExpLedger:
+    """In-memory ledger: a stack of entries per (day, task_id)"""
+
+    def __init__(self):
+        self._entries = {}
+
+    def __len__(self):
+        return sum(len(stack) for stack in self._entries.values())
+
+    def record(self, day, task_id, entry):
+        """File an entry under (day, task_id)"""
+        self._entries.setdefault((day, task_id), []).append(entry)
+
+    def pop(self, day, task_id):
+        """Remove and return the newest entry for (day, task_id), or None"""
+        stack = self._entries.get((day, task_id))
+        if not stack:
+            return None
+        entry = stack.pop()
+        if not stack:
+            del self._entries[(day, task_id)]
+        return entry
+
+    def items(self):
+        """(day, task_id, entry) for every entry, oldest first per key"""
+        for (day, task_id), stack in self._entries.items():
+            for entry in stack:
+                yield day, task_id, entry
+
+
+def recompute_progress(completion_history, daily_tasks, entries, longest_streak, curve=PROGRESSION):
+    """Level, EXP, rank and achievements implied by the history and ledger
+
+    entries are (day, task_id, LedgerEntry) rows; completions without one
+    count the quest's EXP. Rank points are the completion points plus one
+    level-up bonus per level above 1, as a season starts at level 1 with none.
+    """
+    exp_by_completion = {}
+    granted = 0
+    for day, task_id, entry in entries:
+        if (day, task_id) == GRANT:
+            granted += entry.exp
+        else:
+            exp_by_completion.setdefault((day, task_id), []).append(entry.exp)
+    tasks = {task["id"]: task for task in daily_tasks}
+
+    completions = 0
+    total_exp = granted
+    for day, task_ids in completion_history.items():
+        for task_id in task_ids:
+            recorded = exp_by_completion.get((day, task_id))
+            total_exp += recorded.pop() if recorded else fallback_entry(tasks.get(task_id)).exp
+            completions += 1
+
+    level, experience = curve.resolve(total_exp)
+    rank_points = COMPLETION_RANK_POINTS * completions + LEVEL_UP_RANK_POINTS * (level - 1)
+    progress = {
+        "level": level,
+        "experience": experience,
+        "exp_needed": curve.exp_needed(level),
+        "rank": get_current_rank(rank_points)["rank"],
+        "rank_points": rank_points,
+    }
+    progress["achievements"] = ACHIEVEMENTS.expected(standing_metrics(progress, completions, longest_streak))
+    return progress
@@ -0,0 +1,55 @@
+"""Per-user in-memory state shared by every session of a server process.
+
+``ProfileCache`` keeps the most recently used profiles loaded (as GameEngine
+objects, each with its derived indexes) and evicts the least recently used
+ones beyond its size. Every mutation is written through to the store, so an
+evicted profile is simply reloaded on next use. An evicted profile that a
+session or request still holds is only weakly remembered, and handed out
+again while it lives: two engines of one user would overwrite each other's
+writes.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 256
+
+
+class ProfileCache:
+    """LRU of loaded profiles, calling load(user_id) on a miss"""
+
+    def __init__(self, load, maxsize=DEFAULT_CACHE_SIZE):
+        self.load = load
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        # Evicted profiles, until their last user lets go of them
+        self._retired = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, user_id):
+        return user_id in self._entries
+
+    def get(self, user_id):
+        """Cached profile for user_id, loading it on a miss"""
+        with self._lock:
+            profile = self._entries.get(user_id)
+            if profile is not None:
+                self._entries.move_to_end(user_id)
+                return profile
+            profile = self._retired.pop(user_id, None)
+            if profile is None:
+                profile = self.load(user_id)
+            self._entries[user_id] = profile
+            while len(self._entries) > self.maxsize:
+                evicted_id, evicted = self._entries.popitem(last=False)
+                self._retired[evicted_id] = evicted
+            return profile
+
+    def evict(self, user_id):
+        """Forget a cached profile, so the next get() loads it from the store"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._retired.pop(user_id, None)
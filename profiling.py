@@ -0,0 +1,248 @@
+"""Opt-in timing of app reruns and their hot paths.
+
+A ``Rerun`` collects, for one script run of one session, the wall time of
+page sections and the time and call count of instrumented functions.
+Functions are instrumented with ``@profiled(name)`` or ``with timed(name):``;
+while no rerun is being collected on the current thread (profiling is off,
+or the caller is a batch job or the API) that costs one thread-local lookup.
+Times are inclusive: complete_task includes the check_achievements it calls.
+
+Finished reruns are added to the process-wide ``TOTALS``, which export as
+JSON or in the Prometheus text format.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+_local = threading.local()
+
+
+class Rerun:
+    """Section and function timings of one script run
+
+    Laps split the run into consecutive sections; a section() block may sit
+    inside a lap and is then counted in both.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        # name -> [calls, seconds]
+        self.sections = {}
+        self.functions = {}
+        # Started by a widget callback, which runs before the script
+        self.from_callback = False
+        self._mark = self.started
+
+    def lap(self, name):
+        """Charge the time since the previous lap (or the start) to section name"""
+        now = time.perf_counter()
+        _add(self.sections, name, now - self._mark)
+        self._mark = now
+
+    @contextmanager
+    def section(self, name):
+        """Charge the time spent in the block to section name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _add(self.sections, name, time.perf_counter() - started)
+
+    def add_call(self, name, seconds):
+        _add(self.functions, name, seconds)
+
+    def finish(self):
+        """Stop collecting on this thread and add the run to TOTALS"""
+        self.seconds = time.perf_counter() - self.started
+        if getattr(_local, "rerun", None) is self:
+            _local.rerun = None
+        TOTALS.add(self)
+        return self
+
+    def to_dict(self):
+        return {
+            "seconds": self.seconds,
+            "sections": _rows(self.sections),
+            "functions": _rows(self.functions),
+        }
+
+
+class _NullRerun:
+    """Stands in for a Rerun when profiling is off"""
+
+    def lap(self, name):
+        pass
+
+    @contextmanager
+    def section(self, name):
+        yield
+
+    def finish(self):
+        return self
+
+
+NULL_RERUN = _NullRerun()
+
+
+def start_rerun(from_callback=False):
+    """Collect timings on the current thread until finish()
+
+    Streamlit runs a session's widget callbacks on the script thread just
+    before the script itself, so a callback starts the rerun with
+    from_callback=True and the script then adopts it, callback time and all.
+    """
+    rerun = getattr(_local, "rerun", None)
+    if from_callback:
+        if rerun is None or not rerun.from_callback:
+            rerun = _local.rerun = Rerun()
+            rerun.from_callback = True
+        return rerun
+    if rerun is not None and rerun.from_callback:
+        rerun.from_callback = False
+        rerun.lap("callbacks")
+        return rerun
+    # Anything else is left over from a run that stopped early
+    rerun = _local.rerun = Rerun()
+    return rerun
+
+
+def current():
+    """Rerun being collected on this thread, or None"""
+    return getattr(_local, "rerun", None)
+
+
+def profiled(name):
+    """Decorator timing every call of a function while a rerun is collected"""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            rerun = getattr(_local, "rerun", None)
+            if rerun is None:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                rerun.add_call(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def timed(name):
+    """Time the block as a call of name while a rerun is collected"""
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun.add_call(name, time.perf_counter() - started)
+
+
+class Totals:
+    """Timings summed over every profiled rerun of the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.reruns = 0
+            self.rerun_seconds = 0.0
+            self.max_rerun_seconds = 0.0
+            # name -> [calls, seconds, max seconds of one rerun]
+            self.sections = {}
+            self.functions = {}
+
+    def add(self, rerun):
+        with self._lock:
+            self.reruns += 1
+            self.rerun_seconds += rerun.seconds
+            self.max_rerun_seconds = max(self.max_rerun_seconds, rerun.seconds)
+            for totals, timings in ((self.sections, rerun.sections), (self.functions, rerun.functions)):
+                for name, (calls, seconds) in timings.items():
+                    row = totals.get(name)
+                    if row is None:
+                        totals[name] = [calls, seconds, seconds]
+                    else:
+                        row[0] += calls
+                        row[1] += seconds
+                        row[2] = max(row[2], seconds)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "reruns": self.reruns,
+                "rerun_seconds": self.rerun_seconds,
+                "max_rerun_seconds": self.max_rerun_seconds,
+                "sections": _rows(self.sections),
+                "functions": _rows(self.functions),
+            }
+
+    def to_json(self, last=None):
+        """Totals, plus the last rerun's timings if given"""
+        data = self.to_dict()
+        if last is not None:
+            data["last_rerun"] = last.to_dict()
+        return json.dumps(data, indent=2)
+
+    def to_prometheus(self, prefix="solo"):
+        """Totals in the Prometheus text exposition format"""
+        data = self.to_dict()
+        lines = [
+            f"# HELP {prefix}_reruns_total Profiled script reruns.",
+            f"# TYPE {prefix}_reruns_total counter",
+            f"{prefix}_reruns_total {data['reruns']}",
+            f"# HELP {prefix}_rerun_seconds_total Wall time of profiled reruns.",
+            f"# TYPE {prefix}_rerun_seconds_total counter",
+            f"{prefix}_rerun_seconds_total {data['rerun_seconds']:.6f}",
+            f"# HELP {prefix}_rerun_max_seconds Slowest profiled rerun.",
+            f"# TYPE {prefix}_rerun_max_seconds gauge",
+            f"{prefix}_rerun_max_seconds {data['max_rerun_seconds']:.6f}",
+        ]
+        for kind in ("section", "function"):
+            rows = data[kind + "s"]
+            for metric, field, help_text, type_ in (
+                ("calls_total", "calls", f"Calls per {kind}.", "counter"),
+                ("seconds_total", "seconds", f"Time spent per {kind}.", "counter"),
+                ("max_seconds", "max_seconds", f"Most time one rerun spent per {kind}.", "gauge"),
+            ):
+                name = f"{prefix}_{kind}_{metric}"
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {type_}"]
+                for row in rows:
+                    value = row[field] if field == "calls" else f"{row[field]:.6f}"
+                    lines.append(f'{name}{{{kind}="{_label(row["name"])}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+TOTALS = Totals()
+
+
+def _add(timings, name, seconds):
+    row = timings.get(name)
+    if row is None:
+        timings[name] = [1, seconds]
+    else:
+        row[0] += 1
+        row[1] += seconds
+
+
+def _rows(timings):
+    """Timings as dicts, slowest first"""
+    rows = [
+        {"name": name, "calls": row[0], "seconds": row[1], **({"max_seconds": row[2]} if len(row) > 2 else {})}
+        for name, row in timings.items()
+    ]
+    rows.sort(key=lambda row: -row["seconds"])
+    return rows
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,125 @@
+"""Level progression curves with precomputed cumulative-EXP tables.
+
+A curve defines the EXP needed to advance from each level. Its cumulative
+table maps a level to the total EXP required to reach it, so a total EXP
+amount resolves to (level, remainder) with a bisect instead of a
+level-by-level loop. NumPy is only imported by the vectorized helpers.
+"""
+from bisect import bisect_right
+from math import isqrt
+
+
+class ProgressionCurve:
+    """Base curve; subclasses implement exp_needed(level)"""
+
+    def __init__(self):
+        # _cumulative[level] is the total EXP needed to reach level (index 0 unused)
+        self._cumulative = [0, 0]
+
+    def exp_needed(self, level):
+        """EXP needed to go from level to level + 1"""
+        raise NotImplementedError
+
+    def total_for_level(self, level):
+        """Total EXP needed to reach level from level 1"""
+        self._extend(lambda cumulative: len(cumulative) <= level)
+        return self._cumulative[level]
+
+    def resolve(self, total_exp):
+        """Map total EXP to (level, experience into that level)"""
+        total_exp = max(total_exp, 0)
+        self._extend(lambda cumulative: cumulative[-1] <= total_exp)
+        level = bisect_right(self._cumulative, total_exp, 1) - 1
+        return level, total_exp - self._cumulative[level]
+
+    def resolve_many(self, totals):
+        """Vectorized resolve: arrays of levels and remainders for many users"""
+        import numpy as np
+
+        totals = np.maximum(np.asarray(totals, dtype=np.int64), 0)
+        if totals.size:
+            highest = int(totals.max())
+            self._extend(lambda cumulative: cumulative[-1] <= highest)
+        cumulative = np.asarray(self._cumulative, dtype=np.int64)
+        levels = np.searchsorted(cumulative[1:], totals, side="right")
+        return levels, totals - cumulative[levels]
+
+    def _extend(self, needs_more):
+        cumulative = self._cumulative
+        while needs_more(cumulative):
+            level = len(cumulative) - 1
+            step = self.exp_needed(level)
+            if step <= 0:
+                raise ValueError(f"exp_needed({level}) must be positive, got {step}")
+            cumulative.append(cumulative[-1] + step)
+
+
+class LinearCurve(ProgressionCurve):
+    """base + step * (level - 1) EXP per level, resolved in closed form"""
+
+    def __init__(self, base=100, step=50):
+        super().__init__()
+        self.base = base
+        self.step = step
+
+    def exp_needed(self, level):
+        return self.base + (level - 1) * self.step
+
+    def total_for_level(self, level):
+        n = level - 1
+        return n * self.base + self.step * n * (n - 1) // 2
+
+    def resolve(self, total_exp):
+        total_exp = max(total_exp, 0)
+        if self.step == 0:
+            n = total_exp // self.base
+        else:
+            # Largest n with step/2 * n^2 + (base - step/2) * n <= total_exp
+            b = 2 * self.base - self.step
+            n = max((isqrt(b * b + 8 * self.step * total_exp) - b) // (2 * self.step), 0)
+            while self.total_for_level(n + 2) <= total_exp:
+                n += 1
+            while n > 0 and self.total_for_level(n + 1) > total_exp:
+                n -= 1
+        level = n + 1
+        return level, total_exp - self.total_for_level(level)
+
+
+class QuadraticCurve(ProgressionCurve):
+    """base + linear * (level - 1) + quadratic * (level - 1)^2 EXP per level"""
+
+    def __init__(self, base=100, linear=50, quadratic=10):
+        super().__init__()
+        self.base = base
+        self.linear = linear
+        self.quadratic = quadratic
+
+    def exp_needed(self, level):
+        n = level - 1
+        return self.base + self.linear * n + self.quadratic * n * n
+
+
+class TableCurve(ProgressionCurve):
+    """EXP per level from a table; levels past the end reuse the last entry"""
+
+    def __init__(self, table):
+        super().__init__()
+        if not table:
+            raise ValueError("TableCurve needs at least one entry")
+        self.table = list(table)
+
+    def exp_needed(self, level):
+        return self.table[min(level, len(self.table)) - 1]
+
+
+def threshold_index(value, thresholds):
+    """Index of the highest threshold <= value (0 below the first one)"""
+    return max(bisect_right(thresholds, value) - 1, 0)
+
+
+def threshold_indexes(values, thresholds):
+    """Vectorized threshold_index over an array of values"""
+    import numpy as np
+
+    indexes = np.searchsorted(np.asarray(thresholds), np.asarray(values), side="right") - 1
+    return np.maximum(indexes, 0)
@@ -0,0 +1,110 @@
+"""Weekly, monthly and seasonal rollups of completions.
+
+Each period row holds the completion count, the EXP earned and per-category
+completion counts. The engine updates the three rows a completion touches
+in O(1); ``Rollups.from_days`` rebuilds them in one pass, from an in-memory
+history or streamed from the store (``ProfileStore.iter_history``), so trend
+charts never rescan the raw history. A deleted quest's completions keep the
+EXP and category of its definition, retired rather than dropped, so deleting
+a quest leaves past periods as they were.
+"""
+from datetime import date
+
+from rules import get_task_exp
+
+WEEK = "week"
+MONTH = "month"
+SEASON = "season"
+PERIODS = (WEEK, MONTH, SEASON)
+
+
+def period_keys(day):
+    """Sortable (week, month, season) keys for a "YYYY-MM-DD" day
+
+    Seasons follow the calendar quarters of the apps' SEASONS table.
+    """
+    d = date.fromisoformat(day)
+    year, week, _ = d.isocalendar()
+    return (
+        f"{year}-W{week:02d}",
+        day[:7],
+        f"{d.year}-S{(d.month - 1) // 3 + 1}",
+    )
+
+
+def new_row():
+    return {"completions": 0, "exp": 0, "categories": {}}
+
+
+class Rollups:
+    """Per-week, per-month and per-season completion, EXP and category totals"""
+
+    def __init__(self):
+        self.tables = {period: {} for period in PERIODS}
+
+    @classmethod
+    def from_days(cls, days, daily_tasks, retired_tasks=()):
+        """Build the rollups from (day, task_ids) pairs in any order
+
+        retired_tasks are the deleted quests; completions of a quest in
+        neither list count without EXP or category.
+        """
+        rollups = cls()
+        # (exp, category) per task id
+        tasks = {
+            task["id"]: (get_task_exp(task), task.get("category", "other"))
+            for defined in (retired_tasks, daily_tasks) for task in defined
+        }
+        for day, task_ids in days:
+            if not task_ids:
+                continue
+            exp = 0
+            categories = {}
+            for task_id in task_ids:
+                task = tasks.get(task_id)
+                if task is not None:
+                    exp += task[0]
+                    categories[task[1]] = categories.get(task[1], 0) + 1
+            rollups._add(day, len(task_ids), exp, categories)
+        return rollups
+
+    @classmethod
+    def from_history(cls, completion_history, daily_tasks, retired_tasks=()):
+        """Build the rollups from a {"YYYY-MM-DD": [task_id, ...]} history"""
+        return cls.from_days(completion_history.items(), daily_tasks, retired_tasks)
+
+    def series(self, period):
+        """(key, row) pairs of one period table, oldest first"""
+        return sorted(self.tables[period].items())
+
+    def categories(self):
+        """Every category with completions in any period"""
+        return sorted({c for row in self.tables[MONTH].values() for c in row["categories"]}, key=str)
+
+    def record_completion(self, day, task):
+        """Count one completion of task on day"""
+        self._add(day, 1, get_task_exp(task), {task.get("category", "other"): 1})
+
+    def record_undo(self, day, task):
+        """Remove one completion on day (task is None for a quest never defined)"""
+        if task is None:
+            self._add(day, -1, 0, {})
+        else:
+            self._add(day, -1, -get_task_exp(task), {task.get("category", "other"): -1})
+
+    def _add(self, day, completions, exp, categories):
+        for table, key in zip(self.tables.values(), period_keys(day)):
+            row = table.get(key)
+            if row is None:
+                row = table[key] = new_row()
+            row["completions"] += completions
+            row["exp"] += exp
+            counts = row["categories"]
+            for category, delta in categories.items():
+                count = counts.get(category, 0) + delta
+                if count:
+                    counts[category] = count
+                else:
+                    counts.pop(category, None)
+            if not row["completions"]:
+                del table[key]
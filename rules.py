@@ -0,0 +1,148 @@
+"""Game rules shared by the tracker UI and the event replay engine.
+
+Everything here works on plain ``user_data`` dicts and has no Streamlit
+dependency.
+"""
+from progression import LinearCurve, threshold_index, threshold_indexes
+
+# Rank system (similar to PUBG)
+RANK_SYSTEM = [
+    {"rank": "BRONZE", "min_points": 0, "color": "#CD7F32"},
+    {"rank": "SILVER", "min_points": 100, "color": "#C0C0C0"},
+    {"rank": "GOLD", "min_points": 250, "color": "#FFD700"},
+    {"rank": "PLATINUM", "min_points": 500, "color": "#E5E4E2"},
+    {"rank": "DIAMOND", "min_points": 1000, "color": "#B9F2FF"},
+    {"rank": "MASTER", "min_points": 2000, "color": "#8B0000"},
+    {"rank": "GRANDMASTER", "min_points": 3500, "color": "#FFD700"},
+    {"rank": "LEGEND", "min_points": 5000, "color": "#FF6347"},
+]
+
+RANK_THRESHOLDS = [r["min_points"] for r in RANK_SYSTEM]
+
+# EXP needed per level; swap in QuadraticCurve or TableCurve to rebalance
+PROGRESSION = LinearCurve(base=100, step=50)
+
+DIFFICULTY_EXP = {
+    "common": 1,
+    "rare": 1.5,
+    "epic": 2.5,
+    "legendary": 5
+}
+
+RANK_TIERS = {r["rank"]: i for i, r in enumerate(RANK_SYSTEM)}
+
+# Inputs achievement rules are evaluated against (see achievements.py)
+TOTAL_COMPLETIONS = "total_completions"
+STREAK = "streak"
+LEVEL = "level"
+RANK_TIER = "rank_tier"
+
+# Achievements system: each one is earned once its metric passes the threshold
+ACHIEVEMENTS = {
+    "first_task": {"name": "First Step", "description": "Complete your first task", "emoji": "👣",
+                   "metric": TOTAL_COMPLETIONS, "op": ">=", "threshold": 1},
+    "ten_tasks": {"name": "Growing Stronger", "description": "Complete 10 tasks", "emoji": "💪",
+                  "metric": TOTAL_COMPLETIONS, "op": ">=", "threshold": 10},
+    "hundred_tasks": {"name": "Unstoppable", "description": "Complete 100 tasks", "emoji": "⚡",
+                      "metric": TOTAL_COMPLETIONS, "op": ">=", "threshold": 100},
+    "week_streak": {"name": "On Fire", "description": "Achieve 7-day streak", "emoji": "🔥",
+                    "metric": STREAK, "op": ">=", "threshold": 7},
+    "level_ten": {"name": "Rising Star", "description": "Reach Level 10", "emoji": "⭐",
+                  "metric": LEVEL, "op": ">=", "threshold": 10},
+    "rank_gold": {"name": "Golden Champion", "description": "Reach Gold rank", "emoji": "👑",
+                  "metric": RANK_TIER, "op": ">=", "threshold": RANK_TIERS["GOLD"]},
+}
+
+LEVEL_UP_RANK_POINTS = 10
+COMPLETION_RANK_POINTS = 5
+
+
+def get_rank_index(rank_points):
+    """Index into RANK_SYSTEM for a rank point total"""
+    return threshold_index(rank_points, RANK_THRESHOLDS)
+
+
+def get_rank_indexes(rank_points):
+    """Vectorized get_rank_index over an array of rank point totals"""
+    return threshold_indexes(rank_points, RANK_THRESHOLDS)
+
+
+def get_current_rank(rank_points):
+    """Get current rank based on rank points"""
+    return RANK_SYSTEM[get_rank_index(rank_points)]
+
+
+def get_exp_needed_for_level(level, curve=PROGRESSION):
+    """Calculate EXP needed to reach next level (scales with level)"""
+    return curve.exp_needed(level)
+
+
+def get_task_exp(task):
+    """EXP granted for completing a task"""
+    return int(task["exp"] * DIFFICULTY_EXP.get(task["difficulty"], 1))
+
+
+def apply_experience(user, exp_amount, timestamp, curve=PROGRESSION):
+    """Add experience to a user dict and handle level up"""
+    old_level = user["level"]
+    total_exp = curve.total_for_level(old_level) + user["experience"] + exp_amount
+    level, experience = curve.resolve(total_exp)
+    user["level"] = level
+    user["experience"] = experience
+    user["exp_needed"] = curve.exp_needed(level)
+    leveled_up = level > old_level
+
+    if leveled_up:
+        user["rank_points"] += LEVEL_UP_RANK_POINTS * (level - old_level)  # Bonus rank points per level up
+        user["last_level_up"] = timestamp
+
+    # Update rank
+    new_rank = get_current_rank(user["rank_points"])
+    user["rank"] = new_rank["rank"]
+
+    return leveled_up
+
+
+def apply_rank_points(user, points):
+    """Add rank points to a user dict; True when the rank changes"""
+    old_rank = user["rank"]
+    user["rank_points"] += points
+    user["rank"] = get_current_rank(user["rank_points"])["rank"]
+    return user["rank"] != old_rank
+
+
+def revert_experience(user, exp_amount, curve=PROGRESSION):
+    """Take back EXP added by apply_experience; returns the levels lost
+
+    The level follows total EXP, and the level-up rank point bonus is taken
+    back per level lost, so undoing any grant (not only the latest) ends
+    where never having made it would.
+    """
+    old_level = user["level"]
+    total_exp = max(curve.total_for_level(old_level) + user["experience"] - exp_amount, 0)
+    level, experience = curve.resolve(total_exp)
+    user["level"] = level
+    user["experience"] = experience
+    user["exp_needed"] = curve.exp_needed(level)
+    user["rank_points"] -= LEVEL_UP_RANK_POINTS * (old_level - level)
+    user["rank"] = get_current_rank(user["rank_points"])["rank"]
+    return old_level - level
+
+
+def revert_completion(user, exp_amount, curve=PROGRESSION):
+    """Take back the EXP and rank points of one completion; returns the levels lost"""
+    levels_lost = revert_experience(user, exp_amount, curve)
+    apply_rank_points(user, -COMPLETION_RANK_POINTS)
+    return levels_lost
+
+
+def apply_completions(user, exp_amount, completions, timestamp, curve=PROGRESSION):
+    """Apply the EXP and rank points of many completions in one step
+
+    Ends in the same level, EXP and rank points as applying each completion
+    in turn, since EXP adds up and the level-up bonus is paid per level.
+    """
+    old_rank = user["rank"]
+    leveled_up = apply_experience(user, exp_amount, timestamp, curve)
+    apply_rank_points(user, COMPLETION_RANK_POINTS * completions)
+    return leveled_up, user["rank"] != old_rank
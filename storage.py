@@ -0,0 +1,592 @@
+"""SQLite-backed persistence for tracker profiles.
+
+Each user action writes only the rows it touches: the profile row for
+level/EXP/rank changes, one history row per day and one row per task.
+Mutations can carry an event that is appended to the per-user event log
+in the same transaction (see events.py). Every table is partitioned by
+user_id, and one store (with its pool of connections) is shared by all
+sessions of a server process. Finished seasons are archived to one file
+each in archive_dir, with their metadata in the season_archives table (see
+archives.py).
+"""
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+from array import array
+from contextlib import contextmanager
+
+DEFAULT_DB_PATH = os.environ.get(
+    "SOLO_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tracker.db"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    current_season INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    experience INTEGER NOT NULL,
+    exp_needed INTEGER NOT NULL,
+    rank TEXT NOT NULL,
+    rank_points INTEGER NOT NULL,
+    achievements TEXT NOT NULL DEFAULT '',
+    last_level_up TEXT
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    user_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    exp INTEGER NOT NULL,
+    category TEXT,
+    PRIMARY KEY (user_id, id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS retired_tasks (
+    user_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    exp INTEGER NOT NULL,
+    category TEXT,
+    PRIMARY KEY (user_id, id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS history (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    task_ids BLOB NOT NULL,
+    PRIMARY KEY (user_id, day)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS events (
+    user_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (user_id, seq)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ledger (
+    user_id TEXT NOT NULL,
+    day TEXT,
+    task_id INTEGER,
+    exp INTEGER NOT NULL,
+    levels INTEGER NOT NULL,
+    rank_points INTEGER NOT NULL,
+    achievements TEXT NOT NULL DEFAULT ''
+);
+
+CREATE INDEX IF NOT EXISTS ledger_completion ON ledger (user_id, day, task_id);
+
+CREATE TABLE IF NOT EXISTS streaks (
+    user_id TEXT PRIMARY KEY,
+    longest INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS season_archives (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    meta TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS season_archives_user ON season_archives (user_id, id);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    user_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (user_id, seq)
+) WITHOUT ROWID;
+"""
+
+DEFAULT_POOL_SIZE = 8
+
+# Ordered writes of a write_batch() entry (see writer.py)
+LEDGER = "ledger"
+UNLEDGER = "unledger"
+EVENT = "event"
+SNAPSHOT = "snapshot"
+COMPACT = "compact"
+RETIRE = "retire"
+
+PROFILE_FIELDS = (
+    "current_season", "level", "experience", "exp_needed",
+    "rank", "rank_points", "achievements", "last_level_up",
+)
+
+
+def _encode_achievements(values):
+    """Pack achievement ids into a comma separated string"""
+    return ",".join(values)
+
+
+def _decode_achievements(text):
+    """Unpack a comma separated string of achievement ids"""
+    return text.split(",") if text else []
+
+
+def _pack_day(task_ids):
+    """Pack a day's completed task ids into an int32 blob"""
+    return array("i", task_ids).tobytes()
+
+
+def _unpack_day(blob):
+    """Unpack a day's completed task ids from an int32 blob"""
+    return array("i", blob).tolist()
+
+
+def _profile_row(user_id, user_data):
+    """Build the profiles row for a user_data dict"""
+    return (
+        user_id,
+        user_data["current_season"],
+        user_data["level"],
+        user_data["experience"],
+        user_data["exp_needed"],
+        user_data["rank"],
+        user_data["rank_points"],
+        _encode_achievements(user_data.get("achievements", [])),
+        user_data.get("last_level_up"),
+    )
+
+
+def _task_row(user_id, task):
+    """Build the tasks row for a task dict"""
+    return (user_id, task["id"], task["name"], task["difficulty"], task["exp"], task.get("category"))
+
+
+class ProfileStore:
+    """Profile repository on a local SQLite database in WAL mode"""
+
+    def __init__(self, path=DEFAULT_DB_PATH, pool_size=DEFAULT_POOL_SIZE, archive_dir=None):
+        self._tmp_dir = None
+        if path == ":memory:":
+            # Every connection to ":memory:" is a separate database
+            pool_size = 1
+            if archive_dir is None:
+                self._tmp_dir = tempfile.TemporaryDirectory(prefix="solo-archives-")
+                archive_dir = self._tmp_dir.name
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.archive_dir = archive_dir or os.path.join(os.path.dirname(os.path.abspath(path)), "archives")
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection for the duration of one operation"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        """Close every pooled connection (waits for borrowed ones)"""
+        for _ in range(self.pool_size):
+            self._pool.get().close()
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+
+    def list_users(self):
+        """Ids of every stored profile"""
+        with self._connection() as conn:
+            return [row[0] for row in conn.execute("SELECT user_id FROM profiles ORDER BY user_id")]
+
+    def load_standings(self):
+        """(user_id, rank_points, level) of every stored profile"""
+        with self._connection() as conn:
+            return conn.execute("SELECT user_id, rank_points, level FROM profiles").fetchall()
+
+    def load_streaks(self):
+        """{user_id: longest streak} as last saved by save_streak"""
+        with self._connection() as conn:
+            return dict(conn.execute("SELECT user_id, longest FROM streaks"))
+
+    def save_streak(self, user_id, longest):
+        """Store a user's longest streak (kept for the leaderboard)"""
+        with self._connection() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO streaks VALUES (?, ?)", (user_id, longest))
+
+    def has_profile(self, user_id):
+        """Whether user_id has a stored profile"""
+        with self._connection() as conn:
+            return conn.execute("SELECT 1 FROM profiles WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+    def load_profile(self, user_id, history=True):
+        """Load a user_data dict, or None if the user has no profile
+
+        With history=False completion_history is left empty (see iter_history).
+        """
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT current_season, level, experience, exp_needed, rank, rank_points, "
+                "achievements, last_level_up FROM profiles WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            tasks = conn.execute(
+                "SELECT id, name, difficulty, exp, category FROM tasks WHERE user_id = ? ORDER BY id",
+                (user_id,),
+            ).fetchall()
+            history = conn.execute(
+                "SELECT day, task_ids FROM history WHERE user_id = ? ORDER BY day",
+                (user_id,),
+            ).fetchall() if history else ()
+
+        user_data = dict(zip(PROFILE_FIELDS, row))
+        user_data["achievements"] = _decode_achievements(user_data["achievements"])
+        user_data["daily_tasks"] = [
+            {"id": t[0], "name": t[1], "difficulty": t[2], "exp": t[3], "category": t[4]}
+            for t in tasks
+        ]
+        user_data["completion_history"] = {day: _unpack_day(ids) for day, ids in history}
+        return user_data
+
+    def iter_history(self, user_id, batch_size=1024):
+        """Yield (day, task_ids) in day order without loading the whole history"""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "SELECT day, task_ids FROM history WHERE user_id = ? ORDER BY day",
+                (user_id,),
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for day, ids in rows:
+                    yield day, _unpack_day(ids)
+
+    def write_import(self, user_id, user_data, tasks, batches, create=False):
+        """Write an imported file in one transaction, so a failure keeps nothing of it
+
+        With create, user_data replaces any stored profile first. The tasks
+        are upserted, each {day: task_ids} from batches is merged into the
+        stored days (ids a day already has are not added twice), and the
+        profile row is updated from user_data.
+        """
+        with self._connection() as conn, conn:
+            if create:
+                self._delete_user(conn, user_id)
+                conn.execute(
+                    "INSERT INTO profiles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", _profile_row(user_id, user_data)
+                )
+            conn.executemany(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?)",
+                [_task_row(user_id, t) for t in tasks],
+            )
+            for days in batches:
+                for day, task_ids in days.items():
+                    row = conn.execute(
+                        "SELECT task_ids FROM history WHERE user_id = ? AND day = ?", (user_id, day)
+                    ).fetchone()
+                    if row is not None:
+                        stored = _unpack_day(row[0])
+                        known = set(stored)
+                        task_ids = stored + [task_id for task_id in task_ids if task_id not in known]
+                    self._write_day(conn, user_id, day, task_ids)
+            self._update_profile(conn, user_id, user_data)
+
+    def create_profile(self, user_id, user_data, event=None, keep_ledger=False):
+        """Write a complete profile (used for new users and resets)
+
+        keep_ledger keeps the EXP ledger and the deleted quests, for rewrites
+        of the same history.
+        """
+        with self._connection() as conn, conn:
+            self._delete_user(conn, user_id, keep_ledger)
+            conn.execute(
+                "INSERT INTO profiles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                _profile_row(user_id, user_data),
+            )
+            conn.executemany(
+                "INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?)",
+                [_task_row(user_id, t) for t in user_data["daily_tasks"]],
+            )
+            conn.executemany(
+                "INSERT INTO history VALUES (?, ?, ?)",
+                [(user_id, day, _pack_day(ids)) for day, ids in user_data["completion_history"].items()],
+            )
+            return self._append_event(conn, user_id, event)
+
+    def save_progress(self, user_id, user_data, entry=None, event=None):
+        """Update the profile row (level, EXP, rank, season, achievements)
+
+        entry is the LedgerEntry of an EXP grant, if this is one.
+        """
+        with self._connection() as conn, conn:
+            self._update_profile(conn, user_id, user_data)
+            if entry is not None:
+                self._write_entry(conn, user_id, None, None, entry)
+            return self._append_event(conn, user_id, event)
+
+    def record_completion(self, user_id, day, task_ids, user_data, task_id=None, entry=None, event=None):
+        """Persist one day's completions together with the profile row and the ledger entry of task_id"""
+        with self._connection() as conn, conn:
+            self._write_day(conn, user_id, day, task_ids)
+            self._update_profile(conn, user_id, user_data)
+            if entry is not None:
+                self._write_entry(conn, user_id, day, task_id, entry)
+            return self._append_event(conn, user_id, event)
+
+    def record_undo(self, user_id, day, task_ids, user_data, task_id, event=None):
+        """Persist an undone completion: the day, the profile row and dropping its ledger entry"""
+        with self._connection() as conn, conn:
+            self._write_day(conn, user_id, day, task_ids)
+            self._update_profile(conn, user_id, user_data)
+            self._delete_entry(conn, user_id, day, task_id)
+            return self._append_event(conn, user_id, event)
+
+    def write_batch(self, batch):
+        """Apply queued changes of many users in one transaction (see writer.py)
+
+        batch maps user_id to an object with profile (a dict holding
+        PROFILE_FIELDS, or None), days ({day: task_ids}), tasks ({task_id:
+        task dict, or None once deleted}), streak (or None) and ops, an
+        ordered list of (LEDGER, day, task_id, entry), (UNLEDGER, day,
+        task_id), (RETIRE, task), (EVENT, seq, event), (SNAPSHOT, seq, state)
+        and (COMPACT, retain_snapshots) writes.
+        """
+        with self._connection() as conn, conn:
+            for user_id, changes in batch.items():
+                if changes.profile is not None:
+                    self._update_profile(conn, user_id, changes.profile)
+                for day, task_ids in changes.days.items():
+                    self._write_day(conn, user_id, day, task_ids)
+                for task_id, task in changes.tasks.items():
+                    if task is None:
+                        conn.execute("DELETE FROM tasks WHERE user_id = ? AND id = ?", (user_id, task_id))
+                    else:
+                        conn.execute("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?)", _task_row(user_id, task))
+                if changes.streak is not None:
+                    conn.execute("INSERT OR REPLACE INTO streaks VALUES (?, ?)", (user_id, changes.streak))
+                for kind, *args in changes.ops:
+                    if kind == LEDGER:
+                        self._write_entry(conn, user_id, *args)
+                    elif kind == UNLEDGER:
+                        self._delete_entry(conn, user_id, *args)
+                    elif kind == RETIRE:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO retired_tasks VALUES (?, ?, ?, ?, ?, ?)", _task_row(user_id, *args)
+                        )
+                    elif kind == EVENT:
+                        seq, event = args
+                        conn.execute("INSERT INTO events VALUES (?, ?, ?, ?, ?)", (user_id, seq) + tuple(event))
+                    elif kind == SNAPSHOT:
+                        conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)", (user_id, *args))
+                    elif kind == COMPACT:
+                        self._compact_events(conn, user_id, *args)
+                    else:
+                        raise ValueError(f"unknown write {kind!r}")
+
+    def load_ledger_entry(self, user_id, day, task_id):
+        """Newest (exp, levels, rank_points, achievements) recorded for a completion, or None"""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT exp, levels, rank_points, achievements FROM ledger "
+                "WHERE user_id = ? AND day = ? AND task_id = ? ORDER BY rowid DESC LIMIT 1",
+                (user_id, day, task_id),
+            ).fetchone()
+        return None if row is None else row[:3] + (tuple(_decode_achievements(row[3])),)
+
+    def load_ledger(self, user_id):
+        """Every (day, task_id, exp, levels, rank_points, achievements) row, oldest first
+
+        EXP grants have day and task_id None.
+        """
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT day, task_id, exp, levels, rank_points, achievements FROM ledger "
+                "WHERE user_id = ? ORDER BY rowid",
+                (user_id,),
+            ).fetchall()
+        return [row[:5] + (tuple(_decode_achievements(row[5])),) for row in rows]
+
+    def add_task(self, user_id, task, event=None):
+        """Insert a new quest"""
+        with self._connection() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?)", _task_row(user_id, task))
+            return self._append_event(conn, user_id, event)
+
+    def retire_task(self, user_id, task, event=None):
+        """Remove a quest, keeping its definition for the completions it left in the history"""
+        with self._connection() as conn, conn:
+            conn.execute("DELETE FROM tasks WHERE user_id = ? AND id = ?", (user_id, task["id"]))
+            conn.execute("INSERT OR REPLACE INTO retired_tasks VALUES (?, ?, ?, ?, ?, ?)", _task_row(user_id, task))
+            return self._append_event(conn, user_id, event)
+
+    def load_retired_tasks(self, user_id):
+        """Task dicts of the quests deleted this season, by id"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT id, name, difficulty, exp, category FROM retired_tasks WHERE user_id = ? ORDER BY id",
+                (user_id,),
+            ).fetchall()
+        return [{"id": t[0], "name": t[1], "difficulty": t[2], "exp": t[3], "category": t[4]} for t in rows]
+
+    def start_season(self, user_id, user_data, archive=None, event=None):
+        """Persist a season change, archiving the finished season and clearing the history
+
+        archive is a SeasonArchive; its file is written inside the transaction,
+        so a failed write leaves the season unchanged.
+        """
+        with self._connection() as conn, conn:
+            if archive is not None:
+                archive_id = conn.execute(
+                    "INSERT INTO season_archives (user_id, meta) VALUES (?, ?)",
+                    (user_id, json.dumps(archive.meta, separators=(",", ":"), ensure_ascii=False)),
+                ).lastrowid
+                archive.write(self.archive_path(archive_id))
+            conn.execute("DELETE FROM history WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM ledger WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM retired_tasks WHERE user_id = ?", (user_id,))
+            self._update_profile(conn, user_id, user_data)
+            return self._append_event(conn, user_id, event)
+
+    def archive_path(self, archive_id):
+        """File holding an archived season's columns"""
+        return os.path.join(self.archive_dir, f"{archive_id}.season")
+
+    def list_archives(self, user_id):
+        """(archive_id, meta) of each archived season, oldest first"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT id, meta FROM season_archives WHERE user_id = ? ORDER BY id", (user_id,)
+            ).fetchall()
+        return [(archive_id, json.loads(meta)) for archive_id, meta in rows]
+
+    def delete_archives(self, user_id):
+        """Remove every archived season of a user, files included"""
+        with self._connection() as conn, conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM season_archives WHERE user_id = ?", (user_id,))]
+            conn.execute("DELETE FROM season_archives WHERE user_id = ?", (user_id,))
+        for archive_id in ids:
+            try:
+                os.remove(self.archive_path(archive_id))
+            except FileNotFoundError:
+                pass
+
+    def delete_profile(self, user_id):
+        """Remove every row belonging to a user, including the event log and season archives"""
+        self.delete_archives(user_id)
+        with self._connection() as conn, conn:
+            self._delete_user(conn, user_id)
+            conn.execute("DELETE FROM events WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM snapshots WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM streaks WHERE user_id = ?", (user_id,))
+
+    def load_events(self, user_id, after_seq=0):
+        """Fetch (seq, ts, kind, payload) rows newer than after_seq"""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT seq, ts, kind, payload FROM events WHERE user_id = ? AND seq > ? ORDER BY seq",
+                (user_id, after_seq),
+            ).fetchall()
+
+    def last_event_seq(self, user_id):
+        """Highest sequence number used by the user's log or snapshots"""
+        with self._connection() as conn:
+            return self._last_seq(conn, user_id)
+
+    def save_snapshot(self, user_id, seq, state):
+        """Store a serialized state snapshot taken after event seq"""
+        with self._connection() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)", (user_id, seq, state))
+
+    def load_snapshot(self, user_id):
+        """Fetch the newest (seq, state) snapshot, or None"""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT seq, state FROM snapshots WHERE user_id = ? ORDER BY seq DESC LIMIT 1",
+                (user_id,),
+            ).fetchone()
+
+    def compact_events(self, user_id, retain_snapshots):
+        """Drop all but the newest snapshots and the events they cover"""
+        with self._connection() as conn, conn:
+            self._compact_events(conn, user_id, retain_snapshots)
+
+    @staticmethod
+    def _update_profile(conn, user_id, user_data):
+        row = _profile_row(user_id, user_data)
+        conn.execute(
+            "UPDATE profiles SET current_season = ?, level = ?, experience = ?, exp_needed = ?, "
+            "rank = ?, rank_points = ?, achievements = ?, last_level_up = ? WHERE user_id = ?",
+            row[1:] + row[:1],
+        )
+
+    @staticmethod
+    def _compact_events(conn, user_id, retain_snapshots):
+        kept = conn.execute(
+            "SELECT seq FROM snapshots WHERE user_id = ? ORDER BY seq DESC LIMIT ?",
+            (user_id, retain_snapshots),
+        ).fetchall()
+        if len(kept) < retain_snapshots:
+            return
+        floor = kept[-1][0]
+        conn.execute("DELETE FROM snapshots WHERE user_id = ? AND seq < ?", (user_id, floor))
+        conn.execute("DELETE FROM events WHERE user_id = ? AND seq <= ?", (user_id, floor))
+
+    @classmethod
+    def _append_event(cls, conn, user_id, event):
+        if event is None:
+            return None
+        seq = cls._last_seq(conn, user_id) + 1
+        conn.execute("INSERT INTO events VALUES (?, ?, ?, ?, ?)", (user_id, seq) + tuple(event))
+        return seq
+
+    @staticmethod
+    def _last_seq(conn, user_id):
+        row = conn.execute(
+            "SELECT MAX(m) FROM ("
+            "SELECT MAX(seq) AS m FROM events WHERE user_id = ? "
+            "UNION ALL SELECT MAX(seq) FROM snapshots WHERE user_id = ?)",
+            (user_id, user_id),
+        ).fetchone()
+        return row[0] or 0
+
+    @staticmethod
+    def _write_day(conn, user_id, day, task_ids):
+        conn.execute(
+            "INSERT INTO history VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, day) DO UPDATE SET task_ids = excluded.task_ids",
+            (user_id, day, _pack_day(task_ids)),
+        )
+
+    @staticmethod
+    def _write_entry(conn, user_id, day, task_id, entry):
+        conn.execute(
+            "INSERT INTO ledger VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_id, day, task_id, entry[0], entry[1], entry[2], _encode_achievements(entry[3])),
+        )
+
+    @staticmethod
+    def _delete_entry(conn, user_id, day, task_id):
+        """Drop the newest ledger row of a completion"""
+        conn.execute(
+            "DELETE FROM ledger WHERE rowid = (SELECT MAX(rowid) FROM ledger "
+            "WHERE user_id = ? AND day = ? AND task_id = ?)",
+            (user_id, day, task_id),
+        )
+
+    @staticmethod
+    def _delete_user(conn, user_id, keep_ledger=False):
+        for table in ("history", "tasks", "profiles") + (() if keep_ledger else ("ledger", "retired_tasks")):
+            conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
@@ -0,0 +1,77 @@
+"""Constant-time completion streak tracking.
+
+Days are proleptic Gregorian ordinals (``date.toordinal()``). The tracker
+only follows the newest run of consecutive active days, plus enough of the
+run before it to undo the current day's last completion.
+"""
+from datetime import date
+
+
+class StreakTracker:
+    """Current streak, longest streak and last active day"""
+
+    def __init__(self):
+        self.run_end = None
+        self.run_length = 0
+        self.previous_run = None
+        self.best_before = 0
+        self.stale = False
+
+    @classmethod
+    def from_days(cls, ordinals):
+        """Build the tracker from the ordinals of all active days"""
+        tracker = cls()
+        for ordinal in sorted(ordinals):
+            tracker.add_day(ordinal)
+        return tracker
+
+    @classmethod
+    def from_history(cls, completion_history):
+        """Build the tracker from a {"YYYY-MM-DD": [task_id, ...]} history"""
+        return cls.from_days(
+            date.fromisoformat(day).toordinal() for day, task_ids in completion_history.items() if task_ids
+        )
+
+    @property
+    def last_active_day(self):
+        """Ordinal of the newest day with a completion, or None"""
+        return self.run_end
+
+    @property
+    def longest(self):
+        """Longest streak ever recorded"""
+        return max(self.best_before, self.run_length)
+
+    def current(self, today):
+        """Streak ending today (0 when nothing was completed today)"""
+        return self.run_length if self.run_end == today else 0
+
+    def add_day(self, ordinal):
+        """Mark a day as active"""
+        if self.run_end is None or ordinal > self.run_end + 1:
+            self.best_before = max(self.best_before, self.run_length)
+            self.previous_run = (self.run_end, self.run_length) if self.run_end is not None else None
+            self.run_end = ordinal
+            self.run_length = 1
+        elif ordinal == self.run_end + 1:
+            self.run_end = ordinal
+            self.run_length += 1
+        elif ordinal < self.run_end:
+            # Back-filled day inside or before the current run
+            self.stale = True
+
+    def remove_day(self, ordinal):
+        """Mark a day as inactive again (its last completion was undone)"""
+        if ordinal != self.run_end:
+            self.stale = True
+        elif self.run_length > 1:
+            self.run_end -= 1
+            self.run_length -= 1
+        elif self.previous_run is not None:
+            self.run_end, self.run_length = self.previous_run
+            self.previous_run = None
+        elif self.best_before == 0:
+            self.run_end = None
+            self.run_length = 0
+        else:
+            self.stale = True
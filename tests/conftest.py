@@ -0,0 +1,5 @@
+"""Shared setup for the regression tests (run with ``pytest tests``)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,101 @@
+"""HTTP API handlers: status codes for completions, undoes and reads."""
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from api import Api, ApiError
+from engine import GameEngine
+from profiles import ProfileCache
+from storage import ProfileStore
+
+DAY = "2024-01-01"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProfileStore(str(tmp_path / "api.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def api(store):
+    return Api(ProfileCache(lambda user_id: GameEngine.open(store, user_id)), store)
+
+
+def status_of(api, method, path, body=None):
+    try:
+        return api.handle(method, path, body)[0]
+    except ApiError as exc:
+        return exc.status
+
+
+def test_complete_then_repeat_conflicts(api, store):
+    status, payload = api.handle("POST", "/users/bob/complete", {"task_id": 1, "day": DAY})
+    assert status == HTTPStatus.OK and payload["completed"]
+    assert status_of(api, "POST", "/users/bob/complete", {"task_id": 1, "day": DAY}) == HTTPStatus.CONFLICT
+    assert status_of(api, "POST", "/users/bob/complete", {"task_id": 99, "day": DAY}) == HTTPStatus.NOT_FOUND
+    assert store.has_profile("bob")
+
+
+def test_unknown_user_reads_and_undoes_are_not_found(api, store):
+    assert status_of(api, "GET", "/users/ghost") == HTTPStatus.NOT_FOUND
+    assert status_of(api, "POST", "/users/ghost/undo", {"task_id": 1, "day": DAY}) == HTTPStatus.NOT_FOUND
+    assert not store.has_profile("ghost")
+    api.handle("POST", "/users/ghost/complete", {"task_id": 1, "day": DAY})
+    status, payload = api.handle("POST", "/users/ghost/undo", {"task_id": 1, "day": DAY})
+    assert status == HTTPStatus.OK and payload["undone"]
+    assert api.handle("GET", "/users/ghost", None)[0] == HTTPStatus.OK
+
+
+@pytest.mark.parametrize("method, path", [("POST", "/users//complete"), ("POST", "/users//undo"), ("GET", "/users/%20")])
+def test_empty_user_in_path(api, method, path):
+    assert status_of(api, method, path, {"task_id": 1}) == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize("user", ["", " ", None, 7, ["bob"]])
+def test_batch_rejects_bad_user_ids(api, store, user):
+    status, payload = api.handle("POST", "/complete", {"completions": [
+        {"user": user, "task_id": 1, "day": DAY},
+        {"user": "ann", "task_id": 1, "day": DAY},
+        {"user": "ann", "task_id": 1, "day": DAY},
+    ]})
+    assert status == HTTPStatus.OK
+    assert [result["completed"] for result in payload["results"]] == [False, True, False]
+    assert store.list_users() == ["ann"]
+
+
+def test_unexpected_error_is_500_and_connection_survives(store):
+    def load(user_id):
+        if user_id == "broken":
+            raise RuntimeError("boom")
+        return GameEngine.open(store, user_id)
+
+    api = Api(ProfileCache(load), store)
+
+    async def exchange():
+        server = await asyncio.start_server(api.serve_connection, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        statuses = []
+        for user_id in ("broken", "bob"):
+            body = json.dumps({"task_id": 1, "day": DAY}).encode()
+            writer.write(
+                f"POST /users/{user_id}/complete HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            statuses.append(int((await reader.readline()).split()[1]))
+            length = 0
+            while (line := await reader.readline()) != b"\r\n":
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            statuses.append(json.loads(await reader.readexactly(length)))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return statuses
+
+    broken, error, ok, payload = asyncio.run(exchange())
+    assert (broken, error) == (500, {"error": "internal error"})
+    assert ok == 200 and payload["completed"]
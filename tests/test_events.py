@@ -0,0 +1,137 @@
+"""ProfileStore round-trips and event-log replay of stored profiles."""
+import random
+
+import pytest
+
+import engine as engine_module
+import events
+from engine import GameEngine, get_default_user_data
+from events import DERIVED_FIELDS, EventLog
+from storage import ProfileStore
+
+REPLAYED_FIELDS = DERIVED_FIELDS + ("current_season", "daily_tasks", "completion_history")
+
+
+@pytest.fixture(autouse=True)
+def fixed_clock(monkeypatch):
+    """Replayed level-up times match the ones stored"""
+    for module in (events, engine_module):
+        monkeypatch.setattr(module, "get_timestamp", lambda: "2024-06-01 12:00:00")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "events.db")
+
+
+def run_random(engine, seed, steps=1200):
+    rng = random.Random(seed)
+    for step in range(steps):
+        ids = [task["id"] for task in engine.user_data["daily_tasks"]]
+        day = f"2024-01-{rng.randint(1, 28):02d}"
+        roll = rng.random()
+        if roll < 0.55:
+            engine.complete_task(rng.choice(ids), day)
+        elif roll < 0.88:
+            engine.undo_task(rng.randint(1, 12), day)
+        elif roll < 0.93:
+            engine.add_experience(rng.randrange(1, 80))
+        elif roll < 0.97:
+            engine.add_task(f"Quest {step}", "epic", 40, "mind")
+        elif len(ids) > 3:
+            engine.delete_task(rng.choice(ids))
+        if step == steps // 2:
+            engine.start_season(2)
+
+
+def replayed(store, user_id):
+    state = EventLog(store).rebuild(user_id)
+    return {field: state[field] for field in REPLAYED_FIELDS}
+
+
+def stored(store, user_id):
+    user_data = store.load_profile(user_id)
+    return {field: user_data[field] for field in REPLAYED_FIELDS}
+
+
+def without_empty_days(user_data):
+    history = user_data["completion_history"]
+    return dict(user_data, completion_history={day: ids for day, ids in history.items() if ids})
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_store_round_trip(path, seed):
+    store = ProfileStore(path)
+    engine = GameEngine.open(store, "u")
+    run_random(engine, seed)
+    expected = {field: engine.user_data[field] for field in REPLAYED_FIELDS}
+    store.close()
+
+    reopened = ProfileStore(path)
+    try:
+        assert without_empty_days(stored(reopened, "u")) == without_empty_days(expected)
+        assert GameEngine.open(reopened, "u").check_consistency() == {}
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("interval", [7, 100, 10_000], ids=["7", "100", "no_snapshot"])
+def test_replay_matches_profile(path, interval):
+    store = ProfileStore(path)
+    try:
+        engine = GameEngine.open(store, "u")
+        engine.event_log.snapshot_interval = interval
+        run_random(engine, seed=interval)
+        assert without_empty_days(replayed(store, "u")) == without_empty_days(stored(store, "u"))
+        # Compaction keeps the log bounded by the retained snapshots
+        if interval < 1000:
+            assert len(store.load_events("u")) <= interval * (events.RETAINED_SNAPSHOTS + 1)
+        assert engine.rebuild_from_log() == []
+    finally:
+        store.close()
+
+
+def test_rebuild_restores_tampered_progress(path):
+    store = ProfileStore(path)
+    try:
+        engine = GameEngine.open(store, "u")
+        run_random(engine, seed=4, steps=300)
+        expected = stored(store, "u")
+        tampered = dict(engine.user_data, level=99, rank_points=1)
+        store.save_progress("u", tampered)
+
+        reopened = GameEngine.open(store, "u")
+        assert sorted(reopened.rebuild_from_log()) == ["level", "rank_points"]
+        assert stored(store, "u") == expected
+        assert reopened.rebuild_from_log() == []
+    finally:
+        store.close()
+
+
+def test_profile_predating_the_log_gets_a_baseline(path):
+    store = ProfileStore(path)
+    try:
+        user_data = get_default_user_data()
+        user_data["completion_history"] = {"2024-01-01": [1, 2]}
+        store.create_profile("legacy", user_data)
+        assert EventLog(store).rebuild("legacy") is None
+
+        engine = GameEngine.open(store, "legacy")
+        engine.complete_task(3, "2024-01-02")
+        engine.undo_task(1, "2024-01-01")
+        assert replayed(store, "legacy") == stored(store, "legacy")
+    finally:
+        store.close()
+
+
+def test_reset_replays_from_the_new_profile(path):
+    store = ProfileStore(path)
+    try:
+        engine = GameEngine.open(store, "u")
+        run_random(engine, seed=5, steps=200)
+        engine.reset(get_default_user_data())
+        engine.complete_task(1, "2024-02-01")
+        assert replayed(store, "u") == stored(store, "u")
+        assert stored(store, "u")["completion_history"] == {"2024-02-01": [1]}
+    finally:
+        store.close()
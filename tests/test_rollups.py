@@ -0,0 +1,66 @@
+"""Period rollups: live updates agree with a rebuild, and deletes leave the past alone."""
+import copy
+import random
+
+import pytest
+
+from engine import GameEngine, get_default_user_data
+from rollups import Rollups
+from storage import ProfileStore
+
+STEPS = 1500
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProfileStore(str(tmp_path / "rollups.db"))
+    yield store
+    store.close()
+
+
+def test_delete_keeps_past_periods(store):
+    engine = GameEngine.open(store, "u")
+    for day in ("2024-01-01", "2024-01-09", "2024-02-15"):
+        engine.complete_task(1, day)
+        engine.complete_task(2, day)
+    before = copy.deepcopy(engine.rollups.tables)
+    engine.delete_task(1)
+    assert engine.rollups.tables == before
+    assert GameEngine.open(store, "u").rollups.tables == before
+    # Undoing a deleted quest's completion takes back what it added
+    engine.undo_task(1, "2024-02-15")
+    assert GameEngine.open(store, "u").rollups.tables == engine.rollups.tables
+
+
+def test_deleted_id_is_not_reused(store):
+    engine = GameEngine.open(store, "u")
+    last = max(task["id"] for task in engine.user_data["daily_tasks"])
+    engine.delete_task(last)
+    assert engine.add_task("New", "common", 10, "fitness")["id"] == last + 1
+
+
+@pytest.mark.parametrize("stored", [False, True], ids=["memory", "store"])
+@pytest.mark.parametrize("seed", [1, 2])
+def test_live_rollups_match_rebuild(store, stored, seed):
+    engine = GameEngine.open(store, "u") if stored else GameEngine(get_default_user_data())
+    rng = random.Random(seed)
+    for step in range(STEPS):
+        ids = [task["id"] for task in engine.user_data["daily_tasks"]]
+        day = f"2024-{rng.randint(1, 6):02d}-{rng.randint(1, 28):02d}"
+        roll = rng.random()
+        if roll < 0.55:
+            engine.complete_task(rng.choice(ids), day)
+        elif roll < 0.9:
+            engine.undo_task(rng.randint(1, 14), day)
+        elif roll < 0.95:
+            engine.add_task(f"Quest {step}", "rare", 20, rng.choice(["fitness", "mind", None]))
+        elif len(ids) > 3:
+            engine.delete_task(rng.choice(ids))
+        if step % 300 == 0:
+            user = engine.user_data
+            rebuilt = Rollups.from_history(
+                user["completion_history"], user["daily_tasks"], engine.retired_tasks.values()
+            )
+            assert engine.rollups.tables == rebuilt.tables
+    if stored:
+        assert GameEngine.open(store, "u").rollups.tables == engine.rollups.tables
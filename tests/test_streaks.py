@@ -0,0 +1,87 @@
+"""Incremental streaks match a recount of the completion history."""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from engine import GameEngine, get_default_user_data
+from streaks import StreakTracker
+
+TODAY = date(2024, 3, 31)
+
+
+def day(offset):
+    """ISO day offset days before TODAY"""
+    return (TODAY - timedelta(days=offset)).isoformat()
+
+
+def recount(completion_history, today):
+    """(streak ending today, longest streak) by brute force"""
+    active = {date.fromisoformat(d).toordinal() for d, task_ids in completion_history.items() if task_ids}
+    current, ordinal = 0, today.toordinal()
+    while ordinal in active:
+        current += 1
+        ordinal -= 1
+    longest = 0
+    for start in active:
+        if start - 1 not in active:
+            end = start
+            while end + 1 in active:
+                end += 1
+            longest = max(longest, end - start + 1)
+    return current, longest
+
+
+@pytest.fixture
+def engine():
+    return GameEngine(get_default_user_data())
+
+
+def test_undo_of_todays_last_task(engine):
+    for offset in (2, 1, 0):
+        engine.complete_task(1, day(offset))
+    engine.complete_task(2, day(0))
+    assert engine.streak(day(0)) == 3
+    engine.undo_task(1, day(0))
+    assert engine.streak(day(0)) == 3
+    engine.undo_task(2, day(0))
+    assert engine.streak(day(0)) == 0
+    assert engine.streak(day(1)) == 2
+    assert engine.longest_streak == 2
+    engine.complete_task(3, day(0))
+    assert engine.streak(day(0)) == 3 and engine.longest_streak == 3
+
+
+def test_backfilled_days_join_the_run(engine):
+    engine.complete_task(1, day(0))
+    engine.complete_task(1, day(3))
+    assert engine.streak(day(0)) == 1
+    engine.complete_task(1, day(2))
+    engine.complete_task(1, day(1))
+    assert engine.streak(day(0)) == 4 and engine.longest_streak == 4
+    # Undoing a back-filled day in the middle splits the run
+    engine.undo_task(1, day(2))
+    assert engine.streak(day(0)) == 2 and engine.longest_streak == 2
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_random_run_matches_rebuild(engine, seed):
+    rng = random.Random(seed)
+    for step in range(2000):
+        ids = [task["id"] for task in engine.user_data["daily_tasks"]]
+        offset = rng.choice([0, 0, 1, 1, 2, 3, rng.randrange(40)])
+        roll = rng.random()
+        if roll < 0.55:
+            engine.complete_task(rng.choice(ids), day(offset))
+        elif roll < 0.95:
+            engine.undo_task(rng.randint(1, 12), day(offset))
+        elif len(ids) > 3:
+            engine.delete_task(rng.choice(ids))
+        if step % 50 == 0:
+            history = engine.user_data["completion_history"]
+            rebuilt = StreakTracker.from_history(history)
+            assert engine.longest_streak == rebuilt.longest
+            for check in (0, 1, 5):
+                today = TODAY - timedelta(days=check)
+                assert engine.streak(today.isoformat()) == rebuilt.current(today.toordinal())
+            assert (engine.streak(day(0)), engine.longest_streak) == recount(history, TODAY)
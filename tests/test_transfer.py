@@ -0,0 +1,79 @@
+"""Export and import round-trip without doubling history or EXP."""
+import io
+import json
+
+import pytest
+
+from engine import GameEngine, get_default_user_data
+from storage import ProfileStore
+from transfer import MAX_TASK_ID, export_profile, import_profile
+
+DAYS = ("2024-01-01", "2024-01-02", "2024-01-03")
+PROGRESS_FIELDS = ("level", "experience", "exp_needed", "rank", "rank_points", "achievements")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProfileStore(str(tmp_path / "transfer.db"))
+    engine = GameEngine.open(store, "u")
+    for day in DAYS:
+        engine.complete_task(1, day)
+        engine.complete_task(2, day)
+    yield store
+    store.close()
+
+
+def exported(store, fmt="jsonl"):
+    buffer = io.StringIO()
+    export_profile(store, "u", buffer, fmt)
+    return buffer.getvalue()
+
+
+def completion(day, task_id):
+    return json.dumps({"type": "completion", "day": day, "task_id": task_id})
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_reimport_into_same_profile_changes_nothing(store, fmt):
+    before = store.load_profile("u")
+    summary = import_profile(store, "u", io.StringIO(exported(store, fmt)), fmt)
+    assert summary["completions"] == 0 and summary["exp"] == 0
+
+    after = store.load_profile("u")
+    assert after["completion_history"] == before["completion_history"]
+    assert {field: after[field] for field in PROGRESS_FIELDS} == {field: before[field] for field in PROGRESS_FIELDS}
+
+    engine = GameEngine.open(store, "u")
+    assert engine.check_consistency() == {}
+    engine.undo_task(1, DAYS[0])
+    engine.undo_task(2, DAYS[0])
+    assert engine.completed_on(DAYS[0]) == set()
+    assert store.load_profile("u")["completion_history"].get(DAYS[0], []) == []
+
+
+def test_import_into_new_profile_matches(store):
+    import_profile(store, "v", io.StringIO(exported(store)), new_profile=get_default_user_data, batch_size=2)
+    source, copy = store.load_profile("u"), store.load_profile("v")
+    assert copy["completion_history"] == source["completion_history"]
+    assert copy["daily_tasks"] == source["daily_tasks"]
+    assert copy["level"] == source["level"] and copy["experience"] == source["experience"]
+    assert GameEngine.open(store, "v").check_consistency() == {}
+
+
+def test_repeated_completions_count_once(store):
+    lines = [completion("2024-02-01", 3)] * 3 + [completion(DAYS[0], 1), completion("2024-02-01", 4)]
+    summary = import_profile(store, "u", io.StringIO("\n".join(lines)), batch_size=2)
+    assert summary["completions"] == 2
+    history = store.load_profile("u")["completion_history"]
+    assert history["2024-02-01"] == [3, 4]
+    assert history[DAYS[0]] == [1, 2]
+    assert GameEngine.open(store, "u").check_consistency() == {}
+
+
+@pytest.mark.parametrize("task_id", [0, -1, MAX_TASK_ID + 1, 10**12])
+def test_out_of_range_task_id_keeps_nothing(store, task_id):
+    before = store.load_profile("u")
+    lines = [completion("2024-02-01", 3), completion("2024-02-02", task_id)]
+    with pytest.raises(ValueError):
+        import_profile(store, "u", io.StringIO("\n".join(lines)))
+    assert store.load_profile("u") == before
@@ -0,0 +1,216 @@
+"""WriteBehindStore leaves exactly what a synchronous ProfileStore would.
+
+A seeded random run over two users is played against both stores at
+several flush intervals and queue limits; the profiles, EXP ledgers and
+event logs on disk must match. The coalescing paths (an undo cancelling a
+queued completion, a ledger read behind a queued undo, a failed flush
+merged back into the queue) are also checked on their own, as is a user
+whose writes keep failing.
+"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import engine as engine_module
+import events
+from engine import GameEngine
+from leaderboard import Leaderboards
+from storage import LEDGER, UNLEDGER, ProfileStore
+from writer import MAX_ATTEMPTS, WriteBehindError, WriteBehindStore
+
+USERS = ("a", "b")
+STEPS = 1500
+DAY = "2024-01-01"
+# Only explicit flushes run: the writer thread would wait this long
+NEVER = 3600
+
+
+@pytest.fixture(autouse=True)
+def fixed_clock(monkeypatch):
+    """Both runs stamp events and level-ups with the same time"""
+    for module in (events, engine_module):
+        monkeypatch.setattr(module, "get_timestamp", lambda: "2024-06-01 12:00:00")
+
+
+def run_random(store, seed, steps=STEPS):
+    rng = random.Random(seed)
+    leaderboards = Leaderboards(store)
+    engines = {user_id: GameEngine.open(store, user_id, leaderboard=leaderboards) for user_id in USERS}
+    for engine in engines.values():
+        engine.event_log.snapshot_interval = 50
+    today = date.today()
+    for step in range(steps):
+        engine = engines[rng.choice(USERS)]
+        day = (today - timedelta(days=rng.randrange(10))).isoformat()
+        ids = [task["id"] for task in engine.user_data["daily_tasks"]]
+        roll = rng.random()
+        if roll < 0.5:
+            engine.complete_task(rng.choice(ids), day)
+        elif roll < 0.85:
+            engine.undo_task(rng.choice(ids + [99]), day)
+        elif roll < 0.9:
+            engine.add_experience(rng.randrange(1, 50))
+        elif roll < 0.95:
+            engine.add_task(f"Quest {step}", "common", 10, "fitness")
+        elif len(ids) > 3:
+            engine.delete_task(rng.choice(ids))
+        if step == steps // 2:
+            engine.start_season(2)
+    for engine in engines.values():
+        assert engine.check_consistency() == {}
+        assert engine.rebuild_from_log() == []
+    return {user_id: engine.user_data for user_id, engine in engines.items()}
+
+
+def stored_state(path):
+    store = ProfileStore(path)
+    try:
+        return {
+            user_id: (store.load_profile(user_id), store.load_ledger(user_id), store.load_events(user_id))
+            for user_id in USERS
+        }
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize(
+    "flush_interval, max_pending", [(0.0005, 1), (0.01, 16), (0.2, 512), (10, 100_000)],
+    ids=["0.5ms", "10ms", "default", "10s"],
+)
+def test_matches_synchronous_store(tmp_path, flush_interval, max_pending):
+    sync = ProfileStore(str(tmp_path / "sync.db"))
+    expected = run_random(sync, seed=3)
+    sync.close()
+
+    behind = WriteBehindStore(ProfileStore(str(tmp_path / "behind.db")), flush_interval, max_pending)
+    got = run_random(behind, seed=3)
+    assert behind.metrics()["errors"] == 0
+    behind.close()
+
+    assert got == expected
+    assert stored_state(str(tmp_path / "behind.db")) == stored_state(str(tmp_path / "sync.db"))
+
+
+@pytest.fixture
+def behind(tmp_path):
+    store = WriteBehindStore(ProfileStore(str(tmp_path / "behind.db")), flush_interval=NEVER)
+    yield store
+    store.close()
+
+
+def test_undo_cancels_queued_completion(behind):
+    engine = GameEngine.open(behind, "a")
+    behind.flush()
+    engine.complete_task(1, DAY)
+    engine.undo_task(1, DAY)
+    ops = behind._pending["a"].ops
+    assert not [op for op in ops if op[0] in (LEDGER, UNLEDGER)]
+    assert behind.metrics()["coalesced"] >= 1
+    behind.flush()
+    assert behind.store.load_ledger("a") == []
+
+
+def test_ledger_read_behind_queued_undo(behind):
+    engine = GameEngine.open(behind, "a")
+    engine.complete_task(1, DAY)
+    first = behind.load_ledger_entry("a", DAY, 1)
+    # Answered from the queue before any flush
+    assert first is not None and behind.metrics()["flushes"] == 0
+    engine.complete_task(1, DAY)
+    behind.flush()
+    # An undo of the second completion is queued; the entry to read is the first one, on disk
+    engine.undo_task(1, DAY)
+    assert behind.load_ledger_entry("a", DAY, 1) == first
+    engine.undo_task(1, DAY)
+    assert engine.check_consistency() == {}
+    assert engine.user_data["level"] == 1 and engine.user_data["experience"] == 0
+
+
+def test_failed_flush_keeps_writes(behind, tmp_path):
+    sync = ProfileStore(str(tmp_path / "sync.db"))
+    expected_engine = GameEngine.open(sync, "a")
+    engine = GameEngine.open(behind, "a")
+    behind.flush()
+
+    store = behind.store
+    write_batch = store.write_batch
+
+    def fail_once(batch):
+        store.write_batch = write_batch
+        raise OSError("disk full")
+
+    store.write_batch = fail_once
+    for target in (expected_engine, engine):
+        target.complete_task(1, DAY)
+        target.complete_task(2, DAY)
+    with pytest.raises(WriteBehindError) as failed:
+        behind.flush()
+    assert isinstance(failed.value.failures["a"], OSError) and not failed.value.dropped
+    assert behind.metrics()["errors"] == 1
+    # Written after the failure, so merged after the writes that failed
+    for target in (expected_engine, engine):
+        target.undo_task(1, DAY)
+        target.complete_task(3, DAY)
+    behind.flush()
+
+    assert behind.metrics()["queue_depth"] == 0
+    assert store.load_profile("a") == sync.load_profile("a")
+    assert store.load_ledger("a") == sync.load_ledger("a")
+    assert store.load_events("a") == sync.load_events("a")
+    sync.close()
+
+
+def test_failing_user_is_dropped_without_blocking_others(behind):
+    good, bad = GameEngine.open(behind, "a"), GameEngine.open(behind, "b")
+    behind.flush()
+    store = behind.store
+    write_batch = store.write_batch
+
+    def reject_b(batch):
+        if "b" in batch:
+            raise OSError("bad row")
+        write_batch(batch)
+
+    store.write_batch = reject_b
+    for attempt in range(MAX_ATTEMPTS):
+        good.complete_task(1, f"2024-01-0{attempt + 1}")
+        bad.complete_task(1, f"2024-01-0{attempt + 1}")
+        with pytest.raises(WriteBehindError) as failed:
+            behind.flush()
+        assert set(failed.value.failures) == {"b"}
+        assert failed.value.dropped == ({"b"} if attempt == MAX_ATTEMPTS - 1 else set())
+        # The other user's writes are not held up by b's
+        assert len(store.load_profile("a")["completion_history"]) == attempt + 1
+
+    metrics = behind.metrics()
+    assert metrics["queue_depth"] == 0 and "b" in metrics["dropped_users"]
+    assert store.load_profile("b")["completion_history"] == {}
+    # Once the store takes b's writes again, its events number on from what is on disk
+    store.write_batch = write_batch
+    bad.complete_task(2, DAY)
+    behind.flush()
+    assert [seq for seq, *_ in store.load_events("b")] == list(range(1, len(store.load_events("b")) + 1))
+
+
+def test_dropped_writes_are_reported_to_their_user(behind):
+    engine = GameEngine.open(behind, "b")
+    behind.flush()
+    store = behind.store
+    write_batch = store.write_batch
+
+    def reject_b(batch):
+        raise OSError("bad row")
+
+    store.write_batch = reject_b
+    engine.complete_task(1, DAY)
+    for _ in range(MAX_ATTEMPTS):
+        # As the writer thread would: failures stay in metrics
+        behind._flush()
+    store.write_batch = write_batch
+    # Other users' calls go through; b's next one is told its writes were dropped
+    assert behind.load_profile("a") is None
+    with pytest.raises(WriteBehindError) as failed:
+        behind.load_profile("b")
+    assert failed.value.dropped == {"b"}
+    assert behind.load_profile("b") is not None
@@ -0,0 +1,225 @@
+"""Streaming export and import of quests and completion history.
+
+Both formats carry the same flat records, one per line:
+
+    {"type": "task", "task_id": 1, "name": "...", "difficulty": "common", "exp": 15, "category": "fitness"}
+    {"type": "completion", "day": "2024-01-31", "task_id": 1}
+
+CSV files use the header ``type,day,task_id,name,difficulty,exp,category``
+and leave the fields a record does not use empty. An import reads and
+checks the whole file first, staging completions in a temporary SQLite
+database so memory stays flat whatever the file size, then writes history
+and progress in one transaction: a bad record keeps nothing. A completion
+the profile or the file already has is imported once, so re-importing an
+export changes nothing. Level, rank and achievements are recomputed once
+from per-task completion counts, instead of one add_experience call per
+imported completion.
+"""
+import csv
+import json
+import sqlite3
+from contextlib import closing
+from datetime import date
+
+from achievements import ENGINE
+from events import EventLog, get_timestamp
+from rules import apply_completions, get_task_exp
+from streaks import StreakTracker
+
+TASK = "task"
+COMPLETION = "completion"
+
+FORMATS = ("jsonl", "csv")
+CSV_FIELDS = ("type", "day", "task_id", "name", "difficulty", "exp", "category")
+INT_FIELDS = ("task_id", "exp")
+
+IMPORT_BATCH_SIZE = 50_000
+# History rows pack task ids as int32
+MAX_TASK_ID = 2**31 - 1
+
+
+def task_record(task):
+    """Export record for a task dict"""
+    return {
+        "type": TASK, "task_id": task["id"], "name": task["name"],
+        "difficulty": task["difficulty"], "exp": task["exp"], "category": task.get("category"),
+    }
+
+
+def iter_records(store, user_id):
+    """Yield every task, then every completion in day order, of a stored profile"""
+    user_data = store.load_profile(user_id, history=False)
+    if user_data is None:
+        raise KeyError(f"no profile for user {user_id!r}")
+    for task in user_data["daily_tasks"]:
+        yield task_record(task)
+    for day, task_ids in store.iter_history(user_id):
+        for task_id in task_ids:
+            yield {"type": COMPLETION, "day": day, "task_id": task_id}
+
+
+def write_jsonl(records, fp):
+    """Write records as JSON Lines; returns the number written"""
+    count = 0
+    for record in records:
+        fp.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+        fp.write("\n")
+        count += 1
+    return count
+
+
+def write_csv(records, fp):
+    """Write records as CSV; returns the number written"""
+    writer = csv.DictWriter(fp, CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def read_jsonl(fp):
+    """Yield records from JSON Lines, skipping blank lines"""
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(fp):
+    """Yield records from CSV, dropping empty fields and parsing integers"""
+    for row in csv.DictReader(fp):
+        record = {key: value for key, value in row.items() if value not in ("", None)}
+        for key in INT_FIELDS:
+            if key in record:
+                record[key] = int(record[key])
+        yield record
+
+
+def _int_field(record, name):
+    value = record[name]
+    if type(value) is not int:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+    return value
+
+
+def _task_id(record):
+    value = _int_field(record, "task_id")
+    if not 0 < value <= MAX_TASK_ID:
+        raise ValueError(f"task_id must be between 1 and {MAX_TASK_ID}, got {value}")
+    return value
+
+
+def _day_field(record):
+    value = record["day"]
+    if not isinstance(value, str):
+        raise ValueError(f"day must be a YYYY-MM-DD string, got {value!r}")
+    return date.fromisoformat(value)
+
+
+WRITERS = {"jsonl": write_jsonl, "csv": write_csv}
+READERS = {"jsonl": read_jsonl, "csv": read_csv}
+
+
+def export_profile(store, user_id, fp, fmt="jsonl"):
+    """Stream a stored profile's quests and history to a text file"""
+    return WRITERS[fmt](iter_records(store, user_id), fp)
+
+
+def import_profile(store, user_id, fp, fmt="jsonl", new_profile=None, replace=False,
+                   batch_size=IMPORT_BATCH_SIZE):
+    """Stream records from a text file into a stored profile
+
+    Imported completions are added to the existing history (or to a fresh
+    profile from new_profile() when the user has none or replace is set).
+    Raises ValueError (or KeyError for a missing field) on a bad record,
+    leaving the profile as it was. Returns a summary dict.
+    """
+    user_data = None if replace else store.load_profile(user_id, history=False)
+    create = user_data is None
+    if create:
+        if new_profile is None:
+            raise KeyError(f"no profile for user {user_id!r}")
+        user_data = new_profile()
+        user_data["completion_history"] = {}
+
+    tasks = {task["id"]: task for task in user_data["daily_tasks"]}
+    imported = {}
+    days = set()
+    existing = 0
+
+    # (day ordinal, task id) pairs, staged on disk until the whole file has
+    # been checked; the unique key drops pairs already stored or repeated
+    with closing(sqlite3.connect("")) as staged:
+        staged.execute(
+            "CREATE TABLE pairs (day INTEGER, task_id INTEGER, new INTEGER, UNIQUE (day, task_id))"
+        )
+        stage = "INSERT OR IGNORE INTO pairs VALUES (?, ?, ?)"
+
+        # Completions already stored still count towards achievements
+        if not create:
+            for day, task_ids in store.iter_history(user_id):
+                ordinal = date.fromisoformat(day).toordinal()
+                days.add(ordinal)
+                existing += len(task_ids)
+                staged.executemany(stage, [(ordinal, task_id, 0) for task_id in task_ids])
+
+        pending = []
+        for record in READERS[fmt](fp):
+            kind = record.get("type")
+            if kind == TASK:
+                task = {
+                    "id": _task_id(record), "name": record["name"],
+                    "difficulty": record["difficulty"], "exp": _int_field(record, "exp"),
+                    "category": record.get("category"),
+                }
+                tasks[task["id"]] = imported[task["id"]] = task
+            elif kind == COMPLETION:
+                ordinal = _day_field(record).toordinal()
+                days.add(ordinal)
+                pending.append((ordinal, _task_id(record), 1))
+                if len(pending) >= batch_size:
+                    staged.executemany(stage, pending)
+                    pending.clear()
+            else:
+                raise ValueError(f"unknown record type {kind!r}")
+        staged.executemany(stage, pending)
+
+        def staged_days():
+            """The new completions as {day: task_ids}, batch by batch"""
+            cursor = staged.execute("SELECT day, task_id FROM pairs WHERE new ORDER BY day, rowid")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                by_day = {}
+                for ordinal, task_id in rows:
+                    by_day.setdefault(date.fromordinal(ordinal).isoformat(), []).append(task_id)
+                yield by_day
+
+        # Only completions not stored before earn EXP; a quest unknown here earns none
+        completions = exp_earned = 0
+        for task_id, count in staged.execute("SELECT task_id, COUNT(*) FROM pairs WHERE new GROUP BY task_id"):
+            completions += count
+            if task_id in tasks:
+                exp_earned += count * get_task_exp(tasks[task_id])
+
+        user_data["daily_tasks"] = sorted(tasks.values(), key=lambda t: t["id"])
+        timestamp = get_timestamp()
+        apply_completions(user_data, exp_earned, completions, timestamp[:16])
+        awarded = ENGINE.backfill(user_data, existing + completions, StreakTracker.from_days(days).longest)
+        store.write_import(
+            user_id, user_data, user_data["daily_tasks"] if create else imported.values(), staged_days(), create
+        )
+
+    # Replay starts from this snapshot, since the import itself is not in the event log
+    EventLog(store).snapshot(user_id, store.last_event_seq(user_id), store.load_profile(user_id))
+
+    return {
+        "tasks": len(imported),
+        "completions": completions,
+        "exp": exp_earned,
+        "level": user_data["level"],
+        "rank": user_data["rank"],
+        "achievements": awarded,
+    }
@@ -0,0 +1,382 @@
+"""Write-behind persistence: a click returns before its rows reach the disk.
+
+``WriteBehindStore`` wraps a ProfileStore and stands in for it. The writes
+a click makes (record_completion, record_undo, save_progress, add_task,
+retire_task, with their event, snapshot and streak writes) are captured as
+row values and queued per user. A background thread writes everything
+queued in one transaction, every flush_interval seconds or as soon as
+max_pending changes are waiting. Rows rewritten before a flush (the profile
+row, a day's completions, a quest) are written once, and a completion
+undone before its flush never reaches the ledger. Every other store method
+first waits for the queue to drain, so reads see every queued write.
+close() drains the queue and closes the store.
+
+A failed flush is retried user by user, so one user's bad rows do not hold
+back everyone else's. A user whose writes fail MAX_ATTEMPTS flushes in a
+row has them dropped. Failures are raised as WriteBehindError from flush()
+and from the next direct store call for that user.
+
+The price is durability: a crash loses the clicks of the last
+flush_interval seconds.
+"""
+import threading
+import time
+
+from storage import COMPACT, EVENT, LEDGER, PROFILE_FIELDS, RETIRE, SNAPSHOT, UNLEDGER
+
+DEFAULT_FLUSH_INTERVAL = 0.2
+DEFAULT_MAX_PENDING = 512
+# Failed flushes a user's queued writes survive before they are dropped
+MAX_ATTEMPTS = 3
+
+# Store methods that only read, so they leave the cached event sequences valid
+READS = frozenset({
+    "list_users", "has_profile", "load_standings", "load_streaks", "load_profile", "iter_history", "load_ledger",
+    "load_events", "load_snapshot", "list_archives", "archive_path", "load_retired_tasks",
+})
+
+
+class WriteBehindError(Exception):
+    """Queued writes that could not be written
+
+    failures maps user_id to the exception its writes raised; dropped holds
+    the users whose writes were given up on rather than kept for a retry.
+    """
+
+    def __init__(self, failures, dropped=()):
+        super().__init__(
+            "; ".join(f"{user_id}: {exc!r}" for user_id, exc in failures.items())
+            + (f" (dropped writes of {', '.join(map(str, dropped))})" if dropped else "")
+        )
+        self.failures = failures
+        self.dropped = frozenset(dropped)
+
+
+class PendingChanges:
+    """One user's queued writes, in the shape ProfileStore.write_batch takes"""
+
+    __slots__ = ("profile", "days", "tasks", "streak", "ops", "depth", "attempts")
+
+    def __init__(self):
+        self.profile = None
+        self.days = {}
+        self.tasks = {}
+        self.streak = None
+        self.ops = []
+        # Queued calls folded in, and failed flushes so far
+        self.depth = 0
+        self.attempts = 0
+
+    def merge(self, newer):
+        """Fold changes queued after these into them"""
+        if newer.profile is not None:
+            self.profile = newer.profile
+        self.days.update(newer.days)
+        self.tasks.update(newer.tasks)
+        if newer.streak is not None:
+            self.streak = newer.streak
+        self.ops += newer.ops
+        self.depth += newer.depth
+
+    def cancel_entry(self, day, task_id):
+        """Drop the newest queued ledger row of a completion; False if none is queued"""
+        ops = self.ops
+        for i in range(len(ops) - 1, -1, -1):
+            if ops[i][0] == LEDGER and ops[i][1] == day and ops[i][2] == task_id:
+                del ops[i]
+                return True
+        return False
+
+
+class WriteBehindStore:
+    """A ProfileStore whose click-path writes are queued and flushed by a background thread"""
+
+    def __init__(self, store, flush_interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_MAX_PENDING):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._inflight = {}
+        self._depth = 0
+        # Next event sequence number per user, assigned when an event is queued
+        self._seqs = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        # Users whose writes were dropped, with the error that did it, and
+        # those not yet told through flush() or a store call of their own
+        self._dropped = {}
+        self._unreported = {}
+        self._metrics = {
+            "flushes": 0,
+            "flushed_changes": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "dropped_changes": 0,
+            "last_error": None,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # Queued writes
+
+    def save_progress(self, user_id, user_data, entry=None, event=None):
+        base = self._seq_base(user_id, event)
+        with self._lock:
+            changes = self._changes(user_id)
+            self._set_profile(changes, user_data)
+            if entry is not None:
+                changes.ops.append((LEDGER, None, None, entry))
+            return self._queue_event(user_id, changes, event, base)
+
+    def record_completion(self, user_id, day, task_ids, user_data, task_id=None, entry=None, event=None):
+        base = self._seq_base(user_id, event)
+        with self._lock:
+            changes = self._changes(user_id)
+            self._set_day(changes, day, task_ids)
+            self._set_profile(changes, user_data)
+            if entry is not None:
+                changes.ops.append((LEDGER, day, task_id, entry))
+            return self._queue_event(user_id, changes, event, base)
+
+    def record_undo(self, user_id, day, task_ids, user_data, task_id, event=None):
+        base = self._seq_base(user_id, event)
+        with self._lock:
+            changes = self._changes(user_id)
+            self._set_day(changes, day, task_ids)
+            self._set_profile(changes, user_data)
+            if changes.cancel_entry(day, task_id):
+                self._metrics["coalesced"] += 1
+            else:
+                changes.ops.append((UNLEDGER, day, task_id))
+            return self._queue_event(user_id, changes, event, base)
+
+    def add_task(self, user_id, task, event=None):
+        base = self._seq_base(user_id, event)
+        with self._lock:
+            changes = self._changes(user_id)
+            changes.tasks[task["id"]] = dict(task)
+            return self._queue_event(user_id, changes, event, base)
+
+    def retire_task(self, user_id, task, event=None):
+        base = self._seq_base(user_id, event)
+        with self._lock:
+            changes = self._changes(user_id)
+            changes.tasks[task["id"]] = None
+            changes.ops.append((RETIRE, dict(task)))
+            return self._queue_event(user_id, changes, event, base)
+
+    def save_streak(self, user_id, longest):
+        with self._lock:
+            self._changes(user_id).streak = longest
+
+    def save_snapshot(self, user_id, seq, state):
+        with self._lock:
+            self._changes(user_id).ops.append((SNAPSHOT, seq, state))
+
+    def compact_events(self, user_id, retain_snapshots):
+        with self._lock:
+            self._changes(user_id).ops.append((COMPACT, retain_snapshots))
+
+    # Reads that can be answered without waiting for the queue
+
+    def load_ledger_entry(self, user_id, day, task_id):
+        """Newest ledger entry of a completion, from the queue when it has not been flushed yet"""
+        with self._lock:
+            queued, unmatched_undos = [], 0
+            for batch in (self._inflight, self._pending):
+                changes = batch.get(user_id)
+                for op in changes.ops if changes is not None else ():
+                    if op[0] in (LEDGER, UNLEDGER) and op[1] == day and op[2] == task_id:
+                        if op[0] == LEDGER:
+                            queued.append(op[3])
+                        elif queued:
+                            queued.pop()
+                        else:
+                            unmatched_undos += 1
+            if queued:
+                return tuple(queued[-1])
+        if unmatched_undos:
+            # The entry we want is behind queued deletions of newer ones
+            self._flush_for(user_id)
+        return self.store.load_ledger_entry(user_id, day, task_id)
+
+    def last_event_seq(self, user_id):
+        with self._lock:
+            seq = self._seqs.get(user_id)
+        return self.store.last_event_seq(user_id) if seq is None else seq - 1
+
+    # Everything else waits for the queue
+
+    def __getattr__(self, name):
+        attr = getattr(self.store, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self._flush_for(args[0] if args else None)
+            result = attr(*args, **kwargs)
+            if name not in READS and args:
+                # A direct write (reset, new season, import) may have appended events
+                with self._lock:
+                    self._seqs.pop(args[0], None)
+            return result
+        return call
+
+    # Flushing
+
+    def flush(self):
+        """Write everything queued so far; returns once it is on disk
+
+        Raises WriteBehindError if some user's writes failed, in this flush
+        or in a background one that dropped them.
+        """
+        failures = self._flush()
+        with self._lock:
+            dropped, self._unreported = self._unreported, {}
+        if failures or dropped:
+            raise WriteBehindError({**dropped, **failures}, dropped)
+
+    def _flush_for(self, user_id):
+        """Flush, raising only if user_id's own writes failed"""
+        failures = self._flush()
+        with self._lock:
+            dropped = self._unreported.pop(user_id, None)
+        if user_id in failures or dropped is not None:
+            raise WriteBehindError({user_id: failures.get(user_id, dropped)}, () if dropped is None else (user_id,))
+
+    def _flush(self):
+        """Write the queue; {user_id: exception} of the writes that failed"""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending, self._depth = {}, 0
+                self._inflight = batch
+            if not batch:
+                return {}
+            started = time.perf_counter()
+            failures = {}
+            try:
+                self.store.write_batch(batch)
+            except Exception as exc:
+                # One user's bad rows must not hold back everyone else's
+                failures = self._write_each(batch) if len(batch) > 1 else {next(iter(batch)): exc}
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._inflight = {}
+                self._requeue({user_id: batch.pop(user_id) for user_id in failures}, failures)
+                if batch:
+                    metrics = self._metrics
+                    metrics["flushes"] += 1
+                    metrics["flushed_changes"] += sum(changes.depth for changes in batch.values())
+                    metrics["last_flush_ms"] = elapsed_ms
+                    metrics["max_flush_ms"] = max(metrics["max_flush_ms"], elapsed_ms)
+                    metrics["total_flush_ms"] += elapsed_ms
+            return failures
+
+    def _write_each(self, batch):
+        """Write batch user by user; {user_id: exception} of those that failed"""
+        failures = {}
+        for user_id, changes in batch.items():
+            try:
+                self.store.write_batch({user_id: changes})
+            except Exception as exc:
+                failures[user_id] = exc
+        return failures
+
+    def metrics(self):
+        """Queue depth, flush counts and flush latency"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["queue_depth"] = self._depth
+            metrics["queued_users"] = len(self._pending)
+            metrics["dropped_users"] = dict(self._dropped)
+        flushes = metrics.pop("total_flush_ms")
+        metrics["mean_flush_ms"] = flushes / metrics["flushes"] if metrics["flushes"] else 0.0
+        return metrics
+
+    def close(self):
+        """Drain the queue, stop the writer thread and close the store"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        try:
+            self.flush()
+        finally:
+            self.store.close()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._flush():
+                # Recorded in metrics(); writes short of MAX_ATTEMPTS stay queued for the next attempt
+                time.sleep(self.flush_interval)
+
+    # Queueing helpers, called with self._lock held
+
+    def _requeue(self, failed, failures):
+        """Put failed writes back in front of newer ones, or drop them after MAX_ATTEMPTS"""
+        for user_id, changes in failed.items():
+            newer = self._pending.pop(user_id, None)
+            if newer is not None:
+                self._depth -= newer.depth
+                changes.merge(newer)
+            changes.attempts += 1
+            if changes.attempts < MAX_ATTEMPTS:
+                self._pending[user_id] = changes
+                self._depth += changes.depth
+                continue
+            self._dropped[user_id] = repr(failures[user_id])
+            self._unreported[user_id] = failures[user_id]
+            self._metrics["dropped_changes"] += changes.depth
+            # Their events never reached the disk; number the next ones from what did
+            self._seqs.pop(user_id, None)
+        if failures:
+            self._metrics["errors"] += 1
+            self._metrics["last_error"] = repr(next(iter(failures.values())))
+
+    def _changes(self, user_id):
+        changes = self._pending.get(user_id)
+        if changes is None:
+            changes = self._pending[user_id] = PendingChanges()
+        changes.depth += 1
+        self._depth += 1
+        if self._depth >= self.max_pending:
+            self._wakeup.set()
+        return changes
+
+    def _set_profile(self, changes, user_data):
+        if changes.profile is not None:
+            self._metrics["coalesced"] += 1
+        profile = {field: user_data.get(field) for field in PROFILE_FIELDS}
+        profile["achievements"] = list(user_data.get("achievements", ()))
+        changes.profile = profile
+
+    def _set_day(self, changes, day, task_ids):
+        if day in changes.days:
+            self._metrics["coalesced"] += 1
+        changes.days[day] = list(task_ids)
+
+    def _seq_base(self, user_id, event):
+        """Stored last event seq of a user with no cached seq; read before taking the lock"""
+        if event is None or user_id in self._seqs:
+            return None
+        return self.store.last_event_seq(user_id)
+
+    def _queue_event(self, user_id, changes, event, base):
+        if event is None:
+            return None
+        seq = self._seqs.get(user_id)
+        if seq is None:
+            # base is None only if a direct write dropped the cached seq since _seq_base
+            seq = (base if base is not None else self.store.last_event_seq(user_id)) + 1
+        self._seqs[user_id] = seq + 1
+        changes.ops.append((EVENT, seq, event))
+        return seq